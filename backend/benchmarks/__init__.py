@@ -0,0 +1,62 @@
+"""性能测试脚本，在 backend 目录下以 `python -m benchmarks.<name>` 运行。
+
+- datagen: 生成航班/预订测试数据
+- endpoints: 各接口微基准（延迟分位数、吞吐量、SQL 条数）
+- storm: 热门航班并发抢票
+- booking_queue: 排队预订模式下的并发抢票
+- serialization: DRF 序列化器与快速序列化路径对比
+- schedule_import: 时刻表批量导入吞吐量和内存峰值
+- pricing: 动态票价报价吞吐量（缓存命中/重新计算/接口）
+- archive: 已起飞航班归档的每批事务耗时、吞吐量及归档前后的读延迟
+- connections: 中转航线搜索（航线图构建、增量刷新、搜索延迟）
+- realtime: 余票推送的合并效果、推送延迟，与轮询的查询数对比
+- throttling: 令牌桶限流对抓取流量的拦截效果与开销，过载保护在并发/高延迟下的拒绝比例
+- replicas: 多个 SQLite 文件模拟只读副本，检查读写路由、会话粘滞和副本延迟
+- analytics: 销售分析报表与客户端累加全部预订的对比，汇总表与预订表聚合结果的一致性
+- idempotency: 同一个 Idempotency-Key 并发提交，检查不重复预订
+- inventory_stress / db_profiles: 库存扣减策略、数据库配置档对比
+- `python -m benchmarks` 运行整套基准并输出 JSON，`--compare` 对比两次结果
+
+脚本默认使用独立的临时 SQLite 数据库，不会影响 db.sqlite3。
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django(db_name=None):
+    """初始化 Django 并在临时数据库上执行迁移，返回 SQLite 数据库文件路径（其他数据库返回 None）"""
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flight_service.settings')
+
+    import django
+    from django.conf import settings
+    from django.core.management import call_command
+
+    # 关闭 DEBUG，避免 connection.queries 在长时间压测中不断累积
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = ['*']
+    # 压测所有请求来自同一个地址，关闭限流和过载保护，测量接口本身（benchmarks.throttling 会单独打开）
+    settings.THROTTLE_BUCKETS = {}
+    settings.SHED_MAX_IN_FLIGHT = float('inf')
+    settings.SHED_P95_SECONDS = float('inf')
+    if settings.DATABASES['default']['ENGINE'].endswith('sqlite3'):
+        if db_name is None:
+            fd, db_name = tempfile.mkstemp(prefix='flights-bench-', suffix='.sqlite3')
+            os.close(fd)
+        settings.DATABASES['default']['NAME'] = db_name
+    django.setup()
+    call_command('migrate', verbosity=0)
+    return db_name
+
+
+def cleanup(db_name):
+    """删除临时 SQLite 数据库及其 WAL 文件"""
+    if not db_name:
+        return
+    for path in (db_name, f'{db_name}-wal', f'{db_name}-shm'):
+        if os.path.exists(path):
+            os.remove(path)
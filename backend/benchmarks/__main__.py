@@ -0,0 +1,94 @@
+"""运行整套基准并输出 JSON，便于在不同提交之间对比。
+
+    python -m benchmarks --output bench-new.json
+    python -m benchmarks --db /tmp/flights-100k.sqlite3 --iterations 500 --output bench.json
+    python -m benchmarks --compare bench-old.json bench-new.json
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from . import BACKEND_DIR, setup_django, cleanup
+
+COMPARE_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_per_s', 'queries_per_call')
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)['results']
+    with open(new_path) as f:
+        new = json.load(f)['results']
+    print(f"{'benchmark':<24}{'metric':<20}{'old':>12}{'new':>12}{'change':>10}")
+    for name in sorted(set(old) & set(new)):
+        for metric in COMPARE_METRICS:
+            before, after = old[name].get(metric), new[name].get(metric)
+            if before is None or after is None:
+                continue
+            change = f'{(after - before) / before * 100:+.1f}%' if before else ''
+            print(f'{name:<24}{metric:<20}{before:>12}{after:>12}{change:>10}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db', help='复用已生成数据的 SQLite 数据库，不指定时临时生成')
+    parser.add_argument('--flights', type=int, default=2000)
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--storm-threads', type=int, default=16)
+    parser.add_argument('--output', help='结果写入的 JSON 文件，默认输出到标准输出')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    db_name = setup_django(args.db)
+    from django import get_version
+    from django.conf import settings
+    from flights.models import Flight, Booking
+    from . import datagen, endpoints, storm, booking_queue
+
+    if not args.db:
+        flights = datagen.seed_flights(args.flights)
+        datagen.seed_bookings(args.bookings, flights)
+
+    results = endpoints.run(args.iterations)
+    results['booking_storm'] = storm.run(threads=args.storm_threads)
+    results['booking_queue_storm'] = booking_queue.run(threads=args.storm_threads)
+    report = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'django': get_version(),
+            'db_profile': settings.DB_PROFILE,
+            'flights': Flight.objects.count(),
+            'bookings': Booking.objects.count(),
+            'iterations': args.iterations,
+        },
+        'results': results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
+    if not args.db:
+        cleanup(db_name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""销售分析：报表接口（读 SalesRollup）与原来导出全部预订后在客户端累加的耗时对比，
+预订数量增长时报表延迟的变化，以及汇总表与直接在预订表上聚合的结果是否一致（含接口预订/取消后的增量维护）。
+
+    python -m benchmarks.analytics --flights 5000 --bookings 20000 --steps 3 --iterations 50
+"""
+import argparse
+import json
+from decimal import Decimal
+
+from .stats import measure
+
+ADMIN = {'username': 'admin', 'password': '123456'}
+
+
+def _legacy_totals():
+    """原来的做法：导出全部预订，按航线累加总价"""
+    from flights.models import Booking
+
+    totals = {}
+    rows = Booking.objects.filter(status='confirmed').with_total_price().values_list(
+        'flight__departure_city_key', 'flight__arrival_city_key', 'seat_count', 'annotated_total_price')
+    for departure, arrival, seat_count, price in rows.iterator():
+        entry = totals.setdefault((departure, arrival), [0, Decimal(0)])
+        entry[0] += seat_count
+        entry[1] += price
+    return totals
+
+
+def check_consistency():
+    """汇总表与预订表直接聚合的差异行数（按航班+舱位比较售出座位和收入）"""
+    from django.db.models import Sum
+    from flights.analytics import _sold
+    from flights.models import Booking, SalesRollup
+
+    direct = _sold(Booking.objects.all())
+    rollup = {
+        (row['flight_id'], row['seat_class']): row
+        for row in SalesRollup.objects.filter(seats_sold__gt=0).values('flight_id', 'seat_class', 'seats_sold', 'revenue')
+    }
+    mismatched = sum(
+        1 for key in set(direct) | set(rollup)
+        if key not in direct or key not in rollup
+        or direct[key]['seats_sold'] != rollup[key]['seats_sold'] or direct[key]['revenue'] != rollup[key]['revenue']
+    )
+    return {
+        'rollup_rows': SalesRollup.objects.count(),
+        'seats_sold': SalesRollup.objects.aggregate(total=Sum('seats_sold'))['total'],
+        'mismatched': mismatched,
+    }
+
+
+def _book_and_cancel(client, flights=20):
+    """通过接口预订后取消一部分，检查信号维护的汇总"""
+    from django.contrib.auth.models import User
+    from flights.models import Flight
+
+    user, _ = User.objects.get_or_create(username='bench-analytics')
+    client.force_authenticate(user)
+    booked = []
+    for flight_id in Flight.objects.live().filter(economy_seats__gte=2).values_list('id', flat=True)[:flights]:
+        response = client.post('/bookings/', {'flight': flight_id, 'seat_class': 'economy', 'seat_count': 2},
+                               format='json')
+        if response.status_code == 201:
+            booked.append(response.json()['id'])
+    for booking_id in booked[::2]:
+        client.post(f'/bookings/{booking_id}/cancel/')
+    client.force_authenticate(None)
+    return len(booked)
+
+
+def run(flight_count=5000, bookings=20000, steps=3, iterations=50):
+    from rest_framework.test import APIClient
+    from . import datagen
+
+    client = APIClient()
+    flights = datagen.seed_flights(flight_count)
+    results = {'steps': []}
+    for step in range(1, steps + 1):
+        datagen.seed_bookings(bookings, flights)
+
+        def report(i, group_by='route'):
+            response = client.post('/bookings/analytics/', {**ADMIN, 'group_by': group_by}, format='json')
+            assert response.status_code == 200, response.content
+
+        results['steps'].append({
+            'bookings': bookings * step,
+            'report_by_route': measure(report, iterations),
+            'report_by_flight': measure(lambda i: report(i, 'flight'), iterations),
+            'legacy_client_sum': measure(lambda i: _legacy_totals(), max(iterations // 10, 3), warmup=1),
+        })
+
+    results['api_bookings'] = _book_and_cancel(client)
+    results['consistency'] = check_consistency()
+    return results
+
+
+def main():
+    from . import setup_django, cleanup
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--flights', type=int, default=5000)
+    parser.add_argument('--bookings', type=int, default=20000, help='每一步新增的预订数')
+    parser.add_argument('--steps', type=int, default=3)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    db_name = setup_django()
+    print(json.dumps(run(args.flights, args.bookings, args.steps, args.iterations), indent=2))
+    cleanup(db_name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""归档：把一部分航班改成已起飞后执行归档，统计每批事务耗时（即持有写锁的时间）和吞吐量，
+并对比归档前后航班列表/搜索的延迟与热表行数。
+
+    python -m benchmarks.archive --flights 20000 --bookings 200000 --departed 0.7 --batch-size 500
+"""
+import argparse
+import json
+import time
+from datetime import timedelta
+
+from .stats import measure, summarize
+
+
+def _table_sizes():
+    from flights.models import Flight, Booking, ArchivedFlight, ArchivedBooking
+
+    return {
+        'flights': Flight.objects.count(),
+        'bookings': Booking.objects.count(),
+        'archived_flights': ArchivedFlight.objects.count(),
+        'archived_bookings': ArchivedBooking.objects.count(),
+    }
+
+
+def _reads(iterations):
+    from rest_framework.test import APIClient
+    from django.core.cache import cache
+
+    client = APIClient()
+
+    def flight_list(i):
+        cache.clear()
+        client.get('/flights/', {'page_size': 50})
+
+    def search(i):
+        cache.clear()
+        client.get('/flights/search/', {'departure_city': 'Beijing', 'arrival_city': 'Shanghai'})
+
+    return {'flight_list_cold': measure(flight_list, iterations)['p50_ms'],
+            'search_cold': measure(search, iterations)['p50_ms']}
+
+
+def run(departed=0.7, batch_size=500, iterations=50):
+    from django.db.models import F
+    from django.utils import timezone
+    from flights import archive
+    from flights.models import Flight
+
+    # 把最早起飞的一部分航班整体平移到过去，模拟积累下来的历史数据
+    total = Flight.objects.count()
+    cutoff_row = Flight.objects.order_by('departure_time').values_list('departure_time', flat=True)[
+        max(int(total * departed) - 1, 0)]
+    shift = cutoff_row - timezone.now() + timedelta(days=2)
+    Flight.objects.filter(departure_time__lte=cutoff_row).update(
+        departure_time=F('departure_time') - shift, arrival_time=F('arrival_time') - shift)
+
+    before = {'tables': _table_sizes(), 'reads_p50_ms': _reads(iterations)}
+
+    # 逐批计时：每批是一个事务，耗时即在线请求可能被阻塞的最长时间
+    durations = []
+    batch = archive.archive_batch
+
+    def timed_batch(flight_ids):
+        begin = time.perf_counter()
+        try:
+            return batch(flight_ids)
+        finally:
+            durations.append(time.perf_counter() - begin)
+
+    archive.archive_batch = timed_batch
+    started = time.perf_counter()
+    try:
+        result = archive.archive_flights(batch_size=batch_size)
+    finally:
+        archive.archive_batch = batch
+    elapsed = time.perf_counter() - started
+
+    batches = summarize(durations, elapsed)
+    return {
+        'before': before,
+        'after': {'tables': _table_sizes(), 'reads_p50_ms': _reads(iterations)},
+        'archived_flights': result.flights,
+        'archived_bookings': result.bookings,
+        'flights_per_s': round(result.flights / elapsed, 1) if elapsed else None,
+        'batch_ms': {key: batches[key] for key in ('count', 'p50_ms', 'p95_ms', 'p99_ms')},
+        'batch_max_ms': round(max(durations) * 1000, 3) if durations else None,
+    }
+
+
+def main():
+    from . import setup_django, cleanup
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--flights', type=int, default=20000)
+    parser.add_argument('--bookings', type=int, default=200000)
+    parser.add_argument('--departed', type=float, default=0.7, help='改为已起飞的航班比例')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    db_name = setup_django()
+    from . import datagen
+    flights = datagen.seed_flights(args.flights)
+    datagen.seed_bookings(args.bookings, flights)
+    print(json.dumps(run(args.departed, args.batch_size, args.iterations), indent=2))
+    cleanup(db_name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""ASGI 下同步视图与异步视图的并发对比：模拟大量客户端同时预订，且数据库写入存在锁等待
+
+    python -m benchmarks.asgi_concurrency --clients 50 --requests 200 --lock-wait-ms 20
+
+同步 DRF 视图在 ASGI 下全部排队在同一个线程里执行，锁等待会串行累加；
+异步视图把事务放到线程池，锁等待可以重叠。
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+from .stats import summarize
+
+
+def _install_lock_wait(seconds):
+    """在扣减座位的 UPDATE 语句前人为等待，模拟热门航班上的锁竞争"""
+    from django.db.backends.signals import connection_created
+
+    def slow_update(execute, sql, params, many, context):
+        if sql.startswith('UPDATE "flights_flight"'):
+            time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        # 同一个连接对象重连时也会触发 connection_created，避免重复安装
+        if slow_update not in connection.execute_wrappers:
+            connection.execute_wrappers.append(slow_update)
+
+    connection_created.connect(install, weak=False)
+
+
+async def _storm(path, token, flight_ids, clients, requests):
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    latencies, statuses = [], {}
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def worker():
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            begin = time.perf_counter()
+            response = await client.post(path, {
+                'flight': flight_ids[i % len(flight_ids)], 'seat_class': 'economy', 'seat_count': 1,
+            }, content_type='application/json', AUTHORIZATION=f'Token {token}')
+            latencies.append(time.perf_counter() - begin)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    result = summarize(latencies, elapsed)
+    result['statuses'] = {str(code): count for code, count in sorted(statuses.items())}
+    return result
+
+
+def run(clients, requests, lock_wait):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from rest_framework.authtoken.models import Token
+    from flights.models import Flight
+
+    _install_lock_wait(lock_wait)
+    user = User.objects.create_user(f'bench-asgi-{time.time_ns()}')
+    token = Token.objects.create(user=user).key
+    now = timezone.now()
+    flight_ids = [
+        Flight.objects.create(
+            flight_number=f'ASGI{i}-{time.time_ns()}', departure_city='Beijing', arrival_city='Shanghai',
+            departure_time=now + timedelta(days=5), arrival_time=now + timedelta(days=5, hours=2),
+            airline='Bench Air', aircraft_type='A320', economy_seats=requests * 2, business_seats=0,
+            first_seats=0, economy_price=800, business_price=1600, first_price=3200,
+        ).id
+        for i in range(8)
+    ]
+    results = {}
+    for name, path in (('sync_drf_view', '/bookings/'), ('async_view', '/async/bookings/')):
+        results[name] = asyncio.run(_storm(path, token, flight_ids, clients, requests))
+    return results
+
+
+def main():
+    from . import setup_django, cleanup
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--lock-wait-ms', type=float, default=20)
+    args = parser.parse_args()
+
+    db_name = setup_django()
+    print(json.dumps(run(args.clients, args.requests, args.lock_wait_ms / 1000), indent=2))
+    cleanup(db_name)
+
+
+if __name__ == '__main__':
+    main()
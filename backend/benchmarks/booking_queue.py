@@ -0,0 +1,116 @@
+"""排队预订模式下的抢票风暴：请求只写入 pending 预订，后台工作线程分批确认
+
+    python -m benchmarks.booking_queue --threads 16 --requests 800 --seats 300 --workers 2
+
+与 benchmarks.storm（同步确认）对比请求延迟；同时检查确认的座位数与剩余座位之和不变（不超卖）。
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import timedelta
+
+from .stats import summarize
+
+
+def run(threads=16, requests=800, seats=300, hot_flights=2, workers=2):
+    from django.contrib.auth.models import User
+    from django.db import connection, close_old_connections
+    from django.db.models import Sum
+    from django.test import override_settings
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+    from flights.models import Flight, Booking
+    from flights.queue import process_batch, pending_bookings
+
+    now = timezone.now()
+    flights = [
+        Flight.objects.create(
+            flight_number=f'QUEUE{i}-{time.time_ns()}', departure_city='Beijing', arrival_city='Sanya',
+            departure_time=now + timedelta(days=10), arrival_time=now + timedelta(days=10, hours=4),
+            airline='Bench Air', aircraft_type='A330', economy_seats=seats, business_seats=0, first_seats=0,
+            economy_price=999, business_price=2999, first_price=5999,
+        )
+        for i in range(hot_flights)
+    ]
+    users = [User.objects.get_or_create(username=f'bench-queue-{n}')[0] for n in range(threads)]
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    per_thread = requests // threads
+    clients_done = threading.Event()
+
+    def client(n):
+        api = APIClient()
+        api.force_authenticate(users[n])
+        local_latencies, local_statuses = [], {}
+        for i in range(per_thread):
+            begin = time.perf_counter()
+            response = api.post('/bookings/', {
+                'flight': flights[(n + i) % hot_flights].id, 'seat_class': 'economy', 'seat_count': 1,
+            }, format='json')
+            local_latencies.append(time.perf_counter() - begin)
+            local_statuses[response.status_code] = local_statuses.get(response.status_code, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for code, count in local_statuses.items():
+                statuses[code] = statuses.get(code, 0) + count
+        connection.close()
+
+    def worker(partition):
+        # 客户端全部结束且本分区队列为空时退出
+        while True:
+            close_old_connections()
+            confirmed, rejected = process_batch(partition, workers)
+            if not confirmed and not rejected:
+                if clients_done.is_set() and not pending_bookings(partition, workers).exists():
+                    break
+                time.sleep(0.05)
+        connection.close()
+
+    with override_settings(BOOKING_QUEUE_MODE=True):
+        client_threads = [threading.Thread(target=client, args=(n,)) for n in range(threads)]
+        worker_threads = [threading.Thread(target=worker, args=(n,)) for n in range(workers)]
+        started = time.perf_counter()
+        for t in client_threads + worker_threads:
+            t.start()
+        for t in client_threads:
+            t.join()
+        requests_elapsed = time.perf_counter() - started
+        clients_done.set()
+        for t in worker_threads:
+            t.join()
+        drained = time.perf_counter() - started
+
+    bookings = Booking.objects.filter(flight__in=flights)
+    confirmed = bookings.filter(status='confirmed').aggregate(seats=Sum('seat_count'))['seats'] or 0
+    left = sum(Flight.objects.filter(pk__in=[f.pk for f in flights]).values_list('economy_seats', flat=True))
+    result = summarize(latencies, requests_elapsed)
+    result.update({
+        'threads': threads,
+        'workers': workers,
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        'confirmed': bookings.filter(status='confirmed').count(),
+        'rejected': bookings.filter(status='rejected').count(),
+        'drain_s': round(drained, 3),
+        'oversold': confirmed + left != seats * hot_flights or left < 0,
+    })
+    return result
+
+
+def main():
+    from . import setup_django, cleanup
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=800)
+    parser.add_argument('--seats', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    db_name = setup_django()
+    print(json.dumps(run(args.threads, args.requests, args.seats, workers=args.workers), indent=2))
+    cleanup(db_name)
+
+
+if __name__ == '__main__':
+    main()
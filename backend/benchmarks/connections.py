@@ -0,0 +1,86 @@
+"""中转航线搜索：航线图全量构建耗时、单个航班变更后的增量刷新耗时，以及直飞/一次中转/两次中转搜索和接口延迟。
+
+    python -m benchmarks.connections --flights 20000 --iterations 200
+"""
+import argparse
+import json
+import random
+import time
+from datetime import timedelta
+
+from .stats import measure
+
+
+def run(iterations=200, rng=None):
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+    from flights.models import Flight
+    from flights.routing import RouteGraph, find_connections, route_graph
+
+    rng = rng or random.Random(1)
+    cities = list(Flight.objects.live().values_list('departure_city_key', flat=True).distinct())
+    if len(cities) < 2:
+        raise SystemExit('no upcoming flights, seed data with benchmarks.datagen first')
+    today = timezone.localdate()
+    client = APIClient()
+
+    graph = RouteGraph()
+    begin = time.perf_counter()
+    graph.rebuild()
+    build_ms = round((time.perf_counter() - begin) * 1000, 3)
+
+    # 修改一个航班的起飞时间，经信号写入变更日志，下次查询时增量刷新
+    flight = Flight.objects.live().order_by('?').first()
+    route_graph()
+    flight.departure_time += timedelta(minutes=5)
+    flight.arrival_time += timedelta(minutes=5)
+    flight.save()
+    begin = time.perf_counter()
+    route_graph()
+    apply_ms = round((time.perf_counter() - begin) * 1000, 3)
+
+    def pick():
+        departure, arrival = rng.sample(cities, 2)
+        return departure, arrival, today + timedelta(days=rng.randint(1, 60))
+
+    def search(max_stops, sort='duration'):
+        def call(i):
+            find_connections(*pick(), max_stops=max_stops, sort=sort)
+        return call
+
+    def endpoint(i):
+        departure, arrival, date = pick()
+        client.get('/flights/connections/', {
+            'departure_city': departure, 'arrival_city': arrival, 'departure_date': date.isoformat(),
+            'max_stops': 1,
+        })
+
+    return {
+        'legs': len(route_graph()._legs),
+        'rebuild_ms': build_ms,
+        'incremental_apply_ms': apply_ms,
+        'direct': measure(search(0), iterations),
+        'one_stop': measure(search(1), iterations),
+        'one_stop_by_price': measure(search(1, 'price'), iterations),
+        'two_stops': measure(search(2), iterations),
+        'endpoint': measure(endpoint, iterations),
+    }
+
+
+def main():
+    from . import setup_django, cleanup
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--flights', type=int, default=20000)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    db_name = setup_django()
+    from . import datagen
+    datagen.seed_flights(args.flights)
+    print(json.dumps(run(args.iterations), indent=2))
+    cleanup(db_name)
+
+
+if __name__ == '__main__':
+    main()
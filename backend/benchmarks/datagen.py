@@ -0,0 +1,161 @@
+"""生成基准测试数据：航班按热门航线和日期分布，预订集中在少数热门航班上。
+
+    python -m benchmarks.datagen --db /tmp/flights-100k.sqlite3 --flights 100000 --bookings 10000000
+
+生成的数据库可以通过 `python -m benchmarks --db ...` 反复使用。
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+
+CITIES = [
+    'Beijing', 'Shanghai', 'Guangzhou', 'Shenzhen', 'Chengdu', 'Hangzhou', 'Xian', 'Chongqing',
+    'Kunming', 'Wuhan', 'Nanjing', 'Xiamen', 'Qingdao', 'Changsha', 'Harbin', 'Sanya',
+]
+AIRLINES = [
+    ('CA', 'Air China'), ('MU', 'China Eastern'), ('CZ', 'China Southern'),
+    ('HU', 'Hainan Airlines'), ('3U', 'Sichuan Airlines'), ('ZH', 'Shenzhen Airlines'),
+]
+AIRCRAFT = [('A320', 150, 12, 0), ('B737', 160, 8, 0), ('A330', 260, 30, 8), ('B787', 240, 28, 8)]
+
+
+def seed_flights(count, days=180, batch_size=5000, rng=None):
+    """批量写入航班并建立座位图，返回 [(航班id, 剩余经济舱, 剩余商务舱, 剩余头等舱)]"""
+    from django.utils import timezone
+    from flights.analytics import rebuild_sales_rollup
+    from flights.availability import rebuild_availability
+    from flights.inventory import SEAT_FIELDS
+    from flights.models import Flight, SeatMap
+
+    rng = rng or random.Random(42)
+    now = timezone.now().replace(minute=0, second=0, microsecond=0)
+    prefix = time.strftime('%H%M%S')
+    created = []
+    batch = []
+
+    def flush():
+        flights = Flight.objects.bulk_create(batch)
+        SeatMap.objects.bulk_create([
+            SeatMap(flight=flight, seat_class=seat_class, capacity=getattr(flight, field),
+                    occupancy=bytes((getattr(flight, field) + 7) // 8))
+            for flight in flights for seat_class, field in SEAT_FIELDS.items()
+        ])
+        for flight in flights:
+            created.append([flight.id, flight.economy_seats, flight.business_seats, flight.first_seats])
+        batch.clear()
+
+    for i in range(count):
+        # 前几条航线更热门
+        departure, arrival = rng.sample(CITIES[:8] if rng.random() < 0.6 else CITIES, 2)
+        code, airline = rng.choice(AIRLINES)
+        aircraft, economy, business, first = rng.choice(AIRCRAFT)
+        departure_time = now + timedelta(hours=rng.randint(1, days * 24), minutes=rng.choice((0, 15, 30, 45)))
+        base = rng.randint(400, 1500)
+        flight = Flight(
+            flight_number=f'{code}{prefix}{i}', departure_city=departure, arrival_city=arrival,
+            departure_time=departure_time, arrival_time=departure_time + timedelta(minutes=rng.randint(70, 260)),
+            airline=airline, aircraft_type=aircraft,
+            economy_seats=economy, business_seats=business, first_seats=first,
+            economy_price=base, business_price=base * 3, first_price=base * 6,
+        )
+        flight.normalize_route()  # bulk_create 不会调用 save()
+        batch.append(flight)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    # bulk_create 不触发信号，余票汇总表和销售汇总表需要重建
+    rebuild_availability()
+    rebuild_sales_rollup()
+    return created
+
+
+def seed_bookings(count, flights, users=1000, batch_size=10000, rng=None):
+    """批量写入预订并扣减对应航班库存，再按预订重建这些航班的座位图并分配座位号"""
+    from django.contrib.auth.models import User
+    from flights.analytics import rebuild_sales_rollup
+    from flights.availability import rebuild_availability
+    from flights.models import Booking, SeatMap
+    from flights.seatmap import build_missing_seat_maps
+
+    rng = rng or random.Random(7)
+    existing = User.objects.filter(username__startswith='bench-user-').count()
+    User.objects.bulk_create([
+        User(username=f'bench-user-{i}') for i in range(existing, users)
+    ])
+    user_ids = list(User.objects.filter(username__startswith='bench-user-').values_list('id', flat=True))
+
+    classes = [('economy', 1, 0.85), ('business', 2, 0.12), ('first', 3, 0.03)]
+    written = 0
+    batch = []
+    sold = {}
+    touched = set()
+    while written < count:
+        # 帕累托分布：少数航班承担大部分预订
+        index = min(int(rng.paretovariate(1.2)) - 1, len(flights) - 1)
+        index = (index * 7919) % len(flights)
+        flight = flights[index]
+        seat_class, column, _ = rng.choices(classes, weights=[c[2] for c in classes])[0]
+        seat_count = rng.choice((1, 1, 1, 2, 2, 3))
+        if flight[column] < seat_count:
+            # 航班已满时换一个随机航班
+            flight = flights[rng.randrange(len(flights))]
+            if flight[column] < seat_count:
+                continue
+        flight[column] -= seat_count
+        sold[(flight[0], seat_class)] = sold.get((flight[0], seat_class), 0) + seat_count
+        touched.add(flight[0])
+        batch.append(Booking(
+            user_id=rng.choice(user_ids), flight_id=flight[0], seat_class=seat_class,
+            seat_count=seat_count, passenger_name=f'Passenger {written}', passenger_id=f'{written:018d}',
+            phone='13800138000',
+        ))
+        written += 1
+        if len(batch) >= batch_size or written == count:
+            Booking.objects.bulk_create(batch)
+            batch.clear()
+            if len(sold) > 50000 or written == count:
+                _apply_sold(sold)
+
+    # 已经售出座位的座位图删掉后按剩余座位和预订重建（读接口不写座位图，这里必须建好）
+    touched = list(touched)
+    for start in range(0, len(touched), 500):
+        SeatMap.objects.filter(flight_id__in=touched[start:start + 500]).delete()
+    build_missing_seat_maps()
+    rebuild_availability()
+    rebuild_sales_rollup()
+    return written
+
+
+def _apply_sold(sold):
+    from django.db.models import F
+    from flights.inventory import SEAT_FIELDS
+    from flights.models import Flight
+
+    for (flight_id, seat_class), seats in sold.items():
+        field = SEAT_FIELDS[seat_class]
+        Flight.objects.filter(pk=flight_id).update(**{field: F(field) - seats})
+    sold.clear()
+
+
+def main():
+    from . import setup_django
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db', help='SQLite 数据库路径，默认生成临时文件')
+    parser.add_argument('--flights', type=int, default=2000)
+    parser.add_argument('--bookings', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=1000)
+    args = parser.parse_args()
+
+    db_name = setup_django(args.db)
+    started = time.perf_counter()
+    flights = seed_flights(args.flights)
+    seed_bookings(args.bookings, flights, users=args.users)
+    print(f'seeded {args.flights} flights and {args.bookings} bookings into {db_name} '
+          f'in {time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""对比不同数据库配置档下的并发写入吞吐量。
+
+    python -m benchmarks.db_profiles --threads 8 --writes 2000
+    python -m benchmarks.db_profiles --profiles sqlite postgres
+
+每个配置档在独立子进程中运行（Django 配置只能初始化一次）；并发线程一边扣减座位、
+写入预订，一边有读线程查询航班，统计写入吞吐量和数据库锁错误次数。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
+
+from . import BACKEND_DIR, setup_django, cleanup
+
+
+def run_workload(threads, writes, readers):
+    from django.contrib.auth.models import User
+    from django.db import connection, transaction
+    from django.utils import timezone
+    from flights.inventory import reserve_seats
+    from flights.models import Flight, Booking
+
+    now = timezone.now()
+    user = User.objects.create_user(f'bench-{time.time_ns()}')
+    flights = [
+        Flight.objects.create(
+            flight_number=f'DB{i}-{time.time_ns()}', departure_city='Beijing', arrival_city='Shanghai',
+            departure_time=now + timedelta(days=7), arrival_time=now + timedelta(days=7, hours=2),
+            airline='Bench Air', aircraft_type='A320', economy_seats=writes, business_seats=0,
+            first_seats=0, economy_price=800, business_price=1600, first_price=3200,
+        )
+        for i in range(4)
+    ]
+    counters = {'writes': 0, 'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+    per_thread = writes // threads
+
+    def writer(n):
+        for i in range(per_thread):
+            flight = flights[(n + i) % len(flights)]
+            try:
+                with transaction.atomic():
+                    if reserve_seats(flight.id, 'economy', 1):
+                        Booking.objects.create(user=user, flight=flight, seat_class='economy')
+                result = 'writes'
+            except Exception:  # database is locked 等
+                result = 'errors'
+            with lock:
+                counters[result] += 1
+        connection.close()
+
+    def reader():
+        while not stop.is_set():
+            list(Flight.objects.filter(departure_city_key='beijing')[:20])
+            with lock:
+                counters['reads'] += 1
+        connection.close()
+
+    reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for t in reader_threads + writer_threads:
+        t.start()
+    for t in writer_threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for t in reader_threads:
+        t.join()
+
+    return {
+        'threads': threads,
+        'readers': readers,
+        **counters,
+        'elapsed_s': round(elapsed, 4),
+        'writes_per_s': round(counters['writes'] / elapsed, 1),
+        'reads_per_s': round(counters['reads'] / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--profiles', nargs='+', default=['sqlite-rollback', 'sqlite'])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=2)
+    parser.add_argument('--writes', type=int, default=2000)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        db_name = setup_django()
+        result = run_workload(args.threads, args.writes, args.readers)
+        cleanup(db_name)
+        print(json.dumps(result))
+        return
+
+    results = []
+    for profile in args.profiles:
+        env = dict(os.environ, DB_PROFILE=profile)
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.db_profiles', '--child',
+             '--threads', str(args.threads), '--readers', str(args.readers), '--writes', str(args.writes)],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        results.append({'profile': profile, **json.loads(output.strip().splitlines()[-1])})
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""各接口的微基准，通过 DRF 测试客户端走完整的请求处理流程"""
+import random
+from urllib.parse import parse_qs, urlparse
+
+from django.core.cache import cache
+
+from .stats import measure
+
+
+def _sample(rng, size=200):
+    from django.utils import timezone
+    from flights.models import Flight
+
+    flights = list(
+        Flight.objects.filter(departure_time__gt=timezone.now())
+        .order_by('?').values('id', 'flight_number', 'departure_city', 'arrival_city', 'departure_time')[:size]
+    )
+    if not flights:
+        raise SystemExit('no upcoming flights, seed data with benchmarks.datagen first')
+    return flights
+
+
+def run(iterations=200, rng=None):
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIClient
+
+    rng = rng or random.Random(1)
+    flights = _sample(rng)
+    user, _ = User.objects.get_or_create(username='bench-endpoints')
+    anonymous = APIClient()
+    client = APIClient()
+    client.force_authenticate(user)
+
+    def pick(i):
+        return flights[rng.randrange(len(flights))]
+
+    def search(i):
+        f = pick(i)
+        anonymous.get('/flights/search/', {
+            'departure_city': f['departure_city'], 'arrival_city': f['arrival_city'],
+            'departure_date': f['departure_time'].date().isoformat(),
+        })
+
+    def search_cold(i):
+        cache.clear()
+        search(i)
+
+    def flight_detail(i):
+        anonymous.get(f"/flights/{pick(i)['id']}/")
+
+    # 预先翻到第 50 页拿到游标，对比首页与深分页的延迟
+    deep_cursor = None
+    for _ in range(50):
+        response = anonymous.get('/flights/', {'cursor': deep_cursor} if deep_cursor else {}).json()
+        if not response['next']:
+            break
+        deep_cursor = parse_qs(urlparse(response['next']).query)['cursor'][0]
+
+    def flight_list(i):
+        anonymous.get('/flights/')
+
+    def flight_list_deep(i):
+        anonymous.get('/flights/', {'cursor': deep_cursor} if deep_cursor else {})
+
+    def empty_seats(i):
+        f = pick(i)
+        anonymous.get('/bookings/get_empty_seats/', {
+            'flight_number': f['flight_number'], 'departure_date': f['departure_time'].date().isoformat(),
+        })
+
+    def fare_calendar(i):
+        f = pick(i)
+        anonymous.get('/flights/calendar/', {
+            'departure_city': f['departure_city'], 'arrival_city': f['arrival_city'],
+            'month': f['departure_time'].strftime('%Y-%m'),
+        })
+
+    def booking_create(i):
+        client.post('/bookings/', {
+            'flight': pick(i)['id'], 'seat_class': 'economy', 'seat_count': 1, 'passenger_name': 'Bench',
+        }, format='json')
+
+    def booking_list(i):
+        client.get('/bookings/')
+
+    cases = {
+        'flight_search': search,
+        'flight_search_cold': search_cold,
+        'flight_detail': flight_detail,
+        'flight_list': flight_list,
+        'flight_list_deep': flight_list_deep,
+        'get_empty_seats': empty_seats,
+        'fare_calendar': fare_calendar,
+        'booking_create': booking_create,
+        'booking_list': booking_list,
+    }
+    return {name: measure(call, iterations) for name, call in cases.items()}
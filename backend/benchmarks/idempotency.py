@@ -0,0 +1,90 @@
+"""幂等键并发测试：多个线程同时用同一个 Idempotency-Key 提交同一个预订，
+检查每个键只产生一条预订、重复请求要么重放第一次的结果要么收到 409，并统计重放与首次请求的延迟。
+
+    python -m benchmarks.idempotency --threads 16 --rounds 50
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import timedelta
+
+from .stats import summarize
+
+
+def run(threads=16, rounds=50):
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+    from flights.models import Flight, Booking
+
+    now = timezone.now()
+    flight = Flight.objects.create(
+        flight_number=f'IDEM-{time.time_ns()}', departure_city='Beijing', arrival_city='Sanya',
+        departure_time=now + timedelta(days=10), arrival_time=now + timedelta(days=10, hours=4),
+        airline='Bench Air', aircraft_type='A330', economy_seats=rounds * 2, business_seats=0, first_seats=0,
+        economy_price=999, business_price=2999, first_price=5999,
+    )
+    user, _ = User.objects.get_or_create(username='bench-idempotency')
+    body = {'flight': flight.id, 'seat_class': 'economy', 'seat_count': 1}
+    lock = threading.Lock()
+    statuses, booking_ids = {}, {}
+    first_latencies, replay_latencies = [], []
+
+    def fire(key, barrier):
+        client = APIClient()
+        client.force_authenticate(user)
+        barrier.wait()
+        begin = time.perf_counter()
+        response = client.post('/bookings/', body, format='json', HTTP_IDEMPOTENCY_KEY=key)
+        elapsed = time.perf_counter() - begin
+        replayed = response.get('Idempotent-Replayed') == 'true'
+        with lock:
+            code = f"{response.status_code}{' replay' if replayed else ''}"
+            statuses[code] = statuses.get(code, 0) + 1
+            if response.status_code == 201:
+                booking_ids.setdefault(key, set()).add(response.json()['id'])
+                (replay_latencies if replayed else first_latencies).append(elapsed)
+        connection.close()
+
+    started = time.perf_counter()
+    for n in range(rounds):
+        key = f'bench-{n}'
+        barrier = threading.Barrier(threads)
+        workers = [threading.Thread(target=fire, args=(key, barrier)) for _ in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        # 第一个请求完成后的重试一定是重放
+        fire(key, threading.Barrier(1))
+    elapsed = time.perf_counter() - started
+
+    booked = Booking.objects.filter(flight=flight).count()
+    return {
+        'threads': threads,
+        'rounds': rounds,
+        'statuses': dict(sorted(statuses.items())),
+        'bookings_created': booked,
+        'duplicates': booked != rounds or any(len(ids) != 1 for ids in booking_ids.values()),
+        'first_request': summarize(first_latencies, elapsed),
+        'replay': summarize(replay_latencies, elapsed),
+    }
+
+
+def main():
+    from . import setup_django, cleanup
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    db_name = setup_django()
+    print(json.dumps(run(args.threads, args.rounds), indent=2))
+    cleanup(db_name)
+
+
+if __name__ == '__main__':
+    main()
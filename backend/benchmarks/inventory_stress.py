@@ -0,0 +1,118 @@
+"""热门航班抢票压力测试：对比旧的“读-改-写”扣减和条件 UPDATE 扣减。
+
+    python -m benchmarks.inventory_stress --threads 16 --attempts 400 --seats 100
+
+检查两点：成功预订的座位数不超过库存（不超卖），以及每秒成功预订数。
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import timedelta
+
+from . import setup_django, cleanup
+
+
+def legacy_book(flight_id, seat_class, count):
+    """原 BookingViewSet.create 的做法：锁行读取剩余座位，在 Python 里判断后 save"""
+    from django.db import transaction
+    from flights.models import Flight
+
+    with transaction.atomic():
+        flight = Flight.objects.select_for_update().get(id=flight_id)
+        field = f'{seat_class}_seats'
+        if getattr(flight, field) < count:
+            return False
+        setattr(flight, field, getattr(flight, field) - count)
+        flight.save()
+        return True
+
+
+def ledger_book(flight_id, seat_class, count):
+    from django.db import transaction
+    from flights.inventory import reserve_seats
+
+    with transaction.atomic():
+        return reserve_seats(flight_id, seat_class, count)
+
+
+def run(strategy, threads, attempts, seats, seat_count):
+    from django.db import connection
+    from django.utils import timezone
+    from flights.models import Flight
+
+    now = timezone.now()
+    flight = Flight.objects.create(
+        flight_number=f'HOT-{strategy}-{time.time_ns()}',
+        departure_city='Beijing', arrival_city='Shanghai',
+        departure_time=now + timedelta(days=7), arrival_time=now + timedelta(days=7, hours=2),
+        airline='Bench Air', aircraft_type='A330',
+        economy_seats=seats, business_seats=0, first_seats=0,
+        economy_price=800, business_price=1600, first_price=3200,
+    )
+    book = legacy_book if strategy == 'legacy' else ledger_book
+    counters = {'success': 0, 'sold_out': 0, 'errors': 0}
+    lock = threading.Lock()
+    per_thread = attempts // threads
+
+    def worker():
+        from django.db import connection as thread_connection
+        for _ in range(per_thread):
+            try:
+                result = 'success' if book(flight.id, 'economy', seat_count) else 'sold_out'
+            except Exception:  # 数据库锁冲突等
+                result = 'errors'
+            with lock:
+                counters[result] += 1
+        thread_connection.close()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    flight.refresh_from_db()
+    connection.close()
+    sold = counters['success'] * seat_count
+    return {
+        'strategy': strategy,
+        'threads': threads,
+        'attempts': per_thread * threads,
+        'seats': seats,
+        **counters,
+        'seats_left': flight.economy_seats,
+        # 成功扣减的座位数与库存实际减少量不一致即为超卖/丢失更新
+        'oversold': sold - (seats - flight.economy_seats),
+        'elapsed_s': round(elapsed, 4),
+        'bookings_per_s': round(counters['success'] / elapsed, 1) if elapsed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--attempts', type=int, default=400)
+    parser.add_argument('--seats', type=int, default=100)
+    parser.add_argument('--seat-count', type=int, default=1)
+    parser.add_argument('--strategy', choices=['legacy', 'ledger', 'both'], default='both')
+    args = parser.parse_args()
+
+    db_name = setup_django()
+    strategies = ['legacy', 'ledger'] if args.strategy == 'both' else [args.strategy]
+    try:
+        results = [run(s, args.threads, args.attempts, args.seats, args.seat_count) for s in strategies]
+        print(json.dumps(results, indent=2))
+    finally:
+        # 先关闭连接再删除数据库及 WAL 文件，压测失败时也不在临时目录留下文件
+        from django.db import connections
+        connections.close_all()
+        cleanup(db_name)
+    if any(r['strategy'] == 'ledger' and (r['oversold'] or r['seats_left'] < 0) for r in results):
+        raise SystemExit('ledger strategy oversold seats')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""报价吞吐量：缓存命中、缓存失效（每次都重新计算）和报价接口
+
+    python -m benchmarks.pricing --flights 2000 --iterations 2000
+"""
+import argparse
+import json
+import random
+
+from .stats import measure
+
+
+def run(iterations=2000, rng=None):
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+    from flights.caching import invalidate_flight
+    from flights.models import Flight
+    from flights.pricing import quote_fare
+
+    rng = rng or random.Random(1)
+    flight_ids = list(Flight.objects.filter(departure_time__gt=timezone.now()).values_list('id', flat=True)[:200])
+    if not flight_ids:
+        raise SystemExit('no upcoming flights, seed data with benchmarks.datagen first')
+    classes = ('economy', 'business', 'first')
+    client = APIClient()
+
+    def pick():
+        return rng.choice(flight_ids), rng.choice(classes)
+
+    def warm(i):
+        quote_fare(*pick(), seat_count=2)
+
+    def cold(i):
+        # 提升航班版本号模拟库存变化，下一次报价必须重新计算
+        flight_id, seat_class = pick()
+        invalidate_flight(flight_id)
+        quote_fare(flight_id, seat_class, seat_count=2)
+
+    def endpoint(i):
+        flight_id, seat_class = pick()
+        client.get(f'/flights/{flight_id}/quote/', {'seat_class': seat_class, 'seat_count': 2})
+
+    # 先把所有航班+舱位的报价放进缓存
+    for flight_id in flight_ids:
+        for seat_class in classes:
+            quote_fare(flight_id, seat_class)
+    results = {
+        'quote_cached': measure(warm, iterations),
+        'quote_endpoint': measure(endpoint, iterations),
+    }
+    # 最后再测缓存失效的情况，避免影响前两项的命中率
+    results['quote_recompute'] = measure(cold, iterations)
+    return results
+
+
+def main():
+    from . import setup_django, cleanup
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--flights', type=int, default=2000)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    db_name = setup_django()
+    from . import datagen
+    datagen.seed_flights(args.flights)
+    print(json.dumps(run(args.iterations), indent=2))
+    cleanup(db_name)
+
+
+if __name__ == '__main__':
+    main()
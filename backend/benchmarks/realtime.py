@@ -0,0 +1,132 @@
+"""余票推送：大量客户端订阅同一个航班，多个线程并发预订，统计推送消息数（合并效果）、
+推送线程的查询数与同等客户端每秒轮询一次的查询数对比，以及最后一笔预订完成后所有客户端收到最终余票的延迟。
+
+    python -m benchmarks.realtime --subscribers 1000 --threads 8 --bookings 400
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from datetime import timedelta
+
+from .stats import summarize
+
+
+def run(subscribers=1000, threads=8, bookings=400):
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+    from flights import realtime
+    from flights.models import Flight
+
+    now = timezone.now()
+    flight = Flight.objects.create(
+        flight_number=f'PUSH-{time.time_ns()}', departure_city='Beijing', arrival_city='Chengdu',
+        departure_time=now + timedelta(days=10), arrival_time=now + timedelta(days=10, hours=3),
+        airline='Bench Air', aircraft_type='A330', economy_seats=bookings, business_seats=0, first_seats=0,
+        economy_price=999, business_price=2999, first_price=5999,
+    )
+    user, _ = User.objects.get_or_create(username='bench-realtime')
+    publisher = realtime.publisher()
+    flushes = []
+    flush = publisher.flush
+
+    def counted_flush(due):
+        flushes.append(len(due))
+        flush(due)
+
+    publisher.flush = counted_flush
+
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    received = []
+    settled = []
+
+    async def client(queue):
+        count = 0
+        while True:
+            message = json.loads(await queue.get())
+            count += 1
+            if message['seats']['economy'] == 0:
+                settled.append(time.perf_counter())
+                received.append(count)
+                return
+
+    async def main():
+        broker = realtime.broker()
+        queues = [broker.subscribe(flight.id) for _ in range(subscribers)]
+        ready.set()
+        try:
+            await asyncio.gather(*(client(queue) for queue in queues))
+        finally:
+            for queue in queues:
+                broker.unsubscribe(flight.id, queue)
+
+    listener = threading.Thread(target=loop.run_until_complete, args=(main(),))
+    listener.start()
+    ready.wait()
+
+    remaining = iter(range(bookings))
+    lock = threading.Lock()
+    latencies = []
+
+    def worker():
+        api = APIClient()
+        api.force_authenticate(user)
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    break
+            begin = time.perf_counter()
+            api.post('/bookings/', {'flight': flight.id, 'seat_class': 'economy', 'seat_count': 1}, format='json')
+            latencies.append(time.perf_counter() - begin)
+        connection.close()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    finished = time.perf_counter()
+    listener.join(timeout=30)
+    loop.close()
+    publisher.flush = flush
+
+    elapsed = finished - started
+    settle = sorted(at - finished for at in settled)
+    return {
+        'subscribers': subscribers,
+        'inventory_changes': bookings,
+        'published_messages': len(flushes),
+        'messages_per_client': round(sum(received) / len(received), 1) if received else None,
+        'clients_settled': len(settled),
+        'settle_after_last_booking_ms': {
+            'p50': round(settle[len(settle) // 2] * 1000, 3) if settle else None,
+            'max': round(settle[-1] * 1000, 3) if settle else None,
+        },
+        # 推送：每次合并发布一条查询；轮询：每个客户端每秒一次
+        'push_queries': len(flushes),
+        'polling_queries_1s': round(subscribers * elapsed),
+        'booking': summarize(latencies, elapsed),
+    }
+
+
+def main():
+    from . import setup_django, cleanup
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--subscribers', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--bookings', type=int, default=400)
+    args = parser.parse_args()
+
+    db_name = setup_django()
+    print(json.dumps(run(args.subscribers, args.threads, args.bookings), indent=2))
+    cleanup(db_name)
+
+
+if __name__ == '__main__':
+    main()
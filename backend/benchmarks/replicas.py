@@ -0,0 +1,167 @@
+"""只读副本：用多个本地 SQLite 文件模拟主库和副本（从主库整库复制一次，之后不再同步，相当于副本一直落后），检查
+- 航班列表、管理端报表的查询落在副本上，预订写入和同一请求内的读取在主库上
+- 写入后的会话粘滞：刚预订的用户读自己的历史预订走主库，粘滞时间过后回到副本
+- 持续写入时管理端报表在主库/副本上的延迟
+
+    python -m benchmarks.replicas --replicas 2 --flights 5000 --bookings 50000
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from .stats import measure
+
+
+def replicate(aliases):
+    """用 SQLite 在线备份把主库复制到各副本文件"""
+    from django.db import connections
+
+    source = sqlite3.connect(connections['default'].settings_dict['NAME'])
+    for alias in aliases:
+        connections[alias].close()
+        target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+        source.backup(target)
+        target.close()
+    source.close()
+
+
+def queries_by_alias(call):
+    """执行 call()，返回各数据库别名上执行的 SQL 条数"""
+    from django.db import connections
+    from django.test.utils import CaptureQueriesContext
+
+    contexts = {alias: CaptureQueriesContext(connections[alias]) for alias in connections}
+    for context in contexts.values():
+        context.__enter__()
+    try:
+        call()
+    finally:
+        for context in contexts.values():
+            context.__exit__(None, None, None)
+    return {alias: len(context) for alias, context in contexts.items() if len(context)}
+
+
+def run(iterations=50):
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.db import connections, router
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+    from flights.models import Flight, Booking
+    from flights.replicas import replica_aliases
+
+    aliases = replica_aliases()
+    replicate(aliases)
+    settings.REPLICA_STICKY_SECONDS = 1
+    admin = {'username': settings.ADMIN_USERNAME, 'password': settings.ADMIN_PASSWORD}
+    User.objects.create_superuser(admin['username'], password=admin['password'])
+    replicate(aliases)
+
+    user = User.objects.create_user('bench-replica', password='x')
+    client = APIClient()
+    client.force_authenticate(user)
+    anonymous = APIClient()
+    flight = Flight.objects.filter(departure_time__gt=timezone.now() + timedelta(days=1), economy_seats__gt=10).first()
+
+    cache.clear()
+    routing = {
+        'flight_list': queries_by_alias(lambda: anonymous.get('/flights/', {'page_size': 20})),
+        'admin_report': queries_by_alias(lambda: anonymous.post('/bookings/all_bookings/', admin, format='json')),
+    }
+    booked = {}
+
+    def book():
+        booked['response'] = client.post(
+            '/bookings/', {'flight': flight.id, 'seat_class': 'economy', 'seat_count': 1}, format='json')
+
+    routing['booking_create'] = queries_by_alias(book)
+    booking_id = booked['response'].json()['id']
+    routing['history_right_after_write'] = queries_by_alias(lambda: client.get('/bookings/history/'))
+    time.sleep(settings.REPLICA_STICKY_SECONDS + 0.1)
+    routing['history_after_sticky_window'] = queries_by_alias(lambda: client.get('/bookings/history/'))
+
+    # 副本没有同步，报表里看不到刚创建的预订；主库上有
+    report = anonymous.post('/bookings/all_bookings/', dict(admin, user=user.id), format='json').json()
+    lag = {
+        'booking_on_primary': Booking.objects.using('default').filter(pk=booking_id).exists(),
+        'booking_in_replica_report': any(row['id'] == booking_id for row in report['results']),
+    }
+
+    # 一个线程持续预订/取消，同时测量报表延迟：读副本 vs 全部走主库
+    stop = threading.Event()
+
+    def writer():
+        api = APIClient()
+        api.force_authenticate(user)
+        while not stop.is_set():
+            response = api.post('/bookings/', {'flight': flight.id, 'seat_class': 'economy', 'seat_count': 1},
+                                format='json')
+            if response.status_code == 201:
+                api.post(f'/bookings/{response.json()["id"]}/cancel/')
+        connections.close_all()
+
+    def report_call(i):
+        anonymous.post('/bookings/all_bookings/', dict(admin, page_size=100), format='json')
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        on_replica = measure(report_call, iterations)
+        # 去掉路由器里的副本，之后的读取全部走主库
+        for instance in router.routers:
+            instance.replicas = []
+        on_primary = measure(report_call, iterations)
+    finally:
+        stop.set()
+        thread.join()
+    return {
+        'replicas': aliases,
+        'queries_by_alias': routing,
+        'replica_lag': lag,
+        'admin_report_under_writes': {
+            'replica': {key: on_replica[key] for key in ('p50_ms', 'p95_ms', 'p99_ms')},
+            'primary': {key: on_primary[key] for key in ('p50_ms', 'p95_ms', 'p99_ms')},
+        },
+    }
+
+
+def main():
+    from . import setup_django, cleanup
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--replicas', type=int, default=2)
+    parser.add_argument('--flights', type=int, default=5000)
+    parser.add_argument('--bookings', type=int, default=50000)
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    replica_files = []
+    for _ in range(args.replicas):
+        fd, path = tempfile.mkstemp(prefix='flights-replica-', suffix='.sqlite3')
+        os.close(fd)
+        replica_files.append(path)
+    # 需要在导入 settings 之前设置
+    os.environ['DB_REPLICAS'] = ','.join(replica_files)
+
+    db_name = setup_django()
+    from . import datagen
+    flights = datagen.seed_flights(args.flights)
+    datagen.seed_bookings(args.bookings, flights)
+    try:
+        print(json.dumps(run(args.iterations), indent=2))
+    finally:
+        from django.db import connections
+        connections.close_all()
+        cleanup(db_name)
+        for path in replica_files:
+            cleanup(path)
+
+
+if __name__ == '__main__':
+    main()
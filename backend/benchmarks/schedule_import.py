@@ -0,0 +1,90 @@
+"""时刻表导入吞吐量：生成 CSV 文件，分别测量首次导入（全部新增）和重复导入（全部更新）
+
+    python -m benchmarks.schedule_import --rows 10000 50000
+
+同时在 dry-run 模式下用 tracemalloc 统计内存峰值，验证内存占用不随文件大小增长。
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from .datagen import CITIES, AIRLINES, AIRCRAFT
+
+
+def write_schedule(path, rows, rng=None):
+    from flights.schedule import SCHEDULE_FIELDS
+
+    rng = rng or random.Random(3)
+    start = datetime(2030, 1, 1)
+    prefix = time.strftime('%H%M%S')
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SCHEDULE_FIELDS)
+        for i in range(rows):
+            departure, arrival = rng.sample(CITIES, 2)
+            code, airline = rng.choice(AIRLINES)
+            aircraft, economy, business, first = rng.choice(AIRCRAFT)
+            departure_time = start + timedelta(minutes=15 * rng.randint(0, 4 * 24 * 180))
+            base = rng.randint(400, 1500)
+            writer.writerow([
+                f'S{prefix}{code}{i}', departure, arrival,
+                departure_time.isoformat(), (departure_time + timedelta(minutes=rng.randint(70, 260))).isoformat(),
+                airline, aircraft, economy, business, first, base, base * 3, base * 6,
+            ])
+
+
+def _import(path, dry_run=False, batch_size=1000):
+    from flights.schedule import ScheduleImporter, read_rows
+
+    with open(path, encoding='utf-8', newline='') as f:
+        started = time.perf_counter()
+        result = ScheduleImporter(batch_size, dry_run).run(read_rows(f, 'csv'))
+        return result, time.perf_counter() - started
+
+
+def run(sizes=(10000, 50000), batch_size=1000):
+    results = {}
+    for size in sizes:
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        os.close(fd)
+        try:
+            write_schedule(path, size)
+            created, create_elapsed = _import(path, batch_size=batch_size)
+            updated, update_elapsed = _import(path, batch_size=batch_size)
+            tracemalloc.start()
+            _import(path, dry_run=True, batch_size=batch_size)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[f'import_{size}'] = {
+                'created': created.created,
+                'create_rows_per_s': round(size / create_elapsed),
+                'updated': updated.updated,
+                'update_rows_per_s': round(size / update_elapsed),
+                'peak_memory_kb': round(peak / 1024),
+            }
+        finally:
+            os.remove(path)
+    return results
+
+
+def main():
+    from . import setup_django, cleanup
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    db_name = setup_django()
+    print(json.dumps(run(args.rows, args.batch_size), indent=2))
+    cleanup(db_name)
+
+
+if __name__ == '__main__':
+    main()
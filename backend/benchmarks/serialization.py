@@ -0,0 +1,63 @@
+"""序列化对比：DRF 序列化器 + JSONRenderer 与 values_list 快速路径 + FastJSONRenderer
+
+    python -m benchmarks.serialization --rows 1000 10000 --iterations 5
+
+每个规模先校验两条路径输出的 JSON 完全一致，再分别计时（包含数据库读取）。
+"""
+import argparse
+import json
+
+from .stats import measure
+
+
+def run(sizes=(1000, 10000), iterations=5):
+    from flights.fastpath import FLIGHT_ROWS, BOOKING_ROWS
+    from flights.models import Flight, Booking
+    from flights.renderers import TimedJSONRenderer, FastJSONRenderer
+    from flights.serializers import FlightSerializer, BookingSerializer
+
+    json_renderer, fast_renderer = TimedJSONRenderer(), FastJSONRenderer()
+    cases = {
+        'flights': (Flight.objects.order_by('id'), FlightSerializer, FLIGHT_ROWS),
+        'bookings': (Booking.objects.for_listing().order_by('id'), BookingSerializer, BOOKING_ROWS),
+    }
+    results = {}
+    for name, (queryset, serializer_class, rows) in cases.items():
+        for size in sizes:
+            def drf(i, queryset=queryset[:size], serializer_class=serializer_class):
+                return json_renderer.render(serializer_class(queryset, many=True).data)
+
+            def fast(i, queryset=queryset[:size], rows=rows):
+                return fast_renderer.render(rows.rows(rows.values(queryset)))
+
+            if json.loads(drf(0)) != json.loads(fast(0)):
+                raise SystemExit(f'{name}: fast path output differs from serializer output')
+            slow = measure(drf, iterations, warmup=1, count_queries=False)
+            quick = measure(fast, iterations, warmup=1, count_queries=False)
+            results[f'{name}_{size}'] = {
+                'serializer_ms': slow['p50_ms'],
+                'fast_ms': quick['p50_ms'],
+                'speedup': round(slow['p50_ms'] / quick['p50_ms'], 1),
+            }
+    return results
+
+
+def main():
+    from . import setup_django, cleanup
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--iterations', type=int, default=5)
+    args = parser.parse_args()
+
+    db_name = setup_django()
+    from . import datagen
+    largest = max(args.rows)
+    flights = datagen.seed_flights(largest)
+    datagen.seed_bookings(largest, flights)
+    print(json.dumps(run(args.rows, args.iterations), indent=2))
+    cleanup(db_name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""基准统计：延迟分位数、吞吐量、SQL 条数"""
+import statistics
+import time
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed, queries=None):
+    """latencies 单位为秒，输出毫秒"""
+    values = sorted(latencies)
+    result = {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 0.50) * 1000, 3) if values else None,
+        'p95_ms': round(percentile(values, 0.95) * 1000, 3) if values else None,
+        'p99_ms': round(percentile(values, 0.99) * 1000, 3) if values else None,
+        'mean_ms': round(statistics.fmean(values) * 1000, 3) if values else None,
+        'throughput_per_s': round(len(values) / elapsed, 1) if elapsed else None,
+    }
+    if queries is not None:
+        result['queries_per_call'] = round(statistics.fmean(queries), 2) if queries else 0
+    return result
+
+
+def measure(call, iterations, warmup=5, count_queries=True):
+    """顺序调用 call(i) 若干次，统计每次耗时和 SQL 条数"""
+    for i in range(warmup):
+        call(i)
+    latencies, queries = [], []
+    started = time.perf_counter()
+    for i in range(iterations):
+        if count_queries:
+            with CaptureQueriesContext(connection) as captured:
+                begin = time.perf_counter()
+                call(i)
+                latencies.append(time.perf_counter() - begin)
+            queries.append(len(captured))
+        else:
+            begin = time.perf_counter()
+            call(i)
+            latencies.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, queries if count_queries else None)
@@ -0,0 +1,88 @@
+"""抢票风暴：多个线程同时通过 HTTP 接口预订少数几个热门航班
+
+    python -m benchmarks.storm --threads 16 --requests 800 --seats 300
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import timedelta
+
+from .stats import summarize
+
+
+def run(threads=16, requests=800, seats=300, hot_flights=2):
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.utils import timezone
+    from rest_framework.test import APIClient
+    from flights.models import Flight, Booking
+
+    now = timezone.now()
+    flights = [
+        Flight.objects.create(
+            flight_number=f'STORM{i}-{time.time_ns()}', departure_city='Beijing', arrival_city='Sanya',
+            departure_time=now + timedelta(days=10), arrival_time=now + timedelta(days=10, hours=4),
+            airline='Bench Air', aircraft_type='A330', economy_seats=seats, business_seats=0, first_seats=0,
+            economy_price=999, business_price=2999, first_price=5999,
+        )
+        for i in range(hot_flights)
+    ]
+    users = [User.objects.get_or_create(username=f'bench-storm-{n}')[0] for n in range(threads)]
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    per_thread = requests // threads
+
+    def worker(n):
+        client = APIClient()
+        client.force_authenticate(users[n])
+        local_latencies, local_statuses = [], {}
+        for i in range(per_thread):
+            begin = time.perf_counter()
+            response = client.post('/bookings/', {
+                'flight': flights[(n + i) % hot_flights].id, 'seat_class': 'economy', 'seat_count': 1,
+            }, format='json')
+            local_latencies.append(time.perf_counter() - begin)
+            local_statuses[response.status_code] = local_statuses.get(response.status_code, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for code, count in local_statuses.items():
+                statuses[code] = statuses.get(code, 0) + count
+        connection.close()
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    booked = Booking.objects.filter(flight__in=flights).count()
+    left = sum(Flight.objects.filter(pk__in=[f.pk for f in flights]).values_list('economy_seats', flat=True))
+    result = summarize(latencies, elapsed)
+    result.update({
+        'threads': threads,
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        'booked': booked,
+        'oversold': booked + left - seats * hot_flights != 0 or left < 0,
+    })
+    return result
+
+
+def main():
+    from . import setup_django, cleanup
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=800)
+    parser.add_argument('--seats', type=int, default=300)
+    args = parser.parse_args()
+
+    db_name = setup_django()
+    print(json.dumps(run(args.threads, args.requests, args.seats), indent=2))
+    cleanup(db_name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""限流与过载保护：
+- 一个 IP 连续请求搜索接口（模拟抓取），统计放行/429 数量，同时另一个 IP 的正常请求不受影响
+- 令牌桶检查本身的开销（进程内 / 缓存）
+- 过载保护：慢视图 + 多线程并发，统计因并发数超限和 p95 超限返回 503 的比例
+
+    python -m benchmarks.throttling --requests 500 --threads 32
+"""
+import argparse
+import json
+import threading
+import time
+
+from .stats import measure
+
+
+def scraper(requests):
+    from django.conf import settings
+    from rest_framework.test import APIClient
+
+    settings.THROTTLE_BUCKETS = {'search': (60, 10), 'booking': (20, 2), 'admin': (10, 0.5)}
+    scraper_client = APIClient(REMOTE_ADDR='203.0.113.7')
+    normal_client = APIClient(REMOTE_ADDR='198.51.100.20')
+    statuses = {}
+    retry_after = set()
+    normal = {}
+    started = time.perf_counter()
+    for i in range(requests):
+        response = scraper_client.get('/flights/search/', {'departure_city': 'Beijing', 'arrival_city': 'Shanghai'})
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        if response.status_code == 429:
+            retry_after.add(response['Retry-After'])
+        if i % 50 == 0:
+            code = normal_client.get('/flights/', {'page_size': 5}).status_code
+            normal[code] = normal.get(code, 0) + 1
+    return {
+        'elapsed_s': round(time.perf_counter() - started, 3),
+        'scraper': statuses,
+        'retry_after_values': sorted(retry_after),
+        'other_client': normal,
+    }
+
+
+def overhead(iterations):
+    from flights.throttling import CacheBuckets, LocalBuckets
+
+    local, shared = LocalBuckets(), CacheBuckets()
+    return {
+        'local_take': measure(lambda i: local.take(f'bench:{i % 1000}', 60, 10), iterations, count_queries=False),
+        'cache_take': measure(lambda i: shared.take(f'bench:{i % 1000}', 60, 10), iterations, count_queries=False),
+    }
+
+
+def shedding(threads, requests_per_thread):
+    from django.http import HttpResponse
+    from django.test import RequestFactory, override_settings
+    from flights.throttling import LoadSheddingMiddleware
+
+    factory = RequestFactory()
+    delay = {'value': 0.05}
+
+    def slow_view(request):
+        time.sleep(delay['value'])
+        return HttpResponse('ok')
+
+    def fire(middleware, method):
+        counts = {}
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(requests_per_thread):
+                request = factory.generic(method, '/flights/search/')
+                code = middleware(request).status_code
+                with lock:
+                    counts[code] = counts.get(code, 0) + 1
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        for t in workers:
+            t.start()
+        for t in workers:
+            t.join()
+        return counts
+
+    # 并发数上限：同时处理的请求数超过 8 个的部分立即返回 503
+    with override_settings(SHED_MAX_IN_FLIGHT=8, SHED_P95_SECONDS=float('inf')):
+        in_flight = fire(LoadSheddingMiddleware(slow_view), 'GET')
+    # p95 上限：视图变慢后只读请求被拒绝，写请求照常处理
+    with override_settings(SHED_MAX_IN_FLIGHT=float('inf'), SHED_P95_SECONDS=0.1):
+        middleware = LoadSheddingMiddleware(slow_view)
+        delay['value'] = 0.2
+        fire(middleware, 'POST')
+        middleware.latency._computed = 0  # 立即重新计算 p95
+        reads, writes = fire(middleware, 'GET'), fire(middleware, 'POST')
+    return {'max_in_flight_8': in_flight, 'p95_over_limit': {'reads': reads, 'writes': writes}}
+
+
+def main():
+    from . import setup_django, cleanup
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    db_name = setup_django()
+    from . import datagen
+    datagen.seed_flights(2000)
+    print(json.dumps({
+        'scraper': scraper(args.requests),
+        'overhead': overhead(args.iterations),
+        'shedding': shedding(args.threads, 4),
+    }, indent=2))
+    cleanup(db_name)
+
+
+if __name__ == '__main__':
+    main()
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flight_service.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# 余票实时推送（/stream/flights/<id>/ 和 /ws/flights/<id>/），见 flights/realtime.py
+from flights.realtime import realtime_application  # noqa: E402  需要在 Django 初始化之后导入
+
+application = realtime_application(django_application)
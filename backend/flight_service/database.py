@@ -0,0 +1,81 @@
+"""数据库配置档：通过环境变量 DB_PROFILE 选择
+
+- sqlite（默认）：WAL 模式，读写互不阻塞，写冲突时按连接的 timeout（20 秒）等待而不是立即报 locked
+- sqlite-rollback：SQLite 默认的回滚日志模式，仅用于性能对比
+- postgres：持久连接 + 连接健康检查，可配合 PgBouncer 等连接池使用
+
+DB_REPLICAS 配置只读副本，由 flights.replicas.ReplicaRouter 分配读请求
+"""
+import os
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # WAL 模式下 NORMAL 已能保证数据库不损坏
+}
+
+
+def database_settings(profile, base_dir):
+    if profile in ('sqlite', 'sqlite-rollback'):
+        config = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', base_dir / 'db.sqlite3'),
+            # 等锁时间只在这里设置（sqlite3 的 timeout 即 busy_timeout），不要再用 PRAGMA busy_timeout 覆盖
+            'OPTIONS': {'timeout': 20},
+            # 测试库用文件而不是内存库：内存库的共享缓存模式下并发写直接报 table is locked，
+            # 多线程并发测试（如幂等键）需要与线上相同的文件锁和等待行为
+            'TEST': {'NAME': base_dir / 'test_db.sqlite3'},
+        }
+        if profile == 'sqlite':
+            config['PRAGMAS'] = dict(SQLITE_PRAGMAS)
+        return config
+
+    if profile == 'postgres':
+        config = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'flight_service'),
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # 持久连接，避免每个请求重新建连
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+        }
+        if os.environ.get('POSTGRES_POOLER') == 'pgbouncer':
+            # PgBouncer 事务级连接池不支持服务端游标
+            config['DISABLE_SERVER_SIDE_CURSORS'] = True
+        return config
+
+    raise ValueError(f'Unknown DB_PROFILE: {profile}')
+
+
+def replica_settings(primary):
+    """只读副本：环境变量 DB_REPLICAS 以逗号分隔，SQLite 为数据库文件路径，PostgreSQL 为 host 或 host:port。
+    副本沿用主库的其他配置，别名依次为 replica1、replica2……；测试时副本指向 default"""
+    replicas = {}
+    locations = [item.strip() for item in os.environ.get('DB_REPLICAS', '').split(',') if item.strip()]
+    for index, location in enumerate(locations, 1):
+        config = dict(primary, TEST={'MIRROR': 'default'})
+        if config['ENGINE'].endswith('sqlite3'):
+            config['NAME'] = location
+        else:
+            host, _, port = location.partition(':')
+            config['HOST'] = host
+            if port:
+                config['PORT'] = port
+        replicas[f'replica{index}'] = config
+    return replicas
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """每个新的 SQLite 连接建立后设置 PRAGMA"""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS') or {}
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
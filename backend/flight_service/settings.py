@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .database import database_settings, replica_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +46,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'flights.throttling.LoadSheddingMiddleware',  # 过载时直接返回 503，放在最前面，被拒绝的请求开销最小
+    'flights.instrumentation.PerformanceMiddleware',  # 请求耗时/SQL统计，Server-Timing 与 /metrics
+    'flights.replicas.ReplicaMiddleware',  # 读写分离：每个请求的数据库路由状态
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,12 +82,19 @@ WSGI_APPLICATION = 'flight_service.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# 通过 DB_PROFILE 选择数据库配置档，见 flight_service/database.py
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_settings(DB_PROFILE, BASE_DIR),
 }
+# 只读副本（DB_REPLICAS），查询类接口和管理端报表读副本，见 flights/replicas.py
+DATABASES.update(replica_settings(DATABASES['default']))
+DATABASE_ROUTERS = ['flights.replicas.ReplicaRouter']
+# 用户写入后多少秒内该用户的读取仍走主库（读到自己的写入）；多进程部署需配置共享缓存 CACHE_URL
+REPLICA_STICKY_SECONDS = 5
+# 从副本读到的数据最多缓存多少秒（副本可能落后，不按完整的缓存时间保存）
+REPLICA_CACHE_TIMEOUT = 5
 
 
 # Password validation
@@ -117,6 +130,99 @@ USE_TZ = True
 ADMIN_USERNAME = 'admin'
 ADMIN_PASSWORD = '123456'
 
+# 缓存：设置 CACHE_URL=redis://host:6379/0 时使用 Redis，否则使用进程内存缓存
+CACHE_URL = os.environ.get('CACHE_URL', '')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'flight-service',
+            # 默认只保留 300 条，航班读缓存和按航班+舱位的报价缓存很快就会被淘汰
+            'OPTIONS': {'MAX_ENTRIES': 20000},
+        }
+    }
+
+# 认证缓存：条目数、有效期（秒）；签名令牌有效期（秒）
+AUTH_CACHE_SIZE = 10000
+AUTH_CACHE_TTL = 60
+SIGNED_TOKEN_MAX_AGE = 300
+
+# 航班详情/列表读缓存时间（秒），不超过页面上最早的航班距起飞的秒数
+FLIGHT_CACHE_TIMEOUT = 300
+
+# 航班搜索结果缓存时间（秒）与单页最大条数
+FLIGHT_SEARCH_CACHE_TIMEOUT = 60
+FLIGHT_SEARCH_MAX_PAGE_SIZE = 100
+
+# 动态票价（flights/pricing.py）：上座率档位 (上座率下限, 倍率)、距起飞时间档位 (天数上限, 倍率)，
+# 报价缓存时间（秒）；库存变化时报价缓存立即失效
+FARE_LOAD_FACTOR_TIERS = ((0.9, '1.50'), (0.75, '1.25'), (0.5, '1.10'))
+FARE_DEPARTURE_TIERS = ((1, '1.30'), (7, '1.15'))
+FARE_QUOTE_TIMEOUT = 60
+
+# 航班起飞多少天后由 python manage.py archive_flights 移入归档表
+FLIGHT_ARCHIVE_AFTER_DAYS = 1
+
+# 幂等键（Idempotency-Key 请求头）保存时间（秒），以及处理中的记录多久后视为请求已中断可以重新抢占
+IDEMPOTENCY_KEY_TTL = 86400
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# 中转航线搜索：最短/最长中转时间，单次搜索最多展开的航段数
+ROUTE_MIN_CONNECTION_MINUTES = 45
+ROUTE_MAX_CONNECTION_HOURS = 12
+ROUTE_MAX_EXPANSIONS = 50000
+
+# 余票实时推送（flights/realtime.py）：消息代理类，同一航班变化的合并窗口（毫秒），
+# SSE 心跳间隔（秒），每个连接最多积压的消息数，每个客户端 IP 最多的连接数，每个航班最多的订阅数
+REALTIME_BROKER = 'flights.realtime.InProcessBroker'
+REALTIME_DEBOUNCE_MS = 200
+REALTIME_HEARTBEAT_SECONDS = 15
+REALTIME_QUEUE_SIZE = 16
+REALTIME_MAX_STREAMS_PER_CLIENT = 8
+REALTIME_MAX_SUBSCRIBERS_PER_FLIGHT = 5000
+
+# 令牌桶限流（flights/throttling.py）：作用域 -> (桶容量, 每秒补充令牌数)，登录用户按用户、匿名请求按 IP 计数。
+# 配置了共享缓存（CACHE_URL）时桶状态放在缓存中由多个进程共享，否则保存在进程内
+THROTTLE_BUCKETS = {
+    'search': (60, 10),
+    'booking': (20, 2),
+    'admin': (10, 0.5),
+    'auth': (5, 0.1),  # 登录/注册：防暴力破解，连续 5 次后每 10 秒一次
+}
+# 这些作用域总是按客户端 IP 计数（即使请求带有登录凭据），否则换个账号就能绕过
+THROTTLE_ANONYMOUS_SCOPES = ('auth',)
+THROTTLE_SHARED = bool(CACHE_URL)
+THROTTLE_LOCAL_MAX_ENTRIES = 100000
+
+# 过载保护：进程内同时处理的请求超过 SHED_MAX_IN_FLIGHT 个时返回 503；最近 SHED_WINDOW_SECONDS 秒的
+# p95 延迟超过 SHED_P95_SECONDS 秒时拒绝只读请求。Retry-After 为 SHED_RETRY_AFTER 秒
+SHED_MAX_IN_FLIGHT = 64
+SHED_P95_SECONDS = 2.0
+SHED_WINDOW_SECONDS = 10
+SHED_RETRY_AFTER = 2
+
+# 批量预订接口单次请求最多条目数
+BULK_BOOKING_MAX_ITEMS = 500
+
+# 管理端流式导出每次从数据库读取的行数
+BOOKING_EXPORT_CHUNK_SIZE = 2000
+
+# 排队预订模式：BOOKING_QUEUE_MODE=1 时创建预订只写入 pending 记录并返回 202，
+# 由 python manage.py process_booking_queue 分批确认
+BOOKING_QUEUE_MODE = os.environ.get('BOOKING_QUEUE_MODE', '') == '1'
+BOOKING_QUEUE_BATCH_SIZE = 200
+# 查询预订状态时长轮询的最长等待秒数：异步接口 /async/bookings/<id>/status/ 等待时不占线程，可以等得久一些；
+# 同步接口每个等待中的请求都占住一个 worker，只允许短暂等待
+BOOKING_STATUS_MAX_WAIT = 30
+BOOKING_STATUS_SYNC_MAX_WAIT = 3
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/4.1/howto/static-files/
 
@@ -132,13 +238,22 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',  # 添加
+        'flights.authentication.CachedTokenAuthentication',  # 带缓存的 Token 认证
+        'flights.authentication.SignedTokenAuthentication',  # 签名令牌，不查数据库
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        'flights.authentication.CachedBasicAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',  # 修改
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_RENDERER_CLASSES': [
+        'flights.renderers.TimedJSONRenderer',
+        'flights.renderers.FastJSONRenderer',  # Accept: application/vnd.flights.fast+json 或 ?format=fast
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # 游标分页，按视图的 keyset_field + id 排序，见 flights/pagination.py
+    'DEFAULT_PAGINATION_CLASS': 'flights.pagination.KeysetPagination',
+    # 按视图 throttle_scope / throttle_scopes 的令牌桶限流，见 flights/throttling.py
+    'DEFAULT_THROTTLE_CLASSES': ['flights.throttling.TokenBucketThrottle'],
     'PAGE_SIZE': 20
 }
@@ -3,8 +3,10 @@ URL configuration for flight_service project.
 """
 from django.contrib import admin
 from django.urls import path, include
+from flights.instrumentation import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('', include('flights.urls')),
 ]
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""销售分析：按航班、航线、航空公司、起飞日期统计收入、售出座位数和上座率。
+
+SalesRollup 每个航班+舱位一行，由本模块维护：
+- 预订确认、取消（同步、批量、排队确认）时在同一事务内按增量更新该舱位的汇总：一条
+  UPDATE ... SET seats_sold = seats_sold + n, revenue = revenue + amount，不额外开写事务、不重新聚合；
+  汇总行不存在（不触发信号写入的航班）时只重算该舱位，避免把同一事务内尚未记入增量的其他舱位重复统计
+- 航班增改时重算该航班的汇总：一条按舱位分组的聚合查询，写入绝对值
+- 删除航班时删除其汇总；归档（不触发信号）保留汇总，历史数据仍可统计
+- 批量导入等不触发信号的写入之后用 python manage.py rebuild_sales_rollup 重建
+报表只读汇总表，在日期范围上用数据库 Sum 聚合，耗时与预订数量无关。
+收入取预订锁定的总价（见 models.total_price_expression），只统计已确认的预订；
+运力取座位图容量，没有座位图时为剩余座位 + 已售座位。
+"""
+from datetime import datetime, timedelta
+
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .inventory import SEAT_FIELDS
+from .models import Flight, Booking, SeatMap, SalesRollup, ArchivedFlight, ArchivedBooking, total_price_expression
+
+FLIGHT_FIELDS = (
+    'id', 'flight_number', 'departure_time', 'departure_city_key', 'arrival_city_key', 'airline',
+    *SEAT_FIELDS.values(),
+)
+UPDATE_FIELDS = [
+    'flight_number', 'date', 'departure_city_key', 'arrival_city_key', 'airline',
+    'capacity', 'seats_sold', 'booking_count', 'revenue', 'updated_at',
+]
+
+# 分组方式 -> 分组字段、排序
+GROUPS = {
+    'flight': (('flight_id', 'flight_number', 'date', 'departure_city_key', 'arrival_city_key', 'airline'),
+               ('date', 'flight_number')),
+    'route': (('departure_city_key', 'arrival_city_key'), ('-total_revenue', 'departure_city_key', 'arrival_city_key')),
+    'airline': (('airline',), ('-total_revenue', 'airline')),
+    'day': (('date',), ('date',)),
+}
+MAX_RANGE_DAYS = 366
+MAX_LIMIT = 1000
+
+
+def _sold(bookings):
+    """已确认预订按 (航班, 舱位) 聚合：座位数、预订数、收入"""
+    rows = (
+        bookings.filter(status='confirmed')
+        .annotate(price=total_price_expression())
+        .values('flight_id', 'seat_class')
+        .annotate(seats_sold=Sum('seat_count'), booking_count=Count('id'), revenue=Sum('price'))
+        .order_by()
+    )
+    return {(row['flight_id'], row['seat_class']): row for row in rows}
+
+
+def _collect(flight_model, booking_model, flight_ids, seat_maps=True):
+    """读取一批航班的销售数据，返回待写入的 SalesRollup 行"""
+    flights = flight_model.objects.filter(id__in=flight_ids).values(*FLIGHT_FIELDS)
+    sold = _sold(booking_model.objects.filter(flight_id__in=flight_ids))
+    capacities = {}
+    if seat_maps:
+        capacities = {
+            (flight_id, seat_class): capacity
+            for flight_id, seat_class, capacity in SeatMap.objects.filter(flight_id__in=flight_ids)
+            .values_list('flight_id', 'seat_class', 'capacity')
+        }
+    rows = []
+    for flight in flights:
+        for seat_class, field in SEAT_FIELDS.items():
+            totals = sold.get((flight['id'], seat_class), {})
+            seats_sold = totals.get('seats_sold') or 0
+            capacity = capacities.get((flight['id'], seat_class))
+            rows.append(SalesRollup(
+                flight_id=flight['id'],
+                seat_class=seat_class,
+                flight_number=flight['flight_number'],
+                date=timezone.localdate(flight['departure_time']),
+                departure_city_key=flight['departure_city_key'],
+                arrival_city_key=flight['arrival_city_key'],
+                airline=flight['airline'],
+                capacity=flight[field] + seats_sold if capacity is None else capacity,
+                seats_sold=seats_sold,
+                booking_count=totals.get('booking_count') or 0,
+                revenue=totals.get('revenue') or 0,
+            ))
+    return rows
+
+
+def _write(rows):
+    return len(SalesRollup.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['flight_id', 'seat_class'],
+        update_fields=UPDATE_FIELDS,
+    ))
+
+
+def refresh_flight_sales(flight_id, seat_class=None):
+    """重算一个航班各舱位（或指定舱位）的汇总；航班已归档或删除时不处理"""
+    rows = _collect(Flight, Booking, [flight_id])
+    if seat_class is not None:
+        rows = [row for row in rows if row.seat_class == seat_class]
+    _write(rows)
+
+
+def record_sales(flight_id, seat_class, seats, bookings, revenue):
+    """按增量更新一个舱位的汇总，在预订/取消的事务内调用（取消时各参数为负数）"""
+    updated = SalesRollup.objects.filter(flight_id=flight_id, seat_class=seat_class).update(
+        seats_sold=F('seats_sold') + seats,
+        booking_count=F('booking_count') + bookings,
+        revenue=F('revenue') + revenue,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        refresh_flight_sales(flight_id, seat_class)
+
+
+def delete_flight_sales(flight_id):
+    SalesRollup.objects.filter(flight_id=flight_id).delete()
+
+
+def rebuild_sales_rollup(batch_size=1000, start=None, end=None, archived=False):
+    """按批重建 [start, end) 起飞的航班的汇总，返回写入行数；archived=True 时同时重建归档航班"""
+    sources = [(Flight, Booking, True)]
+    if archived:
+        sources.append((ArchivedFlight, ArchivedBooking, False))
+    written = 0
+    for flight_model, booking_model, seat_maps in sources:
+        flights = flight_model.objects.all()
+        if start is not None:
+            flights = flights.filter(departure_time__gte=_day_start(start))
+        if end is not None:
+            flights = flights.filter(departure_time__lt=_day_start(end))
+        flight_ids = list(flights.order_by('id').values_list('id', flat=True))
+        for offset in range(0, len(flight_ids), batch_size):
+            written += _write(_collect(flight_model, booking_model, flight_ids[offset:offset + batch_size], seat_maps))
+
+    # 航班已不存在（删除而不是归档）的汇总
+    stale = SalesRollup.objects.exclude(flight_id__in=Flight.objects.values('id')).exclude(
+        flight_id__in=ArchivedFlight.objects.values('id'))
+    if start is not None:
+        stale = stale.filter(date__gte=start)
+    if end is not None:
+        stale = stale.filter(date__lt=end)
+    stale.delete()
+    return written
+
+
+def _day_start(date):
+    return timezone.make_aware(datetime.combine(date, datetime.min.time()))
+
+
+def default_range():
+    """默认统计范围：过去 30 天到未来 90 天起飞的航班"""
+    today = timezone.localdate()
+    return today - timedelta(days=30), today + timedelta(days=90)
+
+
+def _metrics(row):
+    capacity = row['total_capacity'] or 0
+    seats_sold = row['total_seats_sold'] or 0
+    return {
+        'revenue': f"{row['total_revenue'] or 0:.2f}",
+        'seats_sold': seats_sold,
+        'capacity': capacity,
+        'load_factor': round(seats_sold / capacity, 4) if capacity else None,
+        'bookings': row['total_bookings'] or 0,
+        'flights': row['flight_count'],
+    }
+
+
+def sales_report(group_by, start, end, seat_class=None, airline=None, departure_key=None, arrival_key=None,
+                 limit=None):
+    """按 group_by 分组的销售报表，两条查询（分组 + 合计），只访问 SalesRollup"""
+    fields, ordering = GROUPS[group_by]
+    rows = SalesRollup.objects.filter(date__gte=start, date__lt=end)
+    if seat_class:
+        rows = rows.filter(seat_class=seat_class)
+    if airline:
+        rows = rows.filter(airline=airline)
+    if departure_key:
+        rows = rows.filter(departure_city_key=departure_key)
+    if arrival_key:
+        rows = rows.filter(arrival_city_key=arrival_key)
+    aggregates = {
+        'total_revenue': Sum('revenue'),
+        'total_seats_sold': Sum('seats_sold'),
+        'total_capacity': Sum('capacity'),
+        'total_bookings': Sum('booking_count'),
+        'flight_count': Count('flight_id', distinct=True),
+    }
+    groups = rows.values(*fields).annotate(**aggregates).order_by(*ordering)[:limit or MAX_LIMIT]
+    results = []
+    for row in groups:
+        item = {field: row[field] for field in fields}
+        if 'date' in item:
+            item['date'] = item['date'].isoformat()
+        item.update(_metrics(row))
+        results.append(item)
+    return {
+        'group_by': group_by,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'totals': _metrics(rows.aggregate(**aggregates)),
+        'results': results,
+    }
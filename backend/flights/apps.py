@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class FlightsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'flights'
+
+    def ready(self):
+        from . import signals, instrumentation, authentication  # noqa: F401  注册信号处理函数
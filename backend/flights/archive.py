@@ -0,0 +1,90 @@
+"""已起飞航班归档：把航班及其预订分批移入 ArchivedFlight / ArchivedBooking，保持热表只有在售数据。
+
+每批一个短事务：先用空 UPDATE 锁住这批航班，用 INSERT ... SELECT 复制到归档表，再删除原航班、预订和座位图。
+批量删除不触发模型信号，每批提交后统一使缓存失效；过去日期的余票汇总在全部归档后一次删除。
+"""
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import DateTimeField, Value
+from django.utils import timezone
+
+from .caching import invalidate_flight
+from .models import Flight, Booking, SeatMap, RouteAvailability, ArchivedFlight, ArchivedBooking
+from .routing import reset_route_graph
+from .search import invalidate_search_cache
+
+FLIGHT_COLUMNS = [field.attname for field in Flight._meta.concrete_fields]
+BOOKING_COLUMNS = [field.attname for field in Booking._meta.concrete_fields]
+
+ArchiveResult = namedtuple('ArchiveResult', ['flights', 'bookings', 'batches'])
+
+
+def archive_cutoff(days=None):
+    """起飞时间早于此时刻的航班可以归档"""
+    if days is None:
+        days = getattr(settings, 'FLIGHT_ARCHIVE_AFTER_DAYS', 1)
+    return timezone.now() - timedelta(days=days)
+
+
+def _copy_rows(queryset, model, columns, archived_at):
+    """INSERT INTO 归档表 (...) SELECT ...：在数据库内复制，不把整批数据读进 Python 再写回"""
+    select, params = (
+        queryset.annotate(archived_value=Value(archived_at, output_field=DateTimeField()))
+        .values_list(*columns, 'archived_value')
+        .query.sql_with_params()
+    )
+    quote = connection.ops.quote_name
+    targets = ', '.join(quote(model._meta.get_field(name).column) for name in [*columns, 'archived_at'])
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {quote(model._meta.db_table)} ({targets}) {select}', params)
+        return cursor.rowcount
+
+
+def archive_batch(flight_ids):
+    """归档一批航班，返回归档的预订数"""
+    archived_at = timezone.now()
+    with transaction.atomic():
+        flights = Flight.objects.filter(id__in=flight_ids)
+        # 先取得写锁再复制，SQLite 上避免先读后写的锁升级失败，PostgreSQL 上挡住并发修改
+        flights.lock()
+        bookings = Booking.objects.filter(flight_id__in=flight_ids)
+        _copy_rows(flights, ArchivedFlight, FLIGHT_COLUMNS, archived_at)
+        archived = _copy_rows(bookings, ArchivedBooking, BOOKING_COLUMNS, archived_at)
+
+        # Booking、SeatMap 没有信号接收器，delete() 直接执行一条 DELETE；
+        # 航班删除绕过 post_delete，避免逐个航班重算余票汇总，缓存在提交后统一失效
+        bookings.delete()
+        SeatMap.objects.filter(flight_id__in=flight_ids).delete()
+        flights._raw_delete(flights.db)
+
+    for flight_id in flight_ids:
+        invalidate_flight(flight_id)
+    invalidate_search_cache()
+    return archived
+
+
+def archive_flights(before=None, batch_size=500, pause=0, limit=None):
+    """按起飞时间顺序分批归档 before 之前起飞的航班；pause 为两批之间让出数据库的秒数"""
+    before = before or archive_cutoff()
+    flights = bookings = batches = 0
+    while limit is None or flights < limit:
+        size = batch_size if limit is None else min(batch_size, limit - flights)
+        flight_ids = list(
+            Flight.objects.departed(before).order_by('departure_time', 'id').values_list('id', flat=True)[:size])
+        if not flight_ids:
+            break
+        bookings += archive_batch(flight_ids)
+        flights += len(flight_ids)
+        batches += 1
+        if pause:
+            time.sleep(pause)
+
+    # 过去日期的余票汇总不会再被低价日历读取；航线图全量重建，释放已归档航班占用的内存
+    RouteAvailability.objects.filter(date__lt=timezone.localdate(before)).delete()
+    if flights:
+        reset_route_graph()
+    return ArchiveResult(flights, bookings, batches)
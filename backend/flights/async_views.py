@@ -0,0 +1,286 @@
+"""热点接口的异步版本（需通过 ASGI 服务器运行，如 uvicorn flight_service.asgi:application）
+
+读操作使用 Django 异步 ORM；预订/取消需要事务，放到线程池中执行（thread_sensitive=False），
+锁等待不会占住事件循环，也不会排在其他请求后面。
+异步接口支持 Token 认证（Authorization: Token <key>）和签名令牌（Authorization: Bearer <token>）
+"""
+import asyncio
+import json
+import math
+import time
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import JsonResponse, HttpResponseNotAllowed
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.utils.encoders import JSONEncoder
+
+from .authentication import cached_token_user, token_cache, load_signed_token
+from .booking import CANCELED, BookingError, create_booking, enqueue_booking, cancel_booking
+from .idempotency import (
+    HEADER as IDEMPOTENCY_HEADER, REPLAYED_HEADER, IdempotencyError, execute as execute_idempotent,
+    request_fingerprint,
+)
+from .inventory import SEAT_FIELDS
+from .models import Flight, Booking, SeatMap
+from .queue import booking_status as status_payload
+from .search import FlightSearchEngine
+from .seatmap import seat_map_summary
+from .replicas import set_request_user
+from .serializers import FlightSerializer, BookingSerializer
+from .throttling import request_ident, throttle_wait
+
+
+def _json(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(data, status=status_code, safe=False, encoder=JSONEncoder,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def _error(message, status_code=status.HTTP_400_BAD_REQUEST):
+    return _json({'error': message}, status_code)
+
+
+async def _authenticate(request):
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    key = key.strip()
+    if not key:
+        return None
+    if keyword == 'Bearer':
+        # 签名令牌只校验签名，不查数据库
+        try:
+            return load_signed_token(key)
+        except AuthenticationFailed:
+            return None
+    if keyword != 'Token':
+        return None
+    cached = cached_token_user(key)
+    if cached is not None:
+        return cached[0]
+    try:
+        token = await Token.objects.select_related('user').aget(key=key)
+    except Token.DoesNotExist:
+        return None
+    if not token.user.is_active:
+        return None
+    token_cache.set(key, (token.user, token))
+    return token.user
+
+
+def _throttled(request, scope, user=None):
+    """与 DRF 视图共用令牌桶，超出限额时返回 429 响应"""
+    wait = throttle_wait(scope, request_ident(request, user))
+    if not wait:
+        return None
+    response = _error('Request was throttled.', status.HTTP_429_TOO_MANY_REQUESTS)
+    response['Retry-After'] = str(math.ceil(wait))
+    return response
+
+
+def _in_pool(func):
+    """在线程池中执行需要事务的同步代码，每个线程使用自己的数据库连接"""
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+
+def _create_booking(user, data):
+    return BookingSerializer(create_booking(user, data)).data
+
+
+def _enqueue_booking(user, data):
+    return BookingSerializer(enqueue_booking(user, data)).data
+
+
+def _cancel_booking(booking):
+    cancel_booking(booking)
+
+
+async def _respond(request, user, data, func):
+    """func() 返回 (状态码, 响应数据)；请求带 Idempotency-Key 时按幂等键规则执行或重放"""
+    set_request_user(user.pk)
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key:
+        status_code, body = await _in_pool(func)()
+        return _json(body, status_code)
+    fingerprint = request_fingerprint(request.method, request.path, data)
+    try:
+        status_code, body, replayed = await _in_pool(execute_idempotent)(user.pk, key, fingerprint, func)
+    except IdempotencyError as exc:
+        response = _error(exc.message, exc.status_code)
+        if exc.retry_after is not None:
+            response['Retry-After'] = str(exc.retry_after)
+        return response
+    response = _json(body, status_code)
+    if replayed:
+        response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+async def flight_search(request):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    throttled = _throttled(request, 'search')
+    if throttled is not None:
+        return throttled
+    params = request.GET
+    try:
+        page = await FlightSearchEngine().asearch(
+            departure_city=params.get('departure_city'),
+            arrival_city=params.get('arrival_city') or params.get('destination_city'),
+            departure_date=params.get('departure_date'),
+            cursor=params.get('cursor'),
+            page_size=params.get('page_size'),
+        )
+    except ValueError as exc:
+        return _error(str(exc))
+
+    next_url = None
+    if page.next_cursor:
+        query = params.copy()
+        query['cursor'] = page.next_cursor
+        next_url = request.build_absolute_uri(f'{request.path}?{query.urlencode()}')
+    return _json({'next': next_url, 'results': FlightSerializer(page.flights, many=True).data})
+
+
+async def flight_detail(request, pk):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    throttled = _throttled(request, 'search')
+    if throttled is not None:
+        return throttled
+    try:
+        flight = await Flight.objects.live().aget(pk=pk)
+    except Flight.DoesNotExist:
+        return _error('Flight not found.', status.HTTP_404_NOT_FOUND)
+    return _json(FlightSerializer(flight).data)
+
+
+async def booking_create(request):
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    user = await _authenticate(request)
+    if user is None:
+        return _error('Authentication credentials were not provided.', status.HTTP_401_UNAUTHORIZED)
+    throttled = _throttled(request, 'booking', user)
+    if throttled is not None:
+        return throttled
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return _error('Invalid JSON body.')
+    if not isinstance(data, dict):
+        return _error('Invalid JSON body.')
+
+    # 排队模式下只写入待确认预订并返回 202
+    queued = getattr(settings, 'BOOKING_QUEUE_MODE', False)
+
+    def create():
+        try:
+            if queued:
+                return status.HTTP_202_ACCEPTED, _enqueue_booking(user, data)
+            return status.HTTP_201_CREATED, _create_booking(user, data)
+        except BookingError as exc:
+            return exc.status_code, {'error': exc.message}
+    return await _respond(request, user, data, create)
+
+
+async def booking_status(request, pk):
+    """长轮询预订状态：等待期间只占用事件循环中的一个协程，不占线程"""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    user = await _authenticate(request)
+    if user is None:
+        return _error('Authentication credentials were not provided.', status.HTTP_401_UNAUTHORIZED)
+    try:
+        wait = float(request.GET.get('wait', 0))
+    except ValueError:
+        return _error('Invalid wait.')
+    # nan 会让截止时间永远达不到，协程一直轮询数据库
+    if not math.isfinite(wait):
+        return _error('Invalid wait.')
+    wait = max(0, min(wait, getattr(settings, 'BOOKING_STATUS_MAX_WAIT', 30)))
+
+    deadline = time.monotonic() + wait
+    queryset = Booking.objects.filter(pk=pk, user=user).only('id', 'status', 'status_reason', 'seat_numbers')
+    while True:
+        booking = await queryset.afirst()
+        if booking is None:
+            return _error('Booking not found.', status.HTTP_404_NOT_FOUND)
+        if booking.status != 'pending' or time.monotonic() >= deadline:
+            return _json(status_payload(booking))
+        await asyncio.sleep(0.2)
+
+
+async def booking_cancel(request, pk):
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    user = await _authenticate(request)
+    if user is None:
+        return _error('Authentication credentials were not provided.', status.HTTP_401_UNAUTHORIZED)
+    throttled = _throttled(request, 'booking', user)
+    if throttled is not None:
+        return throttled
+
+    def cancel():
+        # 在线程池中查询预订：带幂等键的重试先重放结果，已取消（已删除）的预订不会返回 404
+        booking = Booking.objects.select_related('flight').filter(pk=pk, user=user).first()
+        if booking is None:
+            return status.HTTP_404_NOT_FOUND, {'error': 'Booking not found.'}
+        try:
+            _cancel_booking(booking)
+        except BookingError as exc:
+            return exc.status_code, {'error': exc.message}
+        return status.HTTP_200_OK, CANCELED
+    return await _respond(request, user, None, cancel)
+
+
+async def empty_seats(request):
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    throttled = _throttled(request, 'search')
+    if throttled is not None:
+        return throttled
+    flight_number = request.GET.get('flight_number')
+    departure_date = request.GET.get('departure_date')
+    if not flight_number or not departure_date:
+        return _error('Missing flight_number or departure_date.', status.HTTP_200_OK)
+    date = parse_date(departure_date)
+    if date is None:
+        return _error('Invalid departure date.')
+
+    start = timezone.make_aware(datetime.combine(date, datetime.min.time()))
+    flight = await Flight.objects.filter(
+        flight_number=flight_number,
+        departure_time__gte=start,
+        departure_time__lt=start + timedelta(days=1),
+    ).afirst()
+    if flight is None:
+        return _error('No matching flight found.', status.HTTP_200_OK)
+
+    seat_maps = [seat_map async for seat_map in SeatMap.objects.filter(flight=flight)]
+    if len(seat_maps) < len(SEAT_FIELDS):
+        # 缺少座位图时需要查询预订在内存中计算，走同步代码
+        seat_classes = await sync_to_async(seat_map_summary)(flight, seat_maps)
+    else:
+        seat_classes = seat_map_summary(flight, seat_maps)
+    return _json({
+        'flight_number': flight.flight_number,
+        'departure_date': departure_date,
+        'seats_left': sum(c['seats_left'] for c in seat_classes.values()),
+        'seat_classes': seat_classes,
+    })
+
+
+# 使用 Token 认证，不需要 CSRF 校验（csrf_exempt 装饰器在 Django 4.1 中不支持异步视图）
+booking_create.csrf_exempt = True
+booking_cancel.csrf_exempt = True
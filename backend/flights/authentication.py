@@ -0,0 +1,193 @@
+"""认证加速：
+
+- CachedTokenAuthentication：token -> 用户 的结果放在进程内 LRU 缓存（带过期时间），登出/删除 token 时失效
+- CachedBasicAuthentication：缓存用户名密码校验结果，避免每个请求都做一次 PBKDF2
+- SignedTokenAuthentication：短期有效的签名令牌（Authorization: Bearer <token>），校验时不查数据库
+
+缓存在进程内，多进程部署时其他进程的缓存最多在 AUTH_CACHE_TTL 秒后过期。
+"""
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication, BasicAuthentication, TokenAuthentication, get_authorization_header,
+)
+from rest_framework.authtoken.models import Token
+
+SIGNED_TOKEN_SALT = 'flights.signed-token'
+SIGNED_USER_FIELDS = ('id', 'username', 'is_active', 'is_staff', 'is_superuser')
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存，条目超过 ttl 秒后失效；owner(value) 返回条目所属的用户 id，
+    按用户维护键的索引，清除某个用户的缓存只处理该用户的条目"""
+
+    def __init__(self, maxsize, ttl, owner):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.owner = owner
+        self.data = OrderedDict()
+        self.owners = {}  # 用户 id -> 键集合
+        self.lock = threading.Lock()
+
+    def _pop(self, key):
+        item = self.data.pop(key, None)
+        if item is not None:
+            owner = self.owner(item[0])
+            keys = self.owners.get(owner)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.owners[owner]
+
+    def get(self, key):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                self._pop(key)
+                return None
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self._pop(key)
+            self.data[key] = (value, time.monotonic() + self.ttl)
+            self.owners.setdefault(self.owner(value), set()).add(key)
+            while len(self.data) > self.maxsize:
+                self._pop(next(iter(self.data)))
+
+    def delete(self, key):
+        with self.lock:
+            self._pop(key)
+
+    def delete_owner(self, owner):
+        with self.lock:
+            for key in list(self.owners.get(owner, ())):
+                self._pop(key)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+            self.owners.clear()
+
+
+def _cache_options():
+    return getattr(settings, 'AUTH_CACHE_SIZE', 10000), getattr(settings, 'AUTH_CACHE_TTL', 60)
+
+
+token_cache = LRUCache(*_cache_options(), owner=lambda value: value[0].pk)  # (user, token)
+basic_cache = LRUCache(*_cache_options(), owner=lambda user: user.pk)
+
+
+def cached_token_user(key):
+    """缓存中的 (user, token)，未命中返回 None"""
+    return token_cache.get(key)
+
+
+def invalidate_token(key):
+    token_cache.delete(key)
+
+
+def invalidate_user(user_id):
+    token_cache.delete_owner(user_id)
+    basic_cache.delete_owner(user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, (user, token))
+        return user, token
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    def authenticate_credentials(self, userid, password, request=None):
+        # 缓存键是用户名+密码的 HMAC，不在内存中保存明文密码
+        digest = hmac.new(settings.SECRET_KEY.encode(), f'{userid}\0{password}'.encode(),
+                          hashlib.sha256).hexdigest()
+        user = basic_cache.get(digest)
+        if user is not None:
+            return user, None
+        user, auth = super().authenticate_credentials(userid, password, request)
+        basic_cache.set(digest, user)
+        return user, auth
+
+
+def issue_signed_token(user):
+    """签发短期有效的签名令牌，载荷中带上构造用户对象需要的字段"""
+    payload = [getattr(user, name) for name in SIGNED_USER_FIELDS]
+    return signing.dumps(payload, salt=SIGNED_TOKEN_SALT, compress=True)
+
+
+def load_signed_token(value):
+    """校验签名令牌，返回只加载了部分字段的用户对象（其余字段访问时才查库，save() 也只更新已加载字段）"""
+    max_age = getattr(settings, 'SIGNED_TOKEN_MAX_AGE', 300)
+    try:
+        payload = signing.loads(value, salt=SIGNED_TOKEN_SALT, max_age=max_age)
+    except signing.SignatureExpired:
+        raise exceptions.AuthenticationFailed('Signed token expired.')
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed('Invalid signed token.')
+    # from_db 要求取值按模型字段顺序排列
+    values = dict(zip(SIGNED_USER_FIELDS, payload))
+    names = [f.attname for f in User._meta.concrete_fields if f.attname in values]
+    user = User.from_db('default', names, [values[name] for name in names])
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed('User inactive or deleted.')
+    return user
+
+
+def reload_signed_user(user):
+    """用签名令牌换取新令牌时重新查库：已停用、已删除或已登出（token 被删除）的用户不能续期，
+    否则旧令牌可以无限续期下去"""
+    user = (
+        User.objects.filter(pk=user.pk, is_active=True, auth_token__isnull=False)
+        .only(*SIGNED_USER_FIELDS).first()
+    )
+    if user is None:
+        raise exceptions.AuthenticationFailed('User inactive, deleted or logged out.')
+    return user
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed('Invalid signed token header.')
+        return load_signed_token(auth[1].decode()), None
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    """登出时删除 token，同时清掉缓存"""
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """用户被修改（改密码、停用等）后清掉该用户的缓存"""
+    invalidate_user(instance.pk)
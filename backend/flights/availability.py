@@ -0,0 +1,159 @@
+"""航线余票汇总表（RouteAvailability）的维护与查询。
+
+按 (出发城市, 到达城市, 日期, 舱位) 汇总：有余票航班中的最低价、剩余座位数、航班数。
+座位变化（inventory_changed）和航班增删改时只重算受影响的那一天，一次聚合查询走 flight_route_time_idx；
+bulk_create/update 等不触发信号的批量写入之后用 python manage.py rebuild_availability 全量重建。
+"""
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .inventory import SEAT_FIELDS
+from .models import Flight, RouteAvailability
+
+# 舱位 -> Flight 上对应的价格字段
+PRICE_FIELDS = {
+    'economy': 'economy_price',
+    'business': 'business_price',
+    'first': 'first_price',
+}
+
+UPDATE_FIELDS = ['min_price', 'seats_left', 'flight_count', 'updated_at']
+
+
+def _aggregates():
+    aggregates = {'flight_count': Count('id')}
+    for seat_class, field in SEAT_FIELDS.items():
+        aggregates[f'{seat_class}_seats_left'] = Sum(field)
+        aggregates[f'{seat_class}_min_price'] = Min(PRICE_FIELDS[seat_class], filter=Q(**{f'{field}__gt': 0}))
+    return aggregates
+
+
+def _rows(departure_key, arrival_key, date, totals):
+    return [
+        RouteAvailability(
+            departure_city_key=departure_key,
+            arrival_city_key=arrival_key,
+            date=date,
+            seat_class=seat_class,
+            min_price=totals[f'{seat_class}_min_price'],
+            seats_left=totals[f'{seat_class}_seats_left'] or 0,
+            flight_count=totals['flight_count'],
+        )
+        for seat_class in SEAT_FIELDS
+    ]
+
+
+def flight_key(flight):
+    """航班所属的汇总键 (出发城市, 到达城市, 日期)"""
+    return flight.departure_city_key, flight.arrival_city_key, timezone.localdate(flight.departure_time)
+
+
+def _day_start(date):
+    return timezone.make_aware(datetime.combine(date, datetime.min.time()))
+
+
+def _day_flights(departure_key, arrival_key, date):
+    start = _day_start(date)
+    return Flight.objects.filter(
+        departure_city_key=departure_key,
+        arrival_city_key=arrival_key,
+        departure_time__gte=start,
+        departure_time__lt=start + timedelta(days=1),
+    )
+
+
+def refresh_route_date(departure_key, arrival_key, date):
+    """重算某条航线某一天的汇总；当天已没有航班时删除汇总行"""
+    totals = _day_flights(departure_key, arrival_key, date).aggregate(**_aggregates())
+
+    if not totals['flight_count']:
+        RouteAvailability.objects.filter(
+            departure_city_key=departure_key, arrival_city_key=arrival_key, date=date).delete()
+        return
+    RouteAvailability.objects.bulk_create(
+        _rows(departure_key, arrival_key, date, totals),
+        update_conflicts=True,
+        unique_fields=['departure_city_key', 'arrival_city_key', 'seat_class', 'date'],
+        update_fields=UPDATE_FIELDS,
+    )
+
+
+def refresh_seat_class(flight_id, seat_class):
+    """座位数变化后只重算该舱位：一条带子查询的 UPDATE 写入绝对值，并发时也不会累积误差"""
+    field, price_field = SEAT_FIELDS[seat_class], PRICE_FIELDS[seat_class]
+    flight = Flight.objects.filter(id=flight_id).only(
+        'departure_city_key', 'arrival_city_key', 'departure_time').first()
+    if flight is None:
+        return
+    key = flight_key(flight)
+    day = _day_flights(*key).order_by().values('departure_city_key')
+    updated = RouteAvailability.objects.filter(
+        departure_city_key=key[0], arrival_city_key=key[1], date=key[2], seat_class=seat_class,
+    ).update(
+        seats_left=Coalesce(Subquery(day.annotate(total=Sum(field)).values('total')), 0),
+        min_price=Subquery(day.annotate(price=Min(price_field, filter=Q(**{f'{field}__gt': 0}))).values('price')),
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        refresh_route_date(*key)
+
+
+@transaction.atomic
+def rebuild_availability(batch_size=1000, start=None, end=None):
+    """按航线+日期分组一次聚合航班，重建汇总表，返回写入行数；可用 [start, end) 只重建一段日期"""
+    flights = Flight.objects.all()
+    summaries = RouteAvailability.objects.all()
+    if start is not None:
+        flights = flights.filter(departure_time__gte=_day_start(start))
+        summaries = summaries.filter(date__gte=start)
+    if end is not None:
+        flights = flights.filter(departure_time__lt=_day_start(end))
+        summaries = summaries.filter(date__lt=end)
+    groups = (
+        flights
+        .annotate(date=TruncDate('departure_time', tzinfo=timezone.get_current_timezone()))
+        .values('departure_city_key', 'arrival_city_key', 'date')
+        .annotate(**_aggregates())
+        .order_by()
+    )
+    summaries.delete()
+    rows = []
+    written = 0
+    for totals in groups.iterator():
+        rows.extend(_rows(totals['departure_city_key'], totals['arrival_city_key'], totals['date'], totals))
+        if len(rows) >= batch_size:
+            written += len(RouteAvailability.objects.bulk_create(rows))
+            rows = []
+    written += len(RouteAvailability.objects.bulk_create(rows))
+    return written
+
+
+def fare_calendar(departure_key, arrival_key, seat_class, start, end):
+    """[start, end) 日期范围内每天的最低价/余票，一次索引范围查询。
+    汇总表按整天统计，当天已起飞的航班在归档前仍计在内，所以今天这一行按未起飞的航班重新聚合"""
+    days = list(
+        RouteAvailability.objects.filter(
+            departure_city_key=departure_key,
+            arrival_city_key=arrival_key,
+            seat_class=seat_class,
+            date__gte=start,
+            date__lt=end,
+        ).order_by('date').values('date', 'min_price', 'seats_left', 'flight_count')
+    )
+    today = timezone.localdate()
+    if days and days[0]['date'] == today:
+        field = SEAT_FIELDS[seat_class]
+        totals = _day_flights(departure_key, arrival_key, today).live().aggregate(
+            flight_count=Count('id'),
+            seats_left=Sum(field),
+            min_price=Min(PRICE_FIELDS[seat_class], filter=Q(**{f'{field}__gt': 0})),
+        )
+        if totals['flight_count']:
+            days[0].update(totals, seats_left=totals['seats_left'] or 0)
+        else:
+            del days[0]
+    return days
@@ -0,0 +1,130 @@
+"""预订流程：同步视图（BookingViewSet）和异步视图共用"""
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+
+from .analytics import record_sales
+from .idempotency import complete_in_transaction
+from .inventory import SEAT_FIELDS, reserve_seats, release_seats
+from .models import Flight, Booking
+from .pricing import quote_fare
+from .seatmap import assign_seats, release_seat_numbers, format_seats, parse_seats
+from .serializers import BookingSerializer
+
+CANCELED = {'message': 'Booking canceled successfully.'}
+
+
+class BookingError(Exception):
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def parse_booking_request(data):
+    """校验预订参数，返回 (flight_id, seat_class, seat_count)"""
+    seat_class = data.get('seat_class')
+    try:
+        flight_id = int(data.get('flight'))
+        seat_count = int(data.get('seat_count', 1))
+    except (TypeError, ValueError):
+        raise BookingError('Invalid flight or seat count.')
+
+    # 预订数量验证
+    if seat_count <= 0 or seat_count > 10:
+        raise BookingError('Invalid seat count. Must be between 1 and 10.')
+    if seat_class not in SEAT_FIELDS:
+        raise BookingError('Invalid seat class.')
+    return flight_id, seat_class, seat_count
+
+
+def _raise_unavailable(flight_id):
+    flight = Flight.objects.filter(id=flight_id).only('departure_time').first()
+    if flight is None:
+        raise BookingError('Flight not found.', status.HTTP_404_NOT_FOUND)
+    # 航班过期检查
+    if flight.departure_time <= timezone.now():
+        raise BookingError('Cannot book expired flights.')
+    raise BookingError('Not enough seats available.')
+
+
+def create_booking(user, data):
+    flight_id, seat_class, seat_count = parse_booking_request(data)
+
+    # 在事务外报价（通常命中缓存）：SQLite 上事务内先读后写会因锁升级失败
+    quote = quote_fare(flight_id, seat_class, seat_count)
+    if quote is None:
+        _raise_unavailable(flight_id)
+
+    with transaction.atomic():
+        # 条件UPDATE原子扣减座位，不对航班行加锁
+        if not reserve_seats(flight_id, seat_class, seat_count):
+            _raise_unavailable(flight_id)
+
+        seats = assign_seats(flight_id, seat_class, seat_count)
+
+        # 使用当前登录用户，不允许指定用户ID；价格按报价锁定
+        booking = Booking.objects.create(
+            user=user,
+            flight_id=flight_id,
+            seat_class=seat_class,
+            seat_count=seat_count,
+            seat_numbers=format_seats(seats),
+            unit_price=quote.unit_price,
+            total_amount=quote.total_price,
+            passenger_name=data.get('passenger_name', ''),
+            passenger_id=data.get('passenger_id', ''),
+            phone=data.get('phone', ''),
+        )
+        record_sales(flight_id, seat_class, seat_count, 1, quote.total_price)
+        # 幂等键与预订一起提交，不会出现预订已提交而键仍在处理中的窗口
+        complete_in_transaction(status.HTTP_201_CREATED, lambda: BookingSerializer(booking).data)
+        return booking
+
+
+def enqueue_booking(user, data):
+    """排队模式：只校验参数并写入一条待确认预订，由 process_booking_queue 工作进程分批确认"""
+    flight_id, seat_class, seat_count = parse_booking_request(data)
+
+    flight = Flight.objects.filter(id=flight_id).only('departure_time').first()
+    if flight is None:
+        raise BookingError('Flight not found.', status.HTTP_404_NOT_FOUND)
+    if flight.departure_time <= timezone.now():
+        raise BookingError('Cannot book expired flights.')
+
+    with transaction.atomic():
+        booking = Booking.objects.create(
+            user=user,
+            flight_id=flight_id,
+            seat_class=seat_class,
+            seat_count=seat_count,
+            status='pending',
+            passenger_name=data.get('passenger_name', ''),
+            passenger_id=data.get('passenger_id', ''),
+            phone=data.get('phone', ''),
+        )
+        complete_in_transaction(status.HTTP_202_ACCEPTED, lambda: BookingSerializer(booking).data)
+        return booking
+
+
+@transaction.atomic
+def cancel_booking(booking):
+    # 锁住预订行后读取最新状态：排队中的预订可能刚被工作进程确认
+    rows = Booking.objects.filter(id=booking.id)
+    if not rows.lock():
+        return
+    current = rows.values_list('status', 'seat_numbers').first()
+    booking_status, seat_numbers = current
+
+    # 24小时内不能取消的限制（待确认/已拒绝的预订没有占用座位，不受限制）
+    if booking_status == 'confirmed' and \
+            booking.flight.departure_time <= timezone.now() + timezone.timedelta(hours=24):
+        raise BookingError('Cannot cancel booking within 24 hours of departure.')
+
+    # 先删除预订，删除成功才归还座位，重复取消不会多次归还
+    deleted, _ = Booking.objects.filter(id=booking.id).delete()
+    if deleted and booking_status == 'confirmed':
+        release_seats(booking.flight_id, booking.seat_class, booking.seat_count)
+        release_seat_numbers(booking.flight_id, booking.seat_class, parse_seats(seat_numbers))
+        record_sales(booking.flight_id, booking.seat_class, -booking.seat_count, -1, -booking.total_price)
+    complete_in_transaction(status.HTTP_200_OK, lambda: CANCELED)
@@ -0,0 +1,114 @@
+"""航班读缓存：缓存序列化后的数据，支持 ETag / Last-Modified 条件请求
+
+只依赖 Django 缓存接口，本地内存缓存和 Redis 缓存后端都可以使用。
+缓存键带版本号，数据变化时提升版本号即可让旧缓存失效。
+同一地址可以按 Accept / ?format= 协商出不同的渲染格式（如快速 JSON），缓存键和 ETag 都带上协商结果，
+响应带 Vary: Accept。
+"""
+import hashlib
+import json
+import math
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import http_date
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .replicas import cache_timeout
+
+FLIGHT_LIST_VERSION_KEY = 'flight_list:version'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # 用毫秒时间戳初始化，缓存被清空后也不会与旧的版本号重复
+        cache.add(key, int(time.time() * 1000), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), None)
+
+
+def flight_version_key(flight_id):
+    return f'flight_detail:version:{flight_id}'
+
+
+def invalidate_flight(flight_id):
+    """航班信息或座位数变化：使该航班详情和所有列表页缓存失效"""
+    bump_version(flight_version_key(flight_id))
+    bump_version(FLIGHT_LIST_VERSION_KEY)
+
+
+def _make_entry(data, renderer_format):
+    payload = json.dumps([renderer_format, data], cls=JSONEncoder, sort_keys=True).encode()
+    return {
+        'etag': '"%s"' % hashlib.md5(payload).hexdigest(),
+        'last_modified': int(time.time()),
+        'data': data,
+    }
+
+
+def departure_timeout(data, timeout):
+    """缓存时间不超过数据中最早的航班起飞前的秒数：缓存只在写入时失效，
+    起飞时间一过，已起飞的航班不能继续作为可预订航班从缓存返回"""
+    rows = data.get('results', [data]) if isinstance(data, dict) else data
+    now = timezone.now()
+    for row in rows:
+        departure = row.get('departure_time') if isinstance(row, dict) else None
+        if isinstance(departure, str):
+            departure = parse_datetime(departure)
+        if isinstance(departure, datetime):
+            timeout = min(timeout, max(math.floor((departure - now).total_seconds()), 0))
+    return timeout
+
+
+def cached_response(request, key, build):
+    """读穿缓存：命中时直接返回缓存数据，客户端条件请求匹配时返回304，都不访问数据库"""
+    renderer_format = request.accepted_renderer.format
+    key = f'{key}:{renderer_format}'
+    entry = cache.get(key)
+    if entry is None:
+        response = build()
+        if response.status_code != 200:
+            return response
+        entry = _make_entry(response.data, renderer_format)
+        timeout = departure_timeout(response.data, cache_timeout(getattr(settings, 'FLIGHT_CACHE_TIMEOUT', 300)))
+        if timeout > 0:
+            cache.set(key, entry, timeout)
+
+    response = get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified'])
+    if response is None:
+        response = Response(entry['data'])
+        response['ETag'] = entry['etag']
+        response['Last-Modified'] = http_date(entry['last_modified'])
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+class CachedFlightReadMixin:
+    """给 FlightViewSet 的 retrieve / list 加上读缓存"""
+
+    def retrieve(self, request, *args, **kwargs):
+        flight_id = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        key = f'flight_detail:{flight_id}:{get_version(flight_version_key(flight_id))}'
+        return cached_response(request, key, lambda: super(CachedFlightReadMixin, self).retrieve(
+            request, *args, **kwargs))
+
+    def list(self, request, *args, **kwargs):
+        query = hashlib.md5(request.GET.urlencode().encode()).hexdigest()
+        key = f'flight_list:{get_version(FLIGHT_LIST_VERSION_KEY)}:{query}'
+        return cached_response(request, key, lambda: super(CachedFlightReadMixin, self).list(
+            request, *args, **kwargs))
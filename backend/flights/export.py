@@ -0,0 +1,51 @@
+"""预订数据流式导出：逐块读取数据库并逐行输出 NDJSON / CSV，内存占用与数据量无关"""
+import csv
+import json
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'bookings.ndjson'),
+    'csv': ('text/csv', 'bookings.csv'),
+}
+
+
+class _Echo:
+    """csv.writer 需要一个带 write 方法的对象，这里直接把写入的行返回"""
+
+    def write(self, value):
+        return value
+
+
+def _rows(queryset, serializer_class, chunk_size):
+    for booking in queryset.iterator(chunk_size=chunk_size):
+        yield serializer_class(booking).data
+
+
+def _ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+
+def _csv_lines(rows, fieldnames):
+    writer = csv.DictWriter(_Echo(), fieldnames=fieldnames)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_bookings(queryset, serializer_class, export_format, chunk_size=None):
+    """返回流式导出响应；export_format 为 'ndjson' 或 'csv'"""
+    content_type, filename = EXPORT_FORMATS[export_format]
+    chunk_size = chunk_size or getattr(settings, 'BOOKING_EXPORT_CHUNK_SIZE', 2000)
+    rows = _rows(queryset, serializer_class, chunk_size)
+    if export_format == 'csv':
+        lines = _csv_lines(rows, list(serializer_class().fields))
+    else:
+        lines = _ndjson_lines(rows)
+
+    response = StreamingHttpResponse(lines, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
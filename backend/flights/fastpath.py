@@ -0,0 +1,125 @@
+"""列表接口的快速序列化路径：直接用 values_list() 取出的元组拼出与序列化器相同的字段，
+不实例化模型、不走 DRF 逐字段序列化。客户端通过内容协商选择：
+
+    Accept: application/vnd.flights.fast+json  或  ?format=fast
+
+输出字段、字段顺序和取值格式与 FlightSerializer / BookingSerializer 一致。
+"""
+from django.db import models
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .instrumentation import timed_serialization
+from .models import Flight, Booking
+from .renderers import FastJSONRenderer
+
+
+def _datetime_converter():
+    tz = timezone.get_current_timezone()
+
+    def convert(value):
+        # 与 DRF DateTimeField 相同：转换到当前时区，UTC 写成 Z
+        if value is None:
+            return None
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def _decimal_converter(places):
+    def convert(value):
+        return None if value is None else f'{value:.{places}f}'
+    return convert
+
+
+def _float(value):
+    return None if value is None else float(value)
+
+
+class RowBuilder:
+    """columns: [(输出字段名, values_list 查询路径, 模型字段或转换函数)]"""
+
+    def __init__(self, columns):
+        self.names = [name for name, _, _ in columns]
+        self.lookups = [lookup for _, lookup, _ in columns]
+        self.fields = [field for _, _, field in columns]
+
+    def values(self, queryset):
+        return queryset.values_list(*self.lookups)
+
+    def _converters(self):
+        converters = []
+        for field in self.fields:
+            if isinstance(field, models.DateTimeField):
+                converters.append(_datetime_converter())
+            elif isinstance(field, models.DecimalField):
+                converters.append(_decimal_converter(field.decimal_places))
+            elif callable(field) and not isinstance(field, models.Field):
+                converters.append(field)
+            else:
+                converters.append(None)
+        return converters
+
+    def rows(self, tuples):
+        """把 values_list 的结果转换成字典列表"""
+        with timed_serialization():
+            tuples = list(tuples)
+            if not tuples:
+                return []
+            # 按列转换（map 在 C 层循环），再按行拼成字典
+            columns = [
+                map(convert, column) if convert else column
+                for convert, column in zip(self._converters(), zip(*tuples))
+            ]
+            names = self.names
+            return [dict(zip(names, row)) for row in zip(*columns)]
+
+
+def _model_columns(model, names, prefix=''):
+    columns = []
+    for name in names:
+        columns.append((name, f'{prefix}{name}', model._meta.get_field(name)))
+    return columns
+
+
+FLIGHT_ROWS = RowBuilder(_model_columns(Flight, [
+    'id', 'flight_number', 'departure_city', 'arrival_city', 'departure_time', 'arrival_time',
+    'airline', 'aircraft_type', 'economy_seats', 'business_seats', 'first_seats',
+    'economy_price', 'business_price', 'first_price',
+]))
+
+# 与 BookingSerializer 的字段顺序一致：主键、航班信息、总价、模型字段、外键
+BOOKING_ROWS = RowBuilder(
+    [('id', 'id', None)]
+    + [(name, lookup, field) for name, lookup, field in _model_columns(Flight, [
+        'flight_number', 'departure_city', 'arrival_city', 'departure_time', 'arrival_time', 'airline',
+    ], prefix='flight__')]
+    # BookingSerializer 的 total_price 是 ReadOnlyField，Decimal 由 JSON 编码器输出为数字
+    + [('total_price', 'annotated_total_price', _float)]
+    + _model_columns(Booking, [
+        'seat_class', 'seat_count', 'passenger_name', 'passenger_id', 'phone',
+        'status', 'booking_time', 'seat_numbers', 'status_reason', 'unit_price',
+    ])
+    + [('user', 'user_id', None), ('flight', 'flight_id', None)]
+)
+
+
+def wants_fast(request):
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer is not None and renderer.format == FastJSONRenderer.format
+
+
+class FastListMixin:
+    """客户端选择快速格式时，list 直接从 values_list 构造数据；fast_rows 为对应的 RowBuilder"""
+    fast_rows = None
+
+    def fast_list_response(self, queryset):
+        page = self.paginate_queryset(self.fast_rows.values(queryset))
+        if page is not None:
+            return self.get_paginated_response(self.fast_rows.rows(page))
+        return Response(self.fast_rows.rows(self.fast_rows.values(queryset)))
+
+    def list(self, request, *args, **kwargs):
+        if self.fast_rows is None or not wants_fast(request):
+            return super().list(request, *args, **kwargs)
+        return self.fast_list_response(self.filter_queryset(self.get_queryset()))
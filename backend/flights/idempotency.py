@@ -0,0 +1,183 @@
+"""幂等键：创建/取消预订时客户端带上 Idempotency-Key 请求头，超时重试直接返回第一次的结果。
+
+(用户, 键) 唯一，先插入者获胜：第一个请求插入一条“处理中”记录后执行，完成后写入状态码和响应体。
+同一个键的重试或并发请求插入失败，读出已有记录：
+- 请求内容（指纹）不同：422
+- 第一个请求仍在处理：409 + Retry-After
+- 已完成：直接返回保存的响应，不进入预订事务
+预订、取消在写入的同一事务内调用 complete_in_transaction 保存响应，提交后进程退出也不会留下“处理中”的键，
+超过锁超时被重新抢占后再预订一次；其他结果（参数错误等，没有写入）在视图返回后保存。
+第一个请求返回 5xx 或抛出异常时删除记录，客户端可以用同一个键重试。
+记录在 IDEMPOTENCY_KEY_TTL 秒后过期，由 python manage.py purge_idempotency_keys 清理。
+"""
+import functools
+import hashlib
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+_claimed = ContextVar('idempotency_claimed', default=None)
+
+
+class IdempotencyError(Exception):
+    def __init__(self, message, status_code, retry_after=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def request_fingerprint(method, path, data):
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())  # 表单提交的 QueryDict
+    payload = json.dumps([method, path, data], cls=JSONEncoder, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _lock_timeout():
+    return getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60)
+
+
+def claim(user_id, key, fingerprint):
+    """抢占幂等键。抢到返回 None，调用方执行请求后调用 complete 或 release；
+    键已完成返回 (状态码, 响应数据) 用于重放；冲突抛出 IdempotencyError"""
+    if len(key) > MAX_KEY_LENGTH:
+        raise IdempotencyError('Idempotency-Key is too long.', status.HTTP_400_BAD_REQUEST)
+
+    now = timezone.now()
+    for _ in range(3):
+        try:
+            # 单独的短事务：第一条语句就是 INSERT，唯一约束决定谁先到
+            with transaction.atomic():
+                IdempotencyKey.objects.create(
+                    user_id=user_id, key=key, fingerprint=fingerprint,
+                    expires_at=now + timedelta(seconds=getattr(settings, 'IDEMPOTENCY_KEY_TTL', 86400)),
+                )
+            return None
+        except IntegrityError:
+            record = IdempotencyKey.objects.filter(user_id=user_id, key=key).first()
+
+        if record is None:
+            continue  # 第一个请求失败后刚释放了键
+        # 已过期的记录，或处理中但超过锁超时（处理请求的进程已退出）的记录，删除后重新抢占
+        abandoned = record.status_code is None and record.created_at <= now - timedelta(seconds=_lock_timeout())
+        if record.expires_at <= now or abandoned:
+            IdempotencyKey.objects.filter(pk=record.pk, created_at=record.created_at).delete()
+            continue
+        if record.fingerprint != fingerprint:
+            raise IdempotencyError('Idempotency-Key was already used with a different request.',
+                                   status.HTTP_422_UNPROCESSABLE_ENTITY)
+        if record.status_code is None:
+            raise IdempotencyError('A request with this Idempotency-Key is still being processed.',
+                                   status.HTTP_409_CONFLICT, retry_after=1)
+        return record.status_code, json.loads(record.response_body)
+    raise IdempotencyError('A request with this Idempotency-Key is still being processed.',
+                           status.HTTP_409_CONFLICT, retry_after=1)
+
+
+def complete(user_id, key, status_code, data):
+    # 只更新处理中的记录：已在预订事务内保存过结果时不再覆盖
+    IdempotencyKey.objects.filter(user_id=user_id, key=key, status_code__isnull=True).update(
+        status_code=status_code, response_body=json.dumps(data, cls=JSONEncoder, ensure_ascii=False))
+
+
+@contextmanager
+def claimed(user_id, key):
+    """在抢到幂等键后执行请求期间记下 (用户, 键)，供 complete_in_transaction 使用"""
+    token = _claimed.set((user_id, key))
+    try:
+        yield
+    finally:
+        _claimed.reset(token)
+
+
+def complete_in_transaction(status_code, render):
+    """在预订写入的事务内保存当前请求的幂等键结果；render() 返回响应数据，没有幂等键时不调用"""
+    current = _claimed.get()
+    if current is not None:
+        complete(*current, status_code, render())
+
+
+def release(user_id, key):
+    IdempotencyKey.objects.filter(user_id=user_id, key=key, status_code__isnull=True).delete()
+
+
+def execute(user_id, key, fingerprint, func):
+    """异步视图使用：func() 返回 (状态码, 响应数据)，结果为 (状态码, 响应数据, 是否为重放)"""
+    stored = claim(user_id, key, fingerprint)
+    if stored is not None:
+        return (*stored, True)
+    try:
+        with claimed(user_id, key):
+            status_code, data = func()
+    except BaseException:
+        release(user_id, key)
+        raise
+    if status_code >= 500:
+        release(user_id, key)
+    else:
+        complete(user_id, key, status_code, data)
+    return status_code, data, False
+
+
+def purge_expired(batch_size=10000):
+    """分批删除过期记录，返回删除条数"""
+    deleted = 0
+    while True:
+        ids = list(IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+                   .values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+
+
+def error_response(exc):
+    response = Response({'error': exc.message}, status=exc.status_code)
+    if exc.retry_after is not None:
+        response['Retry-After'] = str(exc.retry_after)
+    return response
+
+
+def idempotent(view):
+    """视图方法装饰器：请求带 Idempotency-Key 时按上面的规则处理，不带时直接执行"""
+    @functools.wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view(self, request, *args, **kwargs)
+        user_id = request.user.pk
+        try:
+            stored = claim(user_id, key, request_fingerprint(request.method, request.path, request.data))
+        except IdempotencyError as exc:
+            return error_response(exc)
+        if stored is not None:
+            response = Response(stored[1], status=stored[0])
+            response[REPLAYED_HEADER] = 'true'
+            return response
+
+        try:
+            with claimed(user_id, key):
+                response = view(self, request, *args, **kwargs)
+        except BaseException:
+            release(user_id, key)
+            raise
+        if response.status_code >= 500:
+            release(user_id, key)
+        else:
+            complete(user_id, key, response.status_code, response.data)
+        return response
+    return wrapper
@@ -0,0 +1,198 @@
+"""请求级性能统计：每个请求的总耗时、SQL 条数与耗时、争用写锁的 UPDATE 耗时、序列化耗时
+
+结果写入 Server-Timing 响应头，并按 DRF 视图/动作汇总成直方图，由 /metrics 以 Prometheus 文本格式输出。
+统计数据保存在进程内，多进程部署时每个进程各自统计。
+"""
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import markcoroutinefunction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('sql_count', 'sql_time', 'write_lock_time', 'serialize_time')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.write_lock_time = 0.0
+        self.serialize_time = 0.0
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}  # labels -> [各桶计数..., 总数, 总和]
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            data = self.series.get(labels)
+            if data is None:
+                data = self.series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+            data[-2] += 1
+            data[-1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            items = sorted(self.series.items())
+        for (view, action), data in items:
+            label = f'view="{view}",action="{action}"'
+            for bound, count in zip(self.buckets, data):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {data[-2]}')
+            lines.append(f'{self.name}_count{{{label}}} {data[-2]}')
+            lines.append(f'{self.name}_sum{{{label}}} {data[-1]:.6f}')
+        return lines
+
+
+REQUEST_SECONDS = Histogram('flights_request_duration_seconds', 'Wall time per request.')
+SQL_SECONDS = Histogram('flights_sql_duration_seconds', 'Total SQL time per request.')
+SQL_QUERIES = Histogram('flights_sql_queries', 'Number of SQL queries per request.', COUNT_BUCKETS)
+WRITE_LOCK_SECONDS = Histogram(
+    'flights_write_lock_seconds',
+    'Time spent in contended write-lock statements per request (seat reserve/release UPDATE, QuerySet.lock()).')
+SERIALIZE_SECONDS = Histogram('flights_serialize_duration_seconds', 'Serialization and rendering time per request.')
+HISTOGRAMS = (REQUEST_SECONDS, SQL_SECONDS, SQL_QUERIES, WRITE_LOCK_SECONDS, SERIALIZE_SECONDS)
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.sql_count += 1
+        metrics.sql_time += elapsed
+
+
+@receiver(connection_created)
+def install_execute_wrapper(sender, connection, **kwargs):
+    """每个数据库连接常驻一个执行包装器；异步视图的 ORM 调用在线程池里执行，
+    当前请求的统计对象通过 contextvar 传递过去"""
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+@contextmanager
+def timed_write_lock():
+    """统计争用写锁的语句耗时（含等锁时间）：座位扣减/归还的条件 UPDATE、QuerySet.lock() 的空 UPDATE。
+    请求路径上已经没有 select_for_update，这些语句就是并发写入时排队的地方"""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.write_lock_time += time.perf_counter() - started
+
+
+@contextmanager
+def timed_serialization():
+    """统计一段序列化/渲染代码的耗时"""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.serialize_time += time.perf_counter() - started
+
+
+class InstrumentedSerializerMixin:
+    """统计序列化耗时；many=True 时按每个对象累加，查询数据库的时间不计入"""
+
+    def to_representation(self, instance):
+        with timed_serialization():
+            return super().to_representation(instance)
+
+
+def _view_label(view_func, method):
+    cls = getattr(view_func, 'cls', None)
+    actions = getattr(view_func, 'actions', None) or {}
+    view = cls.__name__ if cls is not None else getattr(view_func, '__name__', 'unknown')
+    return view, actions.get(method.lower(), method.lower())
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics, token, started = self._start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics, token, started = self._start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics, started)
+
+    def _start(self, request):
+        metrics = RequestMetrics()
+        request._perf_label = ('unresolved', request.method.lower())
+        return metrics, _current.set(metrics), time.perf_counter()
+
+    def _finish(self, request, response, metrics, started):
+        total = time.perf_counter() - started
+        labels = request._perf_label
+        REQUEST_SECONDS.observe(labels, total)
+        SQL_SECONDS.observe(labels, metrics.sql_time)
+        SQL_QUERIES.observe(labels, metrics.sql_count)
+        WRITE_LOCK_SECONDS.observe(labels, metrics.write_lock_time)
+        SERIALIZE_SECONDS.observe(labels, metrics.serialize_time)
+
+        app_time = max(total - metrics.sql_time - metrics.serialize_time, 0)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={metrics.sql_time * 1000:.2f};desc="{metrics.sql_count} queries"',
+            f'write_lock;dur={metrics.write_lock_time * 1000:.2f}',
+            f'serialize;dur={metrics.serialize_time * 1000:.2f}',
+            f'app;dur={app_time * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._perf_label = _view_label(view_func, request.method)
+
+
+def metrics_view(request):
+    """Prometheus 文本格式的统计数据"""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
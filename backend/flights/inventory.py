@@ -0,0 +1,52 @@
+"""座位库存：用带条件的原子 UPDATE 扣减/归还座位，不再锁住整行航班"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .instrumentation import timed_write_lock
+from .models import Flight
+from .signals import inventory_changed
+
+# 舱位 -> Flight 上对应的剩余座位字段
+SEAT_FIELDS = {
+    'economy': 'economy_seats',
+    'business': 'business_seats',
+    'first': 'first_seats',
+}
+
+
+def seat_field(seat_class):
+    try:
+        return SEAT_FIELDS[seat_class]
+    except KeyError:
+        raise ValueError('Invalid seat class.')
+
+
+def _notify(flight_id, seat_class, delta):
+    # 事务提交后再广播库存变化，回滚的扣减不会触发缓存失效等副作用
+    transaction.on_commit(lambda: inventory_changed.send(
+        sender=Flight, flight_id=flight_id, seat_class=seat_class, delta=delta))
+
+
+def reserve_seats(flight_id, seat_class, count):
+    """扣减座位：UPDATE ... SET seats = seats - n WHERE seats >= n，成功返回 True"""
+    field = seat_field(seat_class)
+    with timed_write_lock():
+        updated = Flight.objects.filter(
+            pk=flight_id,
+            departure_time__gt=timezone.now(),
+            **{f'{field}__gte': count},
+        ).update(**{field: F(field) - count})
+    if updated:
+        _notify(flight_id, seat_class, -count)
+    return bool(updated)
+
+
+def release_seats(flight_id, seat_class, count):
+    """归还座位（取消预订时调用）"""
+    field = seat_field(seat_class)
+    with timed_write_lock():
+        updated = Flight.objects.filter(pk=flight_id).update(**{field: F(field) + count})
+    if updated:
+        _notify(flight_id, seat_class, count)
+    return bool(updated)
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from flights.archive import archive_cutoff, archive_flights
+
+
+class Command(BaseCommand):
+    help = '把已起飞的航班及其预订分批移入归档表（可由 cron 定时执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=float, help='归档起飞超过多少天的航班，默认 FLIGHT_ARCHIVE_AFTER_DAYS')
+        parser.add_argument('--batch-size', type=int, default=500, help='每个事务归档的航班数')
+        parser.add_argument('--pause', type=float, default=0, help='两批之间暂停的秒数，给在线请求让出数据库')
+        parser.add_argument('--limit', type=int, help='本次最多归档的航班数')
+
+    def handle(self, *args, **options):
+        before = archive_cutoff(options['days'])
+        result = archive_flights(before, options['batch_size'], options['pause'], options['limit'])
+        self.stdout.write(
+            f'archived {result.flights} flights and {result.bookings} bookings '
+            f'departed before {timezone.localtime(before):%Y-%m-%d %H:%M} in {result.batches} batches')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from flights.seatmap import build_missing_seat_maps
+
+
+class Command(BaseCommand):
+    help = '为缺少座位图的航班舱位按剩余座位和已有预订补建座位图（SeatMap）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        built = build_missing_seat_maps(options['batch_size'])
+        self.stdout.write(f'built {built} seat maps')
@@ -0,0 +1,54 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from flights.schedule import FORMATS, ScheduleError, ScheduleImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = '从 CSV / NDJSON / JSON 数组文件批量导入航班时刻表，按 flight_number 新增或更新'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='时刻表文件，- 表示标准输入')
+        parser.add_argument('--format', choices=FORMATS, help='默认按扩展名判断')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='只校验，不写入数据库')
+        parser.add_argument('--errors', help='把出错的行以 NDJSON 写入该文件，默认输出到标准错误')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if path == '-' and not options['format']:
+            raise CommandError('--format is required when reading from stdin.')
+        try:
+            file_format = options['format'] or detect_format(path)
+        except ScheduleError as exc:
+            raise CommandError(str(exc))
+
+        errors_file = open(options['errors'], 'w', encoding='utf-8') if options['errors'] else None
+
+        def on_error(line, errors):
+            if errors_file:
+                errors_file.write(json.dumps({'line': line, 'errors': errors}, ensure_ascii=False) + '\n')
+            else:
+                self.stderr.write(f'line {line}: {json.dumps(errors, ensure_ascii=False)}')
+
+        importer = ScheduleImporter(options['batch_size'], options['dry_run'], on_error)
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+        started = time.perf_counter()
+        try:
+            result = importer.run(read_rows(stream, file_format))
+        except ScheduleError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if errors_file:
+                errors_file.close()
+        elapsed = time.perf_counter() - started
+
+        rate = (result.created + result.updated + result.failed) / elapsed if elapsed else 0
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(f'{prefix}created {result.created}, updated {result.updated}, '
+                          f'failed {result.failed} ({rate:.0f} rows/s)')
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+
+from flights.queue import process_batch
+
+
+class Command(BaseCommand):
+    help = '确认排队模式下的待确认预订（BOOKING_QUEUE_MODE）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='本进程内的工作线程数')
+        parser.add_argument('--shard', type=int, default=0, help='多进程部署时本进程的序号')
+        parser.add_argument('--shards', type=int, default=1, help='多进程部署时的进程总数')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--poll-interval', type=float, default=0.2, help='队列为空时的等待秒数')
+        parser.add_argument('--once', action='store_true', help='处理完当前队列后退出')
+
+    def handle(self, *args, **options):
+        workers, shards, shard = options['workers'], options['shards'], options['shard']
+        if workers < 1 or shards < 1 or not 0 <= shard < shards:
+            raise CommandError('Invalid --workers/--shard/--shards.')
+
+        # 每个线程负责一个分区：flight_id % (shards * workers) == 分区号
+        partitions = shards * workers
+        stop = threading.Event()
+        totals = {'confirmed': 0, 'rejected': 0}
+        lock = threading.Lock()
+
+        def work(partition):
+            try:
+                while not stop.is_set():
+                    close_old_connections()
+                    try:
+                        confirmed, rejected = process_batch(partition, partitions, options['batch_size'])
+                    except Exception as exc:
+                        # 数据库暂时不可用等错误：记录后重试，批次在事务中，不会留下半确认的预订
+                        if options['once']:
+                            raise
+                        self.stderr.write(f'partition {partition}: {exc!r}')
+                        time.sleep(options['poll_interval'])
+                        continue
+                    with lock:
+                        totals['confirmed'] += confirmed
+                        totals['rejected'] += rejected
+                    if not confirmed and not rejected:
+                        if options['once']:
+                            return
+                        time.sleep(options['poll_interval'])
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=work, args=(shard * workers + n,), daemon=True)
+            for n in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        self.stdout.write(f"confirmed {totals['confirmed']}, rejected {totals['rejected']}")
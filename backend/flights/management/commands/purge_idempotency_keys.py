@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from flights.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = '删除已过期的幂等键记录（可由 cron 定时执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        deleted = purge_expired(options['batch_size'])
+        self.stdout.write(f'deleted {deleted} expired idempotency keys')
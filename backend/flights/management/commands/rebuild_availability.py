@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from flights.availability import rebuild_availability
+
+
+class Command(BaseCommand):
+    help = '根据航班表全量重建航线余票汇总（RouteAvailability）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--start', type=parse_date, help='只重建该日期（含）之后的汇总，YYYY-MM-DD')
+        parser.add_argument('--end', type=parse_date, help='只重建该日期（不含）之前的汇总，YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        written = rebuild_availability(options['batch_size'], options['start'], options['end'])
+        self.stdout.write(f'rebuilt {written} availability rows')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from flights.analytics import rebuild_sales_rollup
+
+
+class Command(BaseCommand):
+    help = '根据航班和预订全量重建销售汇总（SalesRollup）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--start', type=parse_date, help='只重建该日期（含）之后起飞的航班，YYYY-MM-DD')
+        parser.add_argument('--end', type=parse_date, help='只重建该日期（不含）之前起飞的航班，YYYY-MM-DD')
+        parser.add_argument('--archived', action='store_true', help='同时重建已归档航班的汇总')
+
+    def handle(self, *args, **options):
+        written = rebuild_sales_rollup(options['batch_size'], options['start'], options['end'], options['archived'])
+        self.stdout.write(f'rebuilt {written} sales rows')
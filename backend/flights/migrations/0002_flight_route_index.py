@@ -0,0 +1,37 @@
+# Generated by Django 4.1.7 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+def fill_city_keys(apps, schema_editor):
+    Flight = apps.get_model('flights', 'Flight')
+    flights = list(Flight.objects.all())
+    for flight in flights:
+        flight.departure_city_key = ' '.join(flight.departure_city.split()).casefold()
+        flight.arrival_city_key = ' '.join(flight.arrival_city.split()).casefold()
+    Flight.objects.bulk_update(flights, ['departure_city_key', 'arrival_city_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='arrival_city_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='departure_city_key',
+            field=models.CharField(default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(fill_city_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['departure_city_key', 'arrival_city_key', 'departure_time'], name='flight_route_time_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.1.7 on 2026-10-18 18:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_seat_maps(apps, schema_editor):
+    """为已有航班建立座位图，已确认的预订按预订顺序依次分配座位号"""
+    Flight = apps.get_model('flights', 'Flight')
+    Booking = apps.get_model('flights', 'Booking')
+    SeatMap = apps.get_model('flights', 'SeatMap')
+    seat_fields = {'economy': 'economy_seats', 'business': 'business_seats', 'first': 'first_seats'}
+    for flight in Flight.objects.all().iterator():
+        for seat_class, field in seat_fields.items():
+            bookings = list(Booking.objects.filter(
+                flight=flight, seat_class=seat_class, status='confirmed').order_by('id'))
+            booked = sum(b.seat_count for b in bookings)
+            capacity = getattr(flight, field) + booked
+            bits = bytearray((capacity + 7) // 8)
+            next_seat = 1
+            for booking in bookings:
+                first, last = next_seat, next_seat + booking.seat_count - 1
+                booking.seat_numbers = str(first) if first == last else f'{first}-{last}'
+                next_seat = last + 1
+            for index in range(booked):
+                bits[index >> 3] |= 1 << (index & 7)
+            Booking.objects.bulk_update(bookings, ['seat_numbers'])
+            SeatMap.objects.create(flight=flight, seat_class=seat_class, capacity=capacity, occupancy=bytes(bits))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0002_flight_route_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='seat_numbers',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.CreateModel(
+            name='SeatMap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seat_class', models.CharField(choices=[('economy', '经济舱'), ('business', '商务舱'), ('first', '头等舱')], max_length=20)),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('occupancy', models.BinaryField(default=bytes)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seat_maps', to='flights.flight')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='seatmap',
+            constraint=models.UniqueConstraint(fields=('flight', 'seat_class'), name='seatmap_flight_class_uniq'),
+        ),
+        migrations.RunPython(build_seat_maps, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.1.7 on 2026-10-18 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0003_seat_map'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='status_reason',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('confirmed', '已确认'), ('cancelled', '已取消'), ('pending', '待确认'), ('rejected', '已拒绝')], default='confirmed', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'flight'], name='booking_status_flight_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.1.7 on 2026-10-18 18:20
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def build_availability(apps, schema_editor):
+    """按航线+日期汇总已有航班"""
+    Flight = apps.get_model('flights', 'Flight')
+    RouteAvailability = apps.get_model('flights', 'RouteAvailability')
+    classes = {'economy': ('economy_seats', 'economy_price'),
+               'business': ('business_seats', 'business_price'),
+               'first': ('first_seats', 'first_price')}
+    aggregates = {'flight_count': Count('id')}
+    for seat_class, (seats, price) in classes.items():
+        aggregates[f'{seat_class}_left'] = Sum(seats)
+        aggregates[f'{seat_class}_min'] = Min(price, filter=Q(**{f'{seats}__gt': 0}))
+    groups = (
+        Flight.objects
+        .annotate(date=TruncDate('departure_time', tzinfo=timezone.get_current_timezone()))
+        .values('departure_city_key', 'arrival_city_key', 'date')
+        .annotate(**aggregates)
+        .order_by()
+    )
+    RouteAvailability.objects.bulk_create([
+        RouteAvailability(
+            departure_city_key=row['departure_city_key'], arrival_city_key=row['arrival_city_key'],
+            date=row['date'], seat_class=seat_class, min_price=row[f'{seat_class}_min'],
+            seats_left=row[f'{seat_class}_left'] or 0, flight_count=row['flight_count'],
+        )
+        for row in groups for seat_class in classes
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0004_booking_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('departure_city_key', models.CharField(max_length=100)),
+                ('arrival_city_key', models.CharField(max_length=100)),
+                ('date', models.DateField()),
+                ('seat_class', models.CharField(choices=[('economy', '经济舱'), ('business', '商务舱'), ('first', '头等舱')], max_length=20)),
+                ('min_price', models.DecimalField(decimal_places=2, max_digits=10, null=True)),
+                ('seats_left', models.PositiveIntegerField(default=0)),
+                ('flight_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='routeavailability',
+            constraint=models.UniqueConstraint(fields=('departure_city_key', 'arrival_city_key', 'seat_class', 'date'), name='route_availability_uniq'),
+        ),
+        migrations.RunPython(build_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.1.7 on 2026-10-18 18:36
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery
+
+
+def backfill_prices(apps, schema_editor):
+    """已有预订按当前基础票价补齐锁定价格，每个舱位一条 UPDATE"""
+    Flight = apps.get_model('flights', 'Flight')
+    Booking = apps.get_model('flights', 'Booking')
+    classes = {'economy': 'economy_price', 'business': 'business_price', 'first': 'first_price'}
+    for seat_class, field in classes.items():
+        price = Flight.objects.filter(pk=OuterRef('flight_id')).values(field)[:1]
+        Booking.objects.filter(seat_class=seat_class, unit_price__isnull=True).update(unit_price=Subquery(price))
+    Booking.objects.filter(unit_price__isnull=False, total_amount__isnull=True).update(
+        total_amount=F('unit_price') * F('seat_count'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0006_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='total_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.RunPython(backfill_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 4.1.7 on 2026-10-18 18:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('flights', '0007_booking_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('seat_class', models.CharField(choices=[('economy', '经济舱'), ('business', '商务舱'), ('first', '头等舱')], max_length=20)),
+                ('seat_count', models.PositiveIntegerField(default=1)),
+                ('passenger_name', models.CharField(max_length=100)),
+                ('passenger_id', models.CharField(max_length=18)),
+                ('phone', models.CharField(max_length=20)),
+                ('status', models.CharField(choices=[('confirmed', '已确认'), ('cancelled', '已取消'), ('pending', '待确认'), ('rejected', '已拒绝')], max_length=20)),
+                ('booking_time', models.DateTimeField()),
+                ('seat_numbers', models.CharField(blank=True, default='', max_length=100)),
+                ('status_reason', models.CharField(blank=True, default='', max_length=100)),
+                ('unit_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('total_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedFlight',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('flight_number', models.CharField(max_length=20)),
+                ('departure_city', models.CharField(max_length=100)),
+                ('arrival_city', models.CharField(max_length=100)),
+                ('departure_time', models.DateTimeField()),
+                ('arrival_time', models.DateTimeField()),
+                ('airline', models.CharField(max_length=100)),
+                ('aircraft_type', models.CharField(max_length=100)),
+                ('economy_seats', models.PositiveIntegerField(default=0)),
+                ('business_seats', models.PositiveIntegerField(default=0)),
+                ('first_seats', models.PositiveIntegerField(default=0)),
+                ('economy_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('business_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('first_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('departure_city_key', models.CharField(default='', editable=False, max_length=100)),
+                ('arrival_city_key', models.CharField(default='', editable=False, max_length=100)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedflight',
+            index=models.Index(fields=['departure_city_key', 'arrival_city_key', 'departure_time'], name='archived_flight_route_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedflight',
+            index=models.Index(fields=['flight_number', 'departure_time'], name='archived_flight_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedflight',
+            index=models.Index(fields=['departure_time', 'id'], name='archived_flight_time_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='flight',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='flights.archivedflight'),
+        ),
+        migrations.AddField(
+            model_name='archivedbooking',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='archivedbooking',
+            index=models.Index(fields=['user', 'booking_time', 'id'], name='archived_booking_user_idx'),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 4.1.7 on 2026-10-18 19:02
+
+from django.db import migrations, models
+from django.db.models import Case, Count, F, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def build_sales_rollup(apps, schema_editor):
+    """按航班+舱位汇总已有的已确认预订（含归档数据）"""
+    SalesRollup = apps.get_model('flights', 'SalesRollup')
+    SeatMap = apps.get_model('flights', 'SeatMap')
+    classes = {'economy': ('economy_seats', 'economy_price'),
+               'business': ('business_seats', 'business_price'),
+               'first': ('first_seats', 'first_price')}
+    price = Coalesce('total_amount', Case(
+        *[When(seat_class=seat_class, then=F(f'flight__{field}') * F('seat_count'))
+          for seat_class, (_, field) in classes.items()],
+        default=Value(0),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    ))
+    capacities = {
+        (row['flight_id'], row['seat_class']): row['capacity']
+        for row in SeatMap.objects.values('flight_id', 'seat_class', 'capacity')
+    }
+    sources = [(apps.get_model('flights', 'Flight'), apps.get_model('flights', 'Booking')),
+               (apps.get_model('flights', 'ArchivedFlight'), apps.get_model('flights', 'ArchivedBooking'))]
+    rows = []
+    for flight_model, booking_model in sources:
+        sold = {
+            (row['flight_id'], row['seat_class']): row
+            for row in booking_model.objects.filter(status='confirmed').annotate(price=price)
+            .values('flight_id', 'seat_class')
+            .annotate(seats_sold=Sum('seat_count'), booking_count=Count('id'), revenue=Sum('price'))
+            .order_by()
+        }
+        for flight in flight_model.objects.values().iterator():
+            for seat_class, (seats, _) in classes.items():
+                totals = sold.get((flight['id'], seat_class), {})
+                seats_sold = totals.get('seats_sold') or 0
+                rows.append(SalesRollup(
+                    flight_id=flight['id'], seat_class=seat_class, flight_number=flight['flight_number'],
+                    date=timezone.localdate(flight['departure_time']),
+                    departure_city_key=flight['departure_city_key'], arrival_city_key=flight['arrival_city_key'],
+                    airline=flight['airline'],
+                    capacity=capacities.get((flight['id'], seat_class), flight[seats] + seats_sold),
+                    seats_sold=seats_sold, booking_count=totals.get('booking_count') or 0,
+                    revenue=totals.get('revenue') or 0,
+                ))
+    SalesRollup.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flights', '0009_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('flight_id', models.BigIntegerField()),
+                ('seat_class', models.CharField(choices=[('economy', '经济舱'), ('business', '商务舱'), ('first', '头等舱')], max_length=20)),
+                ('flight_number', models.CharField(max_length=20)),
+                ('date', models.DateField()),
+                ('departure_city_key', models.CharField(max_length=100)),
+                ('arrival_city_key', models.CharField(max_length=100)),
+                ('airline', models.CharField(max_length=100)),
+                ('capacity', models.PositiveIntegerField(default=0)),
+                ('seats_sold', models.PositiveIntegerField(default=0)),
+                ('booking_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='salesrollup',
+            index=models.Index(fields=['date'], name='sales_rollup_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesrollup',
+            index=models.Index(fields=['departure_city_key', 'arrival_city_key', 'date'], name='sales_rollup_route_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesrollup',
+            index=models.Index(fields=['airline', 'date'], name='sales_rollup_airline_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='salesrollup',
+            constraint=models.UniqueConstraint(fields=('flight_id', 'seat_class'), name='sales_rollup_flight_class_uniq'),
+        ),
+        migrations.RunPython(build_sales_rollup, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,32 @@
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import User
 
+from .instrumentation import timed_write_lock
+
+
+def normalize_city(value):
+    """城市名归一化：去除多余空白并统一大小写，用于索引等值查询"""
+    if not value:
+        return ''
+    return ' '.join(value.split()).casefold()
+
+
+class FlightQuerySet(models.QuerySet):
+    def live(self):
+        """尚未起飞的航班；已起飞的航班由 archive_flights 定期移入归档表"""
+        return self.filter(departure_time__gt=timezone.now())
+
+    def departed(self, before):
+        return self.filter(departure_time__lte=before)
+
+    def lock(self):
+        """与 BookingQuerySet.lock 相同：事务开头先用一条空 UPDATE 取得写锁"""
+        with timed_write_lock():
+            return self.update(departure_time=models.F('departure_time'))
+
+
 class Flight(models.Model):
     flight_number = models.CharField(max_length=20, unique=True)
     departure_city = models.CharField(max_length=100)
@@ -15,15 +41,89 @@ class Flight(models.Model):
     economy_price = models.DecimalField(max_digits=10, decimal_places=2)
     business_price = models.DecimalField(max_digits=10, decimal_places=2)  # 添加商务舱价格
     first_price = models.DecimalField(max_digits=10, decimal_places=2)  # 统一字段名
+    # 归一化后的城市名，搜索时走等值索引而不是 icontains 全表扫描
+    departure_city_key = models.CharField(max_length=100, default='', editable=False)
+    arrival_city_key = models.CharField(max_length=100, default='', editable=False)
+
+    objects = FlightQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['departure_city_key', 'arrival_city_key', 'departure_time'],
+                name='flight_route_time_idx',
+            ),
+            # 航班列表游标分页
+            models.Index(fields=['departure_time', 'id'], name='flight_time_id_idx'),
+        ]
+
+    def normalize_route(self):
+        """根据城市名刷新归一化字段（bulk_create 等绕过 save 的路径需手动调用）"""
+        self.departure_city_key = normalize_city(self.departure_city)
+        self.arrival_city_key = normalize_city(self.arrival_city)
+
+    def save(self, *args, **kwargs):
+        self.normalize_route()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'departure_city' in update_fields:
+                update_fields.add('departure_city_key')
+            if 'arrival_city' in update_fields:
+                update_fields.add('arrival_city_key')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.flight_number
 
+
+def total_price_expression():
+    """预订总价的数据库表达式：优先取锁定的 total_amount，未定价的按航班基础票价 × 座位数估算；
+    Booking 与 ArchivedBooking 共用（两者的 flight 外键指向的表有相同的价格字段）"""
+    return Coalesce('total_amount', models.Case(
+        models.When(seat_class='economy', then=models.F('flight__economy_price') * models.F('seat_count')),
+        models.When(seat_class='business', then=models.F('flight__business_price') * models.F('seat_count')),
+        models.When(seat_class='first', then=models.F('flight__first_price') * models.F('seat_count')),
+        default=models.Value(0),
+        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+    ))
+
+
+class BookingQuerySet(models.QuerySet):
+    # 序列化预订时用到的航班字段
+    FLIGHT_LIST_FIELDS = (
+        'flight_number', 'departure_city', 'arrival_city',
+        'departure_time', 'arrival_time', 'airline',
+    )
+
+    def with_total_price(self):
+        """总价：优先取预订时锁定的 total_amount，尚未定价的（待确认预订）按基础票价在数据库中估算"""
+        return self.annotate(annotated_total_price=total_price_expression())
+
+    def lock(self):
+        """在事务开头用一条空 UPDATE 锁住这些预订：PostgreSQL 上加行锁，SQLite 上直接取得写锁，
+        避免先读后写时锁升级失败（database is locked）"""
+        with timed_write_lock():
+            return self.update(status=models.F('status'))
+
+    def for_listing(self):
+        """列表接口使用：一次 JOIN 取出航班和用户，只加载序列化需要的列"""
+        booking_fields = [f.name for f in Booking._meta.concrete_fields]
+        flight_fields = [f'flight__{name}' for name in self.FLIGHT_LIST_FIELDS]
+        return (
+            self.select_related('flight', 'user')
+            .only(*booking_fields, *flight_fields, 'user__username')
+            .with_total_price()
+        )
+
+
 class Booking(models.Model):
     STATUS_CHOICES = [
         ('confirmed', '已确认'),
         ('cancelled', '已取消'),
         ('pending', '待确认'),
+        ('rejected', '已拒绝'),
     ]
     
     SEAT_CLASS_CHOICES = [
@@ -41,10 +141,30 @@ class Booking(models.Model):
     phone = models.CharField(max_length=20)  # 添加联系电话
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='confirmed')
     booking_time = models.DateTimeField(auto_now_add=True)
+    seat_numbers = models.CharField(max_length=100, blank=True, default='')  # 分配的座位号，如 "12-14,20"
+    status_reason = models.CharField(max_length=100, blank=True, default='')  # 排队预订被拒绝的原因
+    # 预订时锁定的单价和总价（见 flights/pricing.py），读取时不再重新计算
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
+    objects = BookingQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # 排队模式下工作进程按状态+航班取待确认预订
+            models.Index(fields=['status', 'flight'], name='booking_status_flight_idx'),
+            # 预订列表游标分页：用户自己的预订、管理端全部预订
+            models.Index(fields=['user', 'booking_time', 'id'], name='booking_user_time_idx'),
+            models.Index(fields=['booking_time', 'id'], name='booking_time_id_idx'),
+        ]
 
     @property
     def total_price(self):
-        """计算总价格"""
+        """总价：优先使用预订时锁定的金额，其次是 with_total_price 的数据库计算结果"""
+        if self.total_amount is not None:
+            return self.total_amount
+        if 'annotated_total_price' in self.__dict__:
+            return self.annotated_total_price
         if self.seat_class == 'economy':
             return self.flight.economy_price * self.seat_count
         elif self.seat_class == 'business':
@@ -55,3 +175,162 @@ class Booking(models.Model):
 
     def __str__(self):
         return f'{self.user.username} - {self.flight.flight_number}'
+
+
+class SeatMap(models.Model):
+    """航班某舱位的座位占用位图：第 n 位为 1 表示 n+1 号座位已被占用"""
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name='seat_maps')
+    seat_class = models.CharField(max_length=20, choices=Booking.SEAT_CLASS_CHOICES)
+    capacity = models.PositiveIntegerField(default=0)
+    occupancy = models.BinaryField(default=bytes)
+    version = models.PositiveIntegerField(default=0)  # 乐观锁版本号
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['flight', 'seat_class'], name='seatmap_flight_class_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.flight_id} - {self.seat_class}'
+
+
+class RouteAvailability(models.Model):
+    """航线+日期+舱位的余票汇总（物化表），由 flights/availability.py 增量维护"""
+    departure_city_key = models.CharField(max_length=100)
+    arrival_city_key = models.CharField(max_length=100)
+    date = models.DateField()
+    seat_class = models.CharField(max_length=20, choices=Booking.SEAT_CLASS_CHOICES)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True)  # 有余票航班中的最低价，售罄为空
+    seats_left = models.PositiveIntegerField(default=0)
+    flight_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # 同时作为日历查询的索引：航线等值 + 日期范围
+            models.UniqueConstraint(
+                fields=['departure_city_key', 'arrival_city_key', 'seat_class', 'date'],
+                name='route_availability_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.departure_city_key}-{self.arrival_city_key} {self.date} {self.seat_class}'
+
+
+class SalesRollup(models.Model):
+    """航班+舱位的销售汇总（物化表），由 flights/analytics.py 增量维护；
+    起飞日期、航线、航空公司冗余在行上，航班归档后汇总保留"""
+    flight_id = models.BigIntegerField()  # 不建外键：航班归档（删除）后仍保留汇总
+    seat_class = models.CharField(max_length=20, choices=Booking.SEAT_CLASS_CHOICES)
+    flight_number = models.CharField(max_length=20)
+    date = models.DateField()  # 起飞日期（当地时间）
+    departure_city_key = models.CharField(max_length=100)
+    arrival_city_key = models.CharField(max_length=100)
+    airline = models.CharField(max_length=100)
+    capacity = models.PositiveIntegerField(default=0)
+    seats_sold = models.PositiveIntegerField(default=0)
+    booking_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['flight_id', 'seat_class'], name='sales_rollup_flight_class_uniq'),
+        ]
+        indexes = [
+            # 按日期范围统计，可再按航线或航空公司过滤
+            models.Index(fields=['date'], name='sales_rollup_date_idx'),
+            models.Index(fields=['departure_city_key', 'arrival_city_key', 'date'], name='sales_rollup_route_idx'),
+            models.Index(fields=['airline', 'date'], name='sales_rollup_airline_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.flight_number} {self.date} {self.seat_class}'
+
+
+class ArchivedFlight(models.Model):
+    """已起飞航班的归档（冷数据），字段与 Flight 相同，保留原航班 id；由 flights/archive.py 写入"""
+    id = models.BigIntegerField(primary_key=True)
+    flight_number = models.CharField(max_length=20)  # 航班号可被新航班复用，归档表中不唯一
+    departure_city = models.CharField(max_length=100)
+    arrival_city = models.CharField(max_length=100)
+    departure_time = models.DateTimeField()
+    arrival_time = models.DateTimeField()
+    airline = models.CharField(max_length=100)
+    aircraft_type = models.CharField(max_length=100)
+    economy_seats = models.PositiveIntegerField(default=0)
+    business_seats = models.PositiveIntegerField(default=0)
+    first_seats = models.PositiveIntegerField(default=0)
+    economy_price = models.DecimalField(max_digits=10, decimal_places=2)
+    business_price = models.DecimalField(max_digits=10, decimal_places=2)
+    first_price = models.DecimalField(max_digits=10, decimal_places=2)
+    departure_city_key = models.CharField(max_length=100, default='', editable=False)
+    arrival_city_key = models.CharField(max_length=100, default='', editable=False)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['departure_city_key', 'arrival_city_key', 'departure_time'],
+                name='archived_flight_route_idx',
+            ),
+            models.Index(fields=['flight_number', 'departure_time'], name='archived_flight_number_idx'),
+            models.Index(fields=['departure_time', 'id'], name='archived_flight_time_id_idx'),
+        ]
+
+    def __str__(self):
+        return self.flight_number
+
+
+class ArchivedBooking(models.Model):
+    """已起飞航班上的预订归档，字段与 Booking 相同，保留原预订 id"""
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    flight = models.ForeignKey(ArchivedFlight, on_delete=models.CASCADE, related_name='bookings')
+    seat_class = models.CharField(max_length=20, choices=Booking.SEAT_CLASS_CHOICES)
+    seat_count = models.PositiveIntegerField(default=1)
+    passenger_name = models.CharField(max_length=100)
+    passenger_id = models.CharField(max_length=18)
+    phone = models.CharField(max_length=20)
+    status = models.CharField(max_length=20, choices=Booking.STATUS_CHOICES)
+    booking_time = models.DateTimeField()
+    seat_numbers = models.CharField(max_length=100, blank=True, default='')
+    status_reason = models.CharField(max_length=100, blank=True, default='')
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'booking_time', 'id'], name='archived_booking_user_idx'),
+        ]
+
+    @property
+    def total_price(self):
+        return self.total_amount
+
+    def __str__(self):
+        return f'{self.user_id} - {self.flight_id}'
+
+
+class IdempotencyKey(models.Model):
+    """Idempotency-Key 请求头的处理记录：status_code 为空表示第一个请求还在处理，由 flights/idempotency.py 维护"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)  # 请求方法+路径+请求体的 SHA-256
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_body = models.TextField(blank=True, default='')  # 序列化后的响应 JSON
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user_id} - {self.key}'
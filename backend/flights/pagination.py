@@ -0,0 +1,113 @@
+import base64
+import json
+
+from django.db.models import Q
+from django.db.models.query import ValuesListIterable
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(timestamp, pk):
+    """把 (时间, id) 键值编码成不透明的游标字符串"""
+    raw = json.dumps([timestamp.isoformat(), pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """解析游标，返回 (时间, id)；格式不合法时抛出 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        timestamp = parse_datetime(timestamp)
+        pk = int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor.')
+    if timestamp is None:
+        raise ValueError('Invalid cursor.')
+    return timestamp, pk
+
+
+class KeysetPagination(BasePagination):
+    """游标分页：按 (视图的 keyset_field, id) 排序，用上一页最后一条的键值做 WHERE 条件，
+    不执行 COUNT(*) 和 OFFSET，翻到多深的页面耗时都一样。未设置 keyset_field 的视图只按 id 排序。
+
+    返回 {"next": 下一页链接, "results": [...]}，与航班搜索接口一致。
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE or 20
+        value = request.query_params.get(self.page_size_query_param)
+        if value:
+            try:
+                page_size = int(value)
+            except ValueError:
+                raise ParseError('Invalid page size.')
+            if page_size <= 0:
+                raise ParseError('Invalid page size.')
+        return min(page_size, self.max_page_size)
+
+    def _key_getter(self, queryset, field):
+        """取出一行的 (时间, id)：模型实例按属性取；values_list() 结果按列位置取"""
+        names = list(getattr(queryset, '_fields', None) or ())
+        if names and issubclass(queryset._iterable_class, ValuesListIterable):
+            id_index = names.index('id')
+            time_index = names.index(field) if field else None
+            return lambda row: (row[time_index] if field else None, row[id_index])
+        if names:
+            return lambda row: (row[field] if field else None, row['id'])
+        return lambda row: (getattr(row, field) if field else None, row.pk)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        field = getattr(view, 'keyset_field', None)
+        page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            if field:
+                try:
+                    last_time, last_id = decode_cursor(cursor)
+                except ValueError as exc:
+                    raise ParseError(str(exc))
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gt': last_time}) | Q(**{field: last_time, 'id__gt': last_id}))
+            else:
+                try:
+                    last_id = int(cursor)
+                except ValueError:
+                    raise ParseError('Invalid cursor.')
+                queryset = queryset.filter(id__gt=last_id)
+
+        ordering = (field, 'id') if field else ('id',)
+        # 多取一条用来判断是否还有下一页
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        self.next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            timestamp, pk = self._key_getter(queryset, field)(rows[-1])
+            self.next_cursor = encode_cursor(timestamp, pk) if field else str(pk)
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
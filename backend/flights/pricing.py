@@ -0,0 +1,100 @@
+"""动态票价：在舱位基础票价上按上座率和距起飞时间乘以倍率，报价按 航班+舱位 缓存。
+
+上座率 = 1 - 剩余座位 / 座位图容量。缓存键带航班版本号（与航班读缓存共用，
+预订、取消、修改航班时都会提升），库存一变旧报价立即失效；距起飞时间的档位变化靠缓存有效期刷新。
+预订时把报价写入 Booking.unit_price / total_amount，之后读取预订不再计算价格。
+"""
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .availability import PRICE_FIELDS
+from .caching import get_version, flight_version_key
+from .inventory import seat_field
+from .models import Flight, SeatMap
+
+# (上座率下限, 倍率)，取第一个满足的档位
+DEFAULT_LOAD_FACTOR_TIERS = ((0.9, '1.50'), (0.75, '1.25'), (0.5, '1.10'))
+# (距起飞天数上限, 倍率)，取第一个满足的档位
+DEFAULT_DEPARTURE_TIERS = ((1, '1.30'), (7, '1.15'))
+
+CENT = Decimal('0.01')
+
+Quote = namedtuple('Quote', [
+    'flight_id', 'seat_class', 'seat_count', 'base_price', 'unit_price', 'total_price',
+    'multiplier', 'load_factor', 'seats_left',
+])
+
+
+def load_factor_multiplier(load_factor):
+    for threshold, multiplier in getattr(settings, 'FARE_LOAD_FACTOR_TIERS', DEFAULT_LOAD_FACTOR_TIERS):
+        if load_factor >= threshold:
+            return Decimal(multiplier)
+    return Decimal(1)
+
+
+def departure_multiplier(departure_time, now=None):
+    days = (departure_time - (now or timezone.now())).total_seconds() / 86400
+    for max_days, multiplier in getattr(settings, 'FARE_DEPARTURE_TIERS', DEFAULT_DEPARTURE_TIERS):
+        if days < max_days:
+            return Decimal(multiplier)
+    return Decimal(1)
+
+
+def _cache_key(flight_id, seat_class):
+    return f'fare_quote:{flight_id}:{seat_class}:{get_version(flight_version_key(flight_id))}'
+
+
+def _compute_fare(flight_id, seat_class):
+    """一条查询取出基础票价、剩余座位和座位图容量，算出单价；航班不存在或已起飞返回 None"""
+    capacity = SeatMap.objects.filter(flight=OuterRef('pk'), seat_class=seat_class).values('capacity')[:1]
+    row = (
+        Flight.objects.filter(pk=flight_id, departure_time__gt=timezone.now())
+        .annotate(capacity=Subquery(capacity))
+        .values_list(PRICE_FIELDS[seat_class], seat_field(seat_class), 'departure_time', 'capacity')
+        .first()
+    )
+    if row is None:
+        return None
+    base_price, seats_left, departure_time, capacity = row
+    # 没有座位图的航班（如批量导入后尚未预订）按空座处理
+    load_factor = min(max(1 - seats_left / capacity, 0.0), 1.0) if capacity else 0.0
+    multiplier = load_factor_multiplier(load_factor) * departure_multiplier(departure_time)
+    return {
+        'base_price': base_price,
+        'unit_price': (base_price * multiplier).quantize(CENT, ROUND_HALF_UP),
+        'multiplier': multiplier,
+        'load_factor': round(load_factor, 4),
+        'seats_left': seats_left,
+    }
+
+
+def quote_fare(flight_id, seat_class, seat_count=1):
+    """报价：缓存命中时不访问数据库；航班不存在或已起飞返回 None"""
+    key = _cache_key(flight_id, seat_class)
+    fare = cache.get(key)
+    if fare is None:
+        fare = _compute_fare(flight_id, seat_class)
+        if fare is None:
+            return None
+        cache.set(key, fare, getattr(settings, 'FARE_QUOTE_TIMEOUT', 60))
+    return Quote(flight_id, seat_class, seat_count, total_price=fare['unit_price'] * seat_count, **fare)
+
+
+def quote_data(quote):
+    """报价的接口输出，金额与 DRF DecimalField 一样输出为字符串"""
+    return {
+        'flight': quote.flight_id,
+        'seat_class': quote.seat_class,
+        'seat_count': quote.seat_count,
+        'base_price': f'{quote.base_price:.2f}',
+        'unit_price': f'{quote.unit_price:.2f}',
+        'total_price': f'{quote.total_price:.2f}',
+        'multiplier': f'{quote.multiplier:.4f}',
+        'load_factor': quote.load_factor,
+        'seats_left': quote.seats_left,
+    }
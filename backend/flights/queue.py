@@ -0,0 +1,113 @@
+"""排队预订：请求只写入 pending 预订，工作进程按航班+舱位分批确认或拒绝。
+
+队列就是 Booking 表本身（status='pending'），不依赖外部消息中间件。
+工作进程按 flight_id % 分区数 划分航班，同一航班只会被一个工作进程处理，
+抢票高峰时对同一航班的座位扣减从每个请求一次合并成每批一次。
+"""
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Mod
+from django.utils import timezone
+
+from .analytics import record_sales
+from .inventory import seat_field, reserve_seats
+from .models import Flight, Booking
+from .pricing import quote_fare
+from .seatmap import assign_seats, format_seats
+
+
+def pending_bookings(partition=0, partitions=1):
+    queryset = Booking.objects.filter(status='pending')
+    if partitions > 1:
+        queryset = queryset.annotate(partition=Mod('flight_id', partitions)).filter(partition=partition)
+    return queryset
+
+
+def _reject(bookings, reason):
+    for booking in bookings:
+        booking.status = 'rejected'
+        booking.status_reason = reason
+
+
+@transaction.atomic
+def confirm_group(flight_id, seat_class, booking_ids):
+    """按提交顺序确认同一航班同一舱位的一组待确认预订，返回 (确认数, 拒绝数)"""
+    # 先锁住这些预订再读取，防止与取消请求交错
+    pending = Booking.objects.filter(id__in=booking_ids, status='pending')
+    if not pending.lock():
+        return 0, 0
+    bookings = list(pending.order_by('id'))
+
+    field = seat_field(seat_class)
+    flight = Flight.objects.filter(id=flight_id).values(field, 'departure_time').first()
+    admitted = []
+    if flight is None:
+        _reject(bookings, 'Flight not found.')
+    elif flight['departure_time'] <= timezone.now():
+        _reject(bookings, 'Cannot book expired flights.')
+    else:
+        # 按先来先得在剩余座位内挑出能满足的预订，一条条件UPDATE扣减总数；整组按同一报价定价
+        quote = quote_fare(flight_id, seat_class)
+        available = flight[field] if quote is not None else 0
+        for booking in bookings:
+            if booking.seat_count <= available:
+                admitted.append(booking)
+                available -= booking.seat_count
+        if admitted and not reserve_seats(flight_id, seat_class, sum(b.seat_count for b in admitted)):
+            # 读取后库存被同步接口扣减了，退回逐条扣减
+            admitted = [b for b in admitted if reserve_seats(flight_id, seat_class, b.seat_count)]
+        admitted_ids = {b.id for b in admitted}
+        _reject([b for b in bookings if b.id not in admitted_ids], 'Not enough seats available.')
+
+    if admitted:
+        seats = iter(assign_seats(flight_id, seat_class, sum(b.seat_count for b in admitted)))
+        for booking in admitted:
+            booking.status = 'confirmed'
+            booking.seat_numbers = format_seats([next(seats) for _ in range(booking.seat_count)])
+            booking.unit_price = quote.unit_price
+            booking.total_amount = quote.unit_price * booking.seat_count
+    Booking.objects.bulk_update(bookings, ['status', 'status_reason', 'seat_numbers', 'unit_price', 'total_amount'])
+    if admitted:
+        record_sales(flight_id, seat_class, sum(b.seat_count for b in admitted), len(admitted),
+                     sum(b.total_amount for b in admitted))
+    return len(admitted), len(bookings) - len(admitted)
+
+
+def process_batch(partition=0, partitions=1, batch_size=None):
+    """处理一批待确认预订，返回 (确认数, 拒绝数)"""
+    batch_size = batch_size or getattr(settings, 'BOOKING_QUEUE_BATCH_SIZE', 200)
+    rows = pending_bookings(partition, partitions).order_by('id').values_list(
+        'id', 'flight_id', 'seat_class')[:batch_size]
+
+    groups = {}
+    for booking_id, flight_id, seat_class in rows:
+        groups.setdefault((flight_id, seat_class), []).append(booking_id)
+
+    confirmed = rejected = 0
+    for (flight_id, seat_class), booking_ids in groups.items():
+        ok, failed = confirm_group(flight_id, seat_class, booking_ids)
+        confirmed += ok
+        rejected += failed
+    return confirmed, rejected
+
+
+def booking_status(booking):
+    return {
+        'id': booking.id,
+        'status': booking.status,
+        'status_reason': booking.status_reason,
+        'seat_numbers': booking.seat_numbers,
+    }
+
+
+def wait_for_booking(queryset, booking_id, wait, interval=0.2):
+    """长轮询：等待预订离开 pending 状态，最多 wait 秒；预订不存在返回 None"""
+    deadline = time.monotonic() + wait
+    while True:
+        booking = queryset.filter(id=booking_id).only(
+            'id', 'status', 'status_reason', 'seat_numbers').first()
+        if booking is None or booking.status != 'pending' or time.monotonic() >= deadline:
+            return booking
+        time.sleep(interval)
@@ -0,0 +1,347 @@
+"""余票实时推送：客户端订阅某个航班后，预订/取消引起的座位变化通过 SSE 或 WebSocket 推送，不再轮询。
+
+    GET /stream/flights/<id>/      Server-Sent Events
+    WS  /ws/flights/<id>/          WebSocket
+
+两个入口都是 asgi.py 中挂在 Django 前面的 ASGI 应用，只在 ASGI 服务器（uvicorn/daphne）下可用。
+连接建立后先发送一条当前余票快照（type=snapshot），之后每次变化发送一条 type=availability 消息，
+带各舱位当前剩余座位数（seats）和这段时间内累计的变化量（delta）。
+
+库存变化（inventory_changed，事务提交后发出）交给 AvailabilityPublisher：同一航班在 REALTIME_DEBOUNCE_MS
+毫秒内的多次变化合并成一条消息，由后台线程一条查询读出这些航班的当前座位数后交给消息代理发布；
+没有订阅者的航班直接跳过，不产生任何查询。
+
+这两个入口不经过 Django 的中间件，连接时自己做限流和限额：
+- 按客户端 IP 在 search 作用域取令牌（与查询接口共用令牌桶），超出时 SSE 返回 429、WebSocket 以 4429 关闭
+- 每个连接只订阅一个航班；同一 IP 最多 REALTIME_MAX_STREAMS_PER_CLIENT 个连接，同一航班最多
+  REALTIME_MAX_SUBSCRIBERS_PER_FLIGHT 个订阅（进程内计数），超出时同样拒绝
+- 读快照在线程池中执行（使用线程自己的数据库连接），前后调用 close_old_connections，长连接不会一直占着数据库连接
+
+消息代理由 REALTIME_BROKER 指定，需要实现 has_subscribers / subscribe / unsubscribe / publish 四个方法，
+默认的 InProcessBroker 只在本进程内分发；多进程部署时换成跨进程的实现（如 Redis 发布订阅）。
+"""
+import asyncio
+import json
+import logging
+import math
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+from rest_framework.throttling import BaseThrottle
+
+from .inventory import SEAT_FIELDS
+from .models import Flight
+from .throttling import throttle_wait
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = re.compile(r'^/stream/flights/(\d+)/$')
+WEBSOCKET_PATH = re.compile(r'^/ws/flights/(\d+)/$')
+
+
+def _offer(queue, message):
+    # 消息里带有完整的余票数，慢客户端的队列满了直接丢掉最旧的一条
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(message)
+
+
+class InProcessBroker:
+    """进程内发布订阅：订阅者是事件循环里的 asyncio.Queue，publish 可以在任意线程调用"""
+
+    def __init__(self, queue_size=None):
+        self.queue_size = queue_size or getattr(settings, 'REALTIME_QUEUE_SIZE', 16)
+        self._lock = threading.Lock()
+        self._subscribers = {}  # 航班 id -> {队列: 所在事件循环}
+
+    def has_subscribers(self, flight_id):
+        return flight_id in self._subscribers
+
+    def subscribe(self, flight_id):
+        """在事件循环中调用，返回接收消息的队列"""
+        queue = asyncio.Queue(self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(flight_id, {})[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, flight_id, queue):
+        with self._lock:
+            queues = self._subscribers.get(flight_id, {})
+            queues.pop(queue, None)
+            if not queues:
+                self._subscribers.pop(flight_id, None)
+
+    def publish(self, flight_id, message):
+        with self._lock:
+            targets = list(self._subscribers.get(flight_id, {}).items())
+        for queue, loop in targets:
+            try:
+                loop.call_soon_threadsafe(_offer, queue, message)
+            except RuntimeError:
+                pass  # 事件循环已关闭，连接随之断开
+
+
+class StreamLimits:
+    """进程内的连接计数：每个客户端的连接数、每个航班的订阅数"""
+
+    def __init__(self, per_client=None, per_flight=None):
+        self.per_client = per_client or getattr(settings, 'REALTIME_MAX_STREAMS_PER_CLIENT', 8)
+        self.per_flight = per_flight or getattr(settings, 'REALTIME_MAX_SUBSCRIBERS_PER_FLIGHT', 5000)
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._flights = {}
+
+    def acquire(self, client, flight_id):
+        """占用一个名额，超出任一上限时返回 False"""
+        with self._lock:
+            if self._clients.get(client, 0) >= self.per_client or \
+                    self._flights.get(flight_id, 0) >= self.per_flight:
+                return False
+            self._clients[client] = self._clients.get(client, 0) + 1
+            self._flights[flight_id] = self._flights.get(flight_id, 0) + 1
+            return True
+
+    def release(self, client, flight_id):
+        with self._lock:
+            for counts, key in ((self._clients, client), (self._flights, flight_id)):
+                counts[key] -= 1
+                if not counts[key]:
+                    del counts[key]
+
+
+class AvailabilityPublisher:
+    """合并同一航班的库存变化：第一次变化后等待 delay 秒，期间的变化累加成一条消息"""
+
+    def __init__(self, broker, delay=None):
+        self.broker = broker
+        self.delay = delay if delay is not None else getattr(settings, 'REALTIME_DEBOUNCE_MS', 200) / 1000
+        self._cond = threading.Condition()
+        self._pending = {}  # 航班 id -> (发送时间, {舱位: 累计变化})
+        self._thread = None
+
+    def notify(self, flight_id, seat_class, delta):
+        if not self.broker.has_subscribers(flight_id):
+            return
+        with self._cond:
+            entry = self._pending.get(flight_id)
+            if entry is None:
+                entry = self._pending[flight_id] = (time.monotonic() + self.delay, {})
+            entry[1][seat_class] = entry[1].get(seat_class, 0) + delta
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='availability-publisher', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _take_due(self):
+        """等到有航班到期，取出所有到期的航班"""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                due = {flight_id: deltas for flight_id, (at, deltas) in self._pending.items() if at <= now}
+                if due:
+                    for flight_id in due:
+                        del self._pending[flight_id]
+                    return due
+                wake = min((at for at, _ in self._pending.values()), default=None)
+                self._cond.wait(None if wake is None else wake - now)
+
+    def _run(self):
+        while True:
+            due = self._take_due()
+            try:
+                self.flush(due)
+            except Exception:
+                logger.exception('failed to publish availability for flights %s', sorted(due))
+            finally:
+                close_old_connections()
+
+    def flush(self, due):
+        """due: {航班 id: {舱位: 累计变化}}，一条查询读出当前座位数后逐个航班发布"""
+        rows = Flight.objects.filter(id__in=list(due)).values('id', *SEAT_FIELDS.values())
+        for row in rows:
+            flight_id = row['id']
+            self.broker.publish(flight_id, _message('availability', flight_id, row, due[flight_id]))
+
+
+def _message(kind, flight_id, row, delta=None):
+    data = {
+        'type': kind,
+        'flight_id': flight_id,
+        'seats': {seat_class: row[field] for seat_class, field in SEAT_FIELDS.items()},
+    }
+    if delta is not None:
+        data['delta'] = delta
+    return json.dumps(data)
+
+
+_broker = None
+_publisher = None
+_limits = None
+_init_lock = threading.RLock()
+
+
+def broker():
+    global _broker
+    if _broker is None:
+        with _init_lock:
+            if _broker is None:
+                _broker = import_string(getattr(settings, 'REALTIME_BROKER', 'flights.realtime.InProcessBroker'))()
+    return _broker
+
+
+def publisher():
+    global _publisher
+    if _publisher is None:
+        with _init_lock:
+            if _publisher is None:
+                _publisher = AvailabilityPublisher(broker())
+    return _publisher
+
+
+def limits():
+    global _limits
+    if _limits is None:
+        with _init_lock:
+            if _limits is None:
+                _limits = StreamLimits()
+    return _limits
+
+
+def _client_ident(scope):
+    """与 DRF 限流相同的客户端 IP（遵循 NUM_PROXIES），从 ASGI scope 的请求头读取"""
+    meta = {'REMOTE_ADDR': (scope.get('client') or ('',))[0]}
+    forwarded = dict(scope.get('headers') or ()).get(b'x-forwarded-for')
+    if forwarded is not None:
+        meta['HTTP_X_FORWARDED_FOR'] = forwarded.decode('latin-1')
+    return f'ip:{BaseThrottle().get_ident(SimpleNamespace(META=meta))}'
+
+
+def _admit(scope, flight_id):
+    """连接时限流和限额：放行返回 (客户端, None)，拒绝返回 (客户端, (状态码, 说明, Retry-After))"""
+    client = _client_ident(scope)
+    wait = throttle_wait('search', client)
+    if wait:
+        return client, (429, 'Request was throttled.', math.ceil(wait))
+    if not limits().acquire(client, flight_id):
+        return client, (429, 'Too many streams.', getattr(settings, 'SHED_RETRY_AFTER', 2))
+    return client, None
+
+
+def _read_snapshot(flight_id):
+    # 不经过 Django 的请求周期，在线程池线程自己的连接上查询，查询前后清理过期连接；
+    # 不能在调用方线程上执行，否则会关掉调用方（可能在事务中）的连接
+    close_old_connections()
+    try:
+        row = Flight.objects.filter(pk=flight_id).values(*SEAT_FIELDS.values()).first()
+    finally:
+        close_old_connections()
+    return None if row is None else _message('snapshot', flight_id, row)
+
+
+async def _snapshot(flight_id):
+    return await sync_to_async(_read_snapshot, thread_sensitive=False)(flight_id)
+
+
+async def _wait_disconnect(receive):
+    while True:
+        event = await receive()
+        if event['type'] in ('http.disconnect', 'websocket.disconnect'):
+            return
+
+
+async def _messages(queue, receive, heartbeat):
+    """依次产出订阅到的消息，heartbeat 秒内没有消息时产出 None，客户端断开后结束"""
+    disconnect = asyncio.ensure_future(_wait_disconnect(receive))
+    try:
+        while True:
+            get = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({get, disconnect}, timeout=heartbeat, return_when=asyncio.FIRST_COMPLETED)
+            if get not in done:
+                get.cancel()
+            if disconnect in done:
+                return
+            yield get.result() if get in done else None
+    finally:
+        disconnect.cancel()
+
+
+async def _send_error(send, status_code, message, retry_after=None):
+    body = json.dumps({'error': message}).encode()
+    headers = [(b'content-type', b'application/json')]
+    if retry_after is not None:
+        headers.append((b'retry-after', str(retry_after).encode()))
+    await send({'type': 'http.response.start', 'status': status_code, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def stream_availability(scope, receive, send, flight_id):
+    """SSE：没有变化时每 REALTIME_HEARTBEAT_SECONDS 秒发送一行注释，让代理和客户端保持连接"""
+    if scope['method'] != 'GET':
+        return await _send_error(send, 405, 'Method not allowed.')
+    client, rejected = _admit(scope, flight_id)
+    if rejected is not None:
+        return await _send_error(send, *rejected)
+    subscriptions = broker()
+    queue = subscriptions.subscribe(flight_id)
+    try:
+        snapshot = await _snapshot(flight_id)
+        if snapshot is None:
+            return await _send_error(send, 404, 'Flight not found.')
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),  # 关闭 Nginx 缓冲
+        ]})
+        await send({'type': 'http.response.body', 'body': f'data: {snapshot}\n\n'.encode(), 'more_body': True})
+        async for message in _messages(queue, receive, getattr(settings, 'REALTIME_HEARTBEAT_SECONDS', 15)):
+            body = b': ping\n\n' if message is None else f'data: {message}\n\n'.encode()
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        subscriptions.unsubscribe(flight_id, queue)
+        limits().release(client, flight_id)
+
+
+async def websocket_availability(scope, receive, send, flight_id):
+    """WebSocket：只推送，客户端发来的消息忽略；航班不存在时以 4404 关闭，被限流时以 4429 关闭"""
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+    client, rejected = _admit(scope, flight_id)
+    if rejected is not None:
+        return await send({'type': 'websocket.close', 'code': 4429})
+    subscriptions = broker()
+    queue = subscriptions.subscribe(flight_id)
+    try:
+        snapshot = await _snapshot(flight_id)
+        if snapshot is None:
+            return await send({'type': 'websocket.close', 'code': 4404})
+        await send({'type': 'websocket.accept'})
+        await send({'type': 'websocket.send', 'text': snapshot})
+        async for message in _messages(queue, receive, None):
+            await send({'type': 'websocket.send', 'text': message})
+    finally:
+        subscriptions.unsubscribe(flight_id, queue)
+        limits().release(client, flight_id)
+
+
+def realtime_application(django_application):
+    """把推送地址分给上面的处理函数，其余请求交给 Django"""
+    async def application(scope, receive, send):
+        if scope['type'] == 'http':
+            match = STREAM_PATH.match(scope['path'])
+            if match:
+                return await stream_availability(scope, receive, send, int(match.group(1)))
+        elif scope['type'] == 'websocket':
+            match = WEBSOCKET_PATH.match(scope['path'])
+            if match:
+                return await websocket_availability(scope, receive, send, int(match.group(1)))
+            return await send({'type': 'websocket.close', 'code': 4404})
+        return await django_application(scope, receive, send)
+    return application
@@ -0,0 +1,37 @@
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentation import timed_serialization
+
+try:
+    import orjson
+except ImportError:  # 未安装 orjson 时退回标准库 json
+    orjson = None
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSON 渲染耗时计入请求的序列化时间"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed_serialization():
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class FastJSONRenderer(BaseRenderer):
+    """紧凑 JSON 输出，优先使用 orjson 编码；列表接口配合 flights/fastpath.py 使用"""
+    media_type = 'application/vnd.flights.fast+json'
+    format = 'fast'
+    charset = None
+
+    _default = JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        with timed_serialization():
+            if orjson is not None:
+                # 日期时间交给 DRF 编码器处理，保证与 JSONRenderer 输出格式一致
+                return orjson.dumps(data, default=self._default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+            return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')).encode()
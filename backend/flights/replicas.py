@@ -0,0 +1,138 @@
+"""只读副本路由：查询类接口和管理端报表读副本，预订等写操作及其后的读取走主库。
+
+- 副本由环境变量 DB_REPLICAS 配置（见 flight_service/database.py），没有副本时所有读写都走 default
+- ReplicaMiddleware 为每个请求建立一份路由状态；视图混入 ReplicaReadMixin，replica_actions 中的动作允许读副本
+- 请求内一旦有写操作（含 select_for_update），之后的读取都回到主库；事务内的读取总是走主库
+- 会话粘滞：用户写入后 REPLICA_STICKY_SECONDS 秒内，该用户的请求都读主库，避免刚创建的预订在副本上还查不到。
+  航班列表/搜索等 replica_lag_tolerant 的视图不受粘滞影响，容忍副本延迟
+- 请求之外（管理命令、后台线程）不读副本
+"""
+import asyncio
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_KEY = 'replica_pin:{}'
+
+_state = ContextVar('replica_routing', default=None)
+
+
+class RoutingState:
+    __slots__ = ('use_replica', 'wrote', 'user_id')
+
+    def __init__(self):
+        self.use_replica = False
+        self.wrote = False
+        self.user_id = None
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+def _sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.replicas = replica_aliases()
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if not self.replicas or state is None or not state.use_replica or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库是同一份数据
+        return True
+
+
+def reading_replica():
+    """当前请求是否允许读副本"""
+    state = _state.get()
+    return state is not None and state.use_replica and not state.wrote and bool(replica_aliases())
+
+
+def cache_timeout(timeout):
+    """读副本时缓存时间不超过 REPLICA_CACHE_TIMEOUT：缓存失效后立刻从副本读到的可能是旧数据，
+    不能按完整的缓存时间保存在新版本号下"""
+    if reading_replica():
+        return min(timeout, getattr(settings, 'REPLICA_CACHE_TIMEOUT', 5))
+    return timeout
+
+
+def set_request_user(user_id):
+    """记下当前请求的用户，请求中有写入时对该用户启用会话粘滞"""
+    state = _state.get()
+    if state is not None:
+        state.user_id = user_id
+
+
+class ReplicaReadMixin:
+    """视图混入：replica_actions 中的动作读副本；replica_lag_tolerant 为 False 时遵守会话粘滞"""
+    replica_actions = ()
+    replica_lag_tolerant = False
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        state = _state.get()
+        if state is None:
+            return
+        user_id = request.user.pk if request.user.is_authenticated else None
+        set_request_user(user_id)
+        if self.action not in self.replica_actions:
+            return
+        if not self.replica_lag_tolerant and user_id is not None and cache.get(STICKY_KEY.format(user_id)):
+            return
+        state.use_replica = True
+
+
+class ReplicaMiddleware:
+    """每个请求一份路由状态；请求中有写入时记下用户，之后一段时间该用户的读取都走主库"""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            return self.get_response(request)
+        finally:
+            _state.reset(token)
+            _pin_after_write(state)
+
+    async def __acall__(self, request):
+        state = RoutingState()
+        token = _state.set(state)
+        try:
+            return await self.get_response(request)
+        finally:
+            _state.reset(token)
+            _pin_after_write(state)
+
+
+def _pin_after_write(state):
+    if state.wrote and state.user_id is not None and replica_aliases():
+        cache.set(STICKY_KEY.format(state.user_id), 1, _sticky_seconds())
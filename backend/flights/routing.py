@@ -0,0 +1,235 @@
+"""中转航线搜索：进程内的航线图 + 按时间展开的最优优先搜索。
+
+航线图按出发城市（归一化后）保存未起飞航班，每个城市的航班按起飞时间排序，用 bisect 找出
+某个时间窗口内起飞的航班。航班增删改时通过信号写入共享缓存中的变更日志（世代号 + 航班 id），
+各进程在查询前对比世代号，只重新读取变化的航班；日志缺失（缓存被清空、批量导入）时全量重建。
+
+搜索：从出发城市当天起飞的航班开始，按代价（总时长或总票价，随着航段增加单调不减）用堆逐个展开，
+下一段必须在上一段到达后 [最短中转时间, 最长中转时间] 内从到达城市起飞，且不重复经过同一城市。
+堆顶到达目的地的行程就是当前最优，依次取出即为排好序的结果。座位数经常变化，不放进航线图，
+最后用一条查询核对候选行程各航段的余票。
+"""
+import heapq
+import threading
+from bisect import bisect_left
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from rest_framework.fields import DateTimeField
+
+from .availability import PRICE_FIELDS
+from .inventory import seat_field
+from .models import Flight
+
+GENERATION_KEY = 'route_graph:generation'
+CHANGE_KEY = 'route_graph:change:{}'
+# 变更日志保留时间（秒）与一次最多回放的条数，超出时全量重建
+CHANGE_TTL = 3600
+MAX_REPLAY = 1000
+
+SORTS = ('duration', 'price')
+
+LEG_FIELDS = (
+    'id', 'flight_number', 'airline', 'departure_city', 'arrival_city',
+    'departure_city_key', 'arrival_city_key', 'departure_time', 'arrival_time',
+    'economy_price', 'business_price', 'first_price',
+)
+
+Leg = namedtuple('Leg', LEG_FIELDS)
+Itinerary = namedtuple('Itinerary', ['legs', 'duration', 'price'])
+
+
+def _generation():
+    return cache.get(GENERATION_KEY)
+
+
+def record_change(flight_id):
+    """航班增删改后调用：写入变更日志，各进程下次查询前增量刷新"""
+    try:
+        generation = cache.incr(GENERATION_KEY)
+    except ValueError:
+        reset_route_graph()
+        return
+    cache.set(CHANGE_KEY.format(generation), flight_id, CHANGE_TTL)
+
+
+def reset_route_graph():
+    """批量写入（导入、归档）后调用：换一个新的世代号，各进程下次查询前全量重建"""
+    cache.set(GENERATION_KEY, int(timezone.now().timestamp() * 1000), None)
+
+
+class RouteGraph:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._legs = {}      # 航班 id -> Leg
+        self._cities = {}    # 出发城市 -> (起飞时间列表, Leg 列表)，两个列表按 (起飞时间, id) 排序
+
+    def _load(self, queryset):
+        # 总是读主库：副本落后时按变更日志读到的旧数据会一直留在航线图里
+        return [Leg(*row) for row in queryset.using(DEFAULT_DB_ALIAS).values_list(*LEG_FIELDS)]
+
+    def rebuild(self):
+        legs = self._load(Flight.objects.live().order_by('departure_time', 'id'))
+        cities = {}
+        for leg in legs:
+            times, city_legs = cities.setdefault(leg.departure_city_key, ([], []))
+            times.append(leg.departure_time)
+            city_legs.append(leg)
+        self._legs = {leg.id: leg for leg in legs}
+        self._cities = cities
+
+    def apply(self, flight_ids):
+        """重新读取变化的航班。受影响城市的列表复制后替换，正在进行的查询仍读到一致的旧列表"""
+        flight_ids = set(flight_ids)
+        fresh = {leg.id: leg for leg in self._load(Flight.objects.live().filter(id__in=flight_ids))}
+        changed = {}
+        for flight_id in flight_ids:
+            for leg in (self._legs.pop(flight_id, None), fresh.get(flight_id)):
+                if leg is not None and leg.departure_city_key not in changed:
+                    times, city_legs = self._cities.get(leg.departure_city_key, ((), ()))
+                    changed[leg.departure_city_key] = (list(times), list(city_legs))
+        for city, (times, city_legs) in changed.items():
+            keep = [leg for leg in city_legs if leg.id not in flight_ids]
+            keep.extend(leg for leg in fresh.values() if leg.departure_city_key == city)
+            keep.sort(key=lambda leg: (leg.departure_time, leg.id))
+            if keep:
+                self._cities[city] = ([leg.departure_time for leg in keep], keep)
+            else:
+                self._cities.pop(city, None)
+        self._legs.update(fresh)
+
+    def sync(self):
+        """对比共享世代号，回放变更日志或全量重建"""
+        generation = _generation()
+        if generation is None:
+            reset_route_graph()
+            generation = _generation()
+        if generation == self._generation:
+            return
+        with self._lock:
+            if generation == self._generation:
+                return
+            behind = None if self._generation is None else generation - self._generation
+            flight_ids = None
+            if behind is not None and 0 < behind <= MAX_REPLAY:
+                keys = [CHANGE_KEY.format(g) for g in range(self._generation + 1, generation + 1)]
+                changes = cache.get_many(keys)
+                if len(changes) == len(keys):
+                    flight_ids = changes.values()
+            if flight_ids is None:
+                self.rebuild()
+            else:
+                self.apply(flight_ids)
+            self._generation = generation
+
+    def departures(self, city, start, end):
+        """city 在 [start, end) 内起飞的航班"""
+        times, legs = self._cities.get(city, ((), ()))
+        return legs[bisect_left(times, start):bisect_left(times, end)]
+
+    def search(self, origin, destination, start, end, max_stops=1, min_connection=None,
+               max_connection=None, sort='duration', seat_class='economy'):
+        """生成按代价从小到大排列的行程，调用方取够需要的条数即可停止"""
+        min_connection = min_connection or timedelta(minutes=getattr(settings, 'ROUTE_MIN_CONNECTION_MINUTES', 45))
+        max_connection = max_connection or timedelta(hours=getattr(settings, 'ROUTE_MAX_CONNECTION_HOURS', 12))
+        max_expansions = getattr(settings, 'ROUTE_MAX_EXPANSIONS', 50000)
+        price_index = LEG_FIELDS.index(PRICE_FIELDS[seat_class])
+        by_price = sort == 'price'
+
+        heap = []
+        counter = 0
+        for leg in self.departures(origin, start, end):
+            price = leg[price_index]
+            cost = price if by_price else leg.arrival_time - leg.departure_time
+            heap.append((cost, counter, (leg,), price))
+            counter += 1
+        heapq.heapify(heap)
+
+        expansions = 0
+        while heap and expansions < max_expansions:
+            cost, _, path, price = heapq.heappop(heap)
+            last = path[-1]
+            if last.arrival_city_key == destination:
+                yield Itinerary(path, last.arrival_time - path[0].departure_time, price)
+                continue
+            if len(path) > max_stops:
+                continue
+            visited = {leg.departure_city_key for leg in path}
+            connect_from = last.arrival_time + min_connection
+            for leg in self.departures(last.arrival_city_key, connect_from, last.arrival_time + max_connection):
+                if leg.arrival_city_key in visited:
+                    continue
+                # 最后一段之前只扩展能继续中转或直接到达目的地的航段
+                if len(path) == max_stops and leg.arrival_city_key != destination:
+                    continue
+                leg_price = leg[price_index]
+                total = price + leg_price
+                cost = total if by_price else leg.arrival_time - path[0].departure_time
+                heapq.heappush(heap, (cost, counter, path + (leg,), total))
+                counter += 1
+                expansions += 1
+
+
+_graph = RouteGraph()
+
+
+def route_graph():
+    _graph.sync()
+    return _graph
+
+
+def find_connections(departure_city, arrival_city, departure_date, max_stops=1, min_connection=None,
+                     sort='duration', seat_class='economy', seat_count=1, limit=10):
+    """departure_date 当天从出发城市起飞、到达目的城市的行程，只返回各航段都有足够余票的行程"""
+    start = timezone.make_aware(datetime.combine(departure_date, datetime.min.time()))
+    start_after = max(start, timezone.now())
+    end = start + timedelta(days=1)
+    field = seat_field(seat_class)
+    results = route_graph().search(
+        departure_city, arrival_city, start_after, end, max_stops=max_stops, min_connection=min_connection,
+        sort=sort, seat_class=seat_class)
+
+    # 按批取候选行程，一条查询核对余票，直到凑够 limit 条或没有更多行程
+    found = []
+    while len(found) < limit:
+        batch = [itinerary for _, itinerary in zip(range(limit * 2), results)]
+        if not batch:
+            break
+        flight_ids = {leg.id for itinerary in batch for leg in itinerary.legs}
+        seats = dict(Flight.objects.filter(id__in=flight_ids).values_list('id', field))
+        for itinerary in batch:
+            if all(seats.get(leg.id, 0) >= seat_count for leg in itinerary.legs):
+                found.append((itinerary, [seats[leg.id] for leg in itinerary.legs]))
+    return found[:limit]
+
+
+def itinerary_data(itinerary, seats_left, seat_class, seat_count):
+    """行程的接口输出：时间格式与 FlightSerializer 一致，金额为字符串（基础票价，实际价格以 quote 接口为准）"""
+    to_time = DateTimeField().to_representation
+    price_field = PRICE_FIELDS[seat_class]
+    return {
+        'stops': len(itinerary.legs) - 1,
+        'departure_time': to_time(itinerary.legs[0].departure_time),
+        'arrival_time': to_time(itinerary.legs[-1].arrival_time),
+        'duration_minutes': int(itinerary.duration.total_seconds() // 60),
+        'total_price': f'{itinerary.price * seat_count:.2f}',
+        'legs': [
+            {
+                'id': leg.id,
+                'flight_number': leg.flight_number,
+                'airline': leg.airline,
+                'departure_city': leg.departure_city,
+                'arrival_city': leg.arrival_city,
+                'departure_time': to_time(leg.departure_time),
+                'arrival_time': to_time(leg.arrival_time),
+                'price': f'{getattr(leg, price_field):.2f}',
+                'seats_left': seats,
+            }
+            for leg, seats in zip(itinerary.legs, seats_left)
+        ],
+    }
@@ -0,0 +1,230 @@
+"""航班时刻表批量导入：流式读取 CSV / NDJSON / JSON 数组，分块校验后按 flight_number 批量 upsert。
+
+- 读取、校验、写入都按块进行，内存占用与文件大小无关
+- 新航班按文件中的座位数建立；已有航班只更新时刻、航线、机型和价格，
+  剩余座位由预订维护，不会被时刻表覆盖
+- bulk_create 不触发模型信号，每块写入时为新航班建立座位图，导入后统一刷新搜索缓存、航班读缓存和余票汇总
+"""
+import csv
+import json
+import os
+from collections import namedtuple
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .analytics import rebuild_sales_rollup
+from .availability import flight_key, refresh_route_date, rebuild_availability
+from .caching import FLIGHT_LIST_VERSION_KEY, bump_version, invalidate_flight
+from .models import Flight
+from .routing import reset_route_graph
+from .search import invalidate_search_cache
+from .seatmap import create_seat_maps
+
+SCHEDULE_FIELDS = (
+    'flight_number', 'departure_city', 'arrival_city', 'departure_time', 'arrival_time',
+    'airline', 'aircraft_type', 'economy_seats', 'business_seats', 'first_seats',
+    'economy_price', 'business_price', 'first_price',
+)
+SEAT_COLUMNS = ('economy_seats', 'business_seats', 'first_seats')
+# 已有航班被时刻表更新的字段（不含剩余座位）
+UPDATE_FIELDS = [f for f in SCHEDULE_FIELDS if f != 'flight_number' and f not in SEAT_COLUMNS] + [
+    'departure_city_key', 'arrival_city_key']
+FORMATS = ('csv', 'ndjson', 'json')
+# 受影响的航线-日期超过这个数量时直接全量重建余票汇总
+AVAILABILITY_REBUILD_THRESHOLD = 2000
+
+ImportResult = namedtuple('ImportResult', ['created', 'updated', 'failed'])
+
+
+class ScheduleError(Exception):
+    pass
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension == 'jsonl':
+        return 'ndjson'
+    if extension in FORMATS:
+        return extension
+    raise ScheduleError(f'Cannot detect format of {path}, use --format.')
+
+
+def _json_array(stream, chunk_size=1 << 16):
+    """逐个解析 JSON 数组中的元素，缓冲区只保存尚未解析完的部分"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    started = False
+
+    def fill():
+        nonlocal buffer, eof
+        data = stream.read(chunk_size)
+        if data:
+            buffer += data
+        else:
+            eof = True
+
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            if eof:
+                raise ScheduleError('Unexpected end of JSON array.')
+            fill()
+            continue
+        if not started:
+            if buffer[0] != '[':
+                raise ScheduleError('Expected a JSON array.')
+            buffer = buffer[1:]
+            started = True
+            continue
+        if buffer[0] == ']':
+            return
+        if buffer[0] == ',':
+            buffer = buffer[1:]
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            # 元素跨越了读取块的边界，继续读入
+            if eof:
+                raise ScheduleError('Invalid JSON array.')
+            fill()
+            continue
+        buffer = buffer[end:]
+        yield item
+
+
+def read_rows(stream, file_format):
+    """逐行产出 (行号, 字段字典)；行号：CSV/NDJSON 为文件行号，JSON 数组为元素序号（从 1 开始）"""
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == 'ndjson':
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+    else:
+        for index, item in enumerate(_json_array(stream), 1):
+            yield index, item
+
+
+def _build_flight(row):
+    """把一行数据转换成已校验的 Flight 对象，失败抛出 ValidationError"""
+    if not isinstance(row, dict):
+        raise ValidationError({'row': ['Expected a JSON object.']})
+    missing = [name for name in SCHEDULE_FIELDS if row.get(name) in (None, '')]
+    if missing:
+        raise ValidationError({name: ['This field is required.'] for name in missing})
+    flight = Flight(**{name: row[name] for name in SCHEDULE_FIELDS})
+    flight.clean_fields(exclude=['departure_city_key', 'arrival_city_key'])
+    for name in ('departure_time', 'arrival_time'):
+        value = getattr(flight, name)
+        if timezone.is_naive(value):
+            setattr(flight, name, timezone.make_aware(value))
+    if flight.arrival_time <= flight.departure_time:
+        raise ValidationError({'arrival_time': ['Arrival time must be after departure time.']})
+    flight.normalize_route()
+    return flight
+
+
+class ScheduleImporter:
+    def __init__(self, batch_size=1000, dry_run=False, on_error=None):
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.on_error = on_error or (lambda line, errors: None)
+        self.created = self.updated = self.failed = 0
+        # 受影响的航线-日期；超过阈值后改为导入结束时重建涉及的日期范围，不再继续收集
+        self.route_days = set()
+        self.rebuild = False
+        self.first_day = self.last_day = None
+
+    def _error(self, line, errors):
+        self.failed += 1
+        self.on_error(line, errors)
+
+    def _flush(self, batch):
+        # 同一块内重复的航班号以最后一行为准，前面的行报告为错误
+        latest = {}
+        for line, flight in batch:
+            if flight.flight_number in latest:
+                self._error(latest[flight.flight_number][0],
+                            {'flight_number': ['Superseded by a later row with the same flight number.']})
+            latest[flight.flight_number] = (line, flight)
+        flights = [flight for _, flight in latest.values()]
+
+        with transaction.atomic():
+            existing = {
+                flight.flight_number: flight
+                for flight in Flight.objects.filter(flight_number__in=list(latest)).only(
+                    'id', 'flight_number', 'departure_city_key', 'arrival_city_key', 'departure_time')
+            }
+            if not self.dry_run:
+                Flight.objects.bulk_create(
+                    flights,
+                    update_conflicts=True,
+                    unique_fields=['flight_number'],
+                    update_fields=UPDATE_FIELDS,
+                )
+                # bulk_create 不触发 post_save，新航班的空座位图在这里建立，读接口不需要补建
+                created = [number for number in latest if number not in existing]
+                if created:
+                    create_seat_maps(*Flight.objects.filter(flight_number__in=created).only(
+                        'id', *SEAT_COLUMNS))
+
+        for flight in flights:
+            old = existing.get(flight.flight_number)
+            if old is not None:
+                self.updated += 1
+                if not self.dry_run:
+                    invalidate_flight(old.id)
+                self._touch(flight_key(old))
+            else:
+                self.created += 1
+            self._touch(flight_key(flight))
+
+    def _touch(self, route_day):
+        date = route_day[2]
+        self.first_day = date if self.first_day is None else min(self.first_day, date)
+        self.last_day = date if self.last_day is None else max(self.last_day, date)
+        if self.rebuild:
+            return
+        self.route_days.add(route_day)
+        if len(self.route_days) > AVAILABILITY_REBUILD_THRESHOLD:
+            self.rebuild = True
+            self.route_days.clear()
+
+    def run(self, rows):
+        batch = []
+        for line, row in rows:
+            try:
+                batch.append((line, _build_flight(row)))
+            except ValidationError as exc:
+                self._error(line, exc.message_dict)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        if not self.dry_run and (self.created or self.updated):
+            self._invalidate()
+        return ImportResult(self.created, self.updated, self.failed)
+
+    def _invalidate(self):
+        invalidate_search_cache()
+        bump_version(FLIGHT_LIST_VERSION_KEY)
+        reset_route_graph()
+        # 导入用 bulk_create/bulk_update，不触发信号
+        rebuild_sales_rollup(start=self.first_day, end=self.last_day + timedelta(days=1))
+        if self.rebuild:
+            rebuild_availability(start=self.first_day, end=self.last_day + timedelta(days=1))
+        else:
+            for key in self.route_days:
+                refresh_route_date(*key)
@@ -0,0 +1,121 @@
+"""航班搜索引擎：归一化城市等值索引查询 + 游标分页 + 按航线/日期缓存结果"""
+import hashlib
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .caching import get_version, bump_version
+from .models import Flight, normalize_city
+from .pagination import encode_cursor, decode_cursor
+from .replicas import cache_timeout
+
+GENERATION_KEY = 'flight_search:generation'
+
+SearchPage = namedtuple('SearchPage', ['flights', 'next_cursor'])
+
+
+def invalidate_search_cache():
+    """航班变更后调用：提升世代号，使所有已缓存的搜索结果失效"""
+    bump_version(GENERATION_KEY)
+
+
+class FlightSearchEngine:
+    def __init__(self, cache_timeout=None, max_page_size=None):
+        self.cache_timeout = cache_timeout if cache_timeout is not None else getattr(
+            settings, 'FLIGHT_SEARCH_CACHE_TIMEOUT', 60)
+        self.max_page_size = max_page_size or getattr(settings, 'FLIGHT_SEARCH_MAX_PAGE_SIZE', 100)
+
+    def _page_size(self, page_size):
+        if page_size in (None, ''):
+            return settings.REST_FRAMEWORK.get('PAGE_SIZE', 20)
+        try:
+            page_size = int(page_size)
+        except (TypeError, ValueError):
+            raise ValueError('Invalid page size.')
+        if page_size <= 0:
+            raise ValueError('Invalid page size.')
+        return min(page_size, self.max_page_size)
+
+    def _date_range(self, departure_date):
+        """把日期转换成 [当天0点, 次日0点) 的时间区间，便于走复合索引的范围扫描"""
+        date = parse_date(departure_date) if isinstance(departure_date, str) else departure_date
+        if date is None:
+            raise ValueError('Invalid departure date.')
+        start = timezone.make_aware(datetime.combine(date, datetime.min.time()))
+        return start, start + timedelta(days=1)
+
+    def _cache_key(self, *parts):
+        digest = hashlib.md5(repr(parts).encode()).hexdigest()
+        return f'flight_search:{get_version(GENERATION_KEY)}:{digest}'
+
+    def _ids_queryset(self, departure_key, arrival_key, departure_date, cursor, page_size):
+        queryset = Flight.objects.filter(departure_time__gt=timezone.now())
+        if departure_key:
+            queryset = queryset.filter(departure_city_key=departure_key)
+        if arrival_key:
+            queryset = queryset.filter(arrival_city_key=arrival_key)
+        if departure_date:
+            start, end = self._date_range(departure_date)
+            queryset = queryset.filter(departure_time__gte=start, departure_time__lt=end)
+        if cursor:
+            last_time, last_id = decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(departure_time__gt=last_time) | Q(departure_time=last_time, id__gt=last_id)
+            )
+        # 多取一条用来判断是否还有下一页
+        return queryset.order_by('departure_time', 'id').values_list('id', 'departure_time')[:page_size + 1]
+
+    def _page_ids(self, rows, page_size):
+        next_cursor = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+        return [pk for pk, _ in rows], next_cursor
+
+    def _prepare(self, departure_city, arrival_city, departure_date, cursor, page_size):
+        page_size = self._page_size(page_size)
+        departure_key = normalize_city(departure_city)
+        arrival_key = normalize_city(arrival_city)
+        if departure_date:
+            self._date_range(departure_date)  # 提前校验日期格式
+        if cursor:
+            decode_cursor(cursor)
+        key = self._cache_key(departure_key, arrival_key, departure_date or '', cursor or '', page_size)
+        return (departure_key, arrival_key, departure_date, cursor, page_size), key
+
+    def _visible(self, ids, flights_by_id):
+        now = timezone.now()
+        return [
+            flights_by_id[pk] for pk in ids
+            if pk in flights_by_id and flights_by_id[pk].departure_time > now
+        ]
+
+    def search(self, departure_city=None, arrival_city=None, departure_date=None,
+               cursor=None, page_size=None):
+        args, key = self._prepare(departure_city, arrival_city, departure_date, cursor, page_size)
+
+        # 缓存中只保存命中的航班 id 和下一页游标，航班数据按主键实时读取，座位数不会过期
+        cached = cache.get(key)
+        if cached is None:
+            cached = self._page_ids(list(self._ids_queryset(*args)), args[-1])
+            cache.set(key, cached, cache_timeout(self.cache_timeout))
+        ids, next_cursor = cached
+        return SearchPage(self._visible(ids, Flight.objects.in_bulk(ids)), next_cursor)
+
+    async def asearch(self, departure_city=None, arrival_city=None, departure_date=None,
+                      cursor=None, page_size=None):
+        """search 的异步版本，使用异步 ORM 接口"""
+        args, key = self._prepare(departure_city, arrival_city, departure_date, cursor, page_size)
+
+        cached = await cache.aget(key)
+        if cached is None:
+            rows = [row async for row in self._ids_queryset(*args)]
+            cached = self._page_ids(rows, args[-1])
+            await cache.aset(key, cached, cache_timeout(self.cache_timeout))
+        ids, next_cursor = cached
+        return SearchPage(self._visible(ids, await Flight.objects.ain_bulk(ids)), next_cursor)
@@ -0,0 +1,231 @@
+"""座位图：每个航班每个舱位用一个位图记录座位占用，按连续区间返回空座
+
+座位余量仍以 Flight 上的座位字段为准（见 inventory.py），这里只负责分配具体座位号。
+位图用版本号做乐观并发控制，不对航班行加锁。
+"""
+from django.db import transaction
+from django.db.models import F
+
+from .models import Flight, Booking, SeatMap
+from .inventory import SEAT_FIELDS
+
+MAX_RETRIES = 50
+
+
+class SeatMapBusy(Exception):
+    """并发更新冲突次数过多"""
+
+
+def _ensure_size(bits, capacity):
+    size = (capacity + 7) // 8
+    if len(bits) < size:
+        bits.extend(bytes(size - len(bits)))
+
+
+def count_occupied(bits):
+    return int.from_bytes(bytes(bits), 'little').bit_count()
+
+
+def free_ranges(bits, capacity):
+    """返回空座区间列表 [[起始座位号, 结束座位号], ...]，整字节全空/全满时一次跳过8个座位"""
+    ranges = []
+    start = None
+    i = 0
+    while i < capacity:
+        byte = bits[i >> 3] if (i >> 3) < len(bits) else 0
+        if i & 7 == 0 and i + 8 <= capacity and byte in (0x00, 0xFF):
+            if byte == 0x00:
+                if start is None:
+                    start = i
+            elif start is not None:
+                ranges.append([start + 1, i])
+                start = None
+            i += 8
+            continue
+        if byte >> (i & 7) & 1:
+            if start is not None:
+                ranges.append([start + 1, i])
+                start = None
+        elif start is None:
+            start = i
+        i += 1
+    if start is not None:
+        ranges.append([start + 1, capacity])
+    return ranges
+
+
+def allocate(bits, capacity, count):
+    """分配 count 个座位，优先连座；空位不够时扩容。返回 (座位号列表, 新容量)"""
+    ranges = free_ranges(bits, capacity)
+    seats = []
+    for first, last in ranges:
+        if last - first + 1 >= count:
+            seats = list(range(first, first + count))
+            break
+    else:
+        for first, last in ranges:
+            seats.extend(range(first, min(last, first + count - len(seats) - 1) + 1))
+            if len(seats) == count:
+                break
+        # 位图容量与库存不一致时（例如库存被手工调大）直接扩容，保证已扣库存的预订一定能拿到座位
+        while len(seats) < count:
+            capacity += 1
+            seats.append(capacity)
+
+    _ensure_size(bits, capacity)
+    allocate_exact(bits, seats)
+    return seats, capacity
+
+
+def allocate_exact(bits, seats):
+    """占用指定的座位号"""
+    _ensure_size(bits, max(seats))
+    for seat in seats:
+        bits[(seat - 1) >> 3] |= 1 << ((seat - 1) & 7)
+
+
+def release(bits, seats):
+    for seat in seats:
+        index = seat - 1
+        if (index >> 3) < len(bits):
+            bits[index >> 3] &= ~(1 << (index & 7)) & 0xFF
+
+
+def format_seats(seats):
+    """[1, 2, 3, 7] -> "1-3,7" """
+    parts = []
+    seats = sorted(seats)
+    i = 0
+    while i < len(seats):
+        j = i
+        while j + 1 < len(seats) and seats[j + 1] == seats[j] + 1:
+            j += 1
+        parts.append(str(seats[i]) if i == j else f'{seats[i]}-{seats[j]}')
+        i = j + 1
+    return ','.join(parts)
+
+
+def parse_seats(text):
+    seats = []
+    for part in filter(None, (text or '').split(',')):
+        first, _, last = part.partition('-')
+        seats.extend(range(int(first), int(last or first) + 1))
+    return seats
+
+
+def create_seat_maps(*flights):
+    """新航班按各舱位座位数建立空座位图"""
+    SeatMap.objects.bulk_create([
+        SeatMap(flight=flight, seat_class=seat_class, capacity=getattr(flight, field),
+                occupancy=bytes((getattr(flight, field) + 7) // 8))
+        for flight in flights
+        for seat_class, field in SEAT_FIELDS.items()
+    ], ignore_conflicts=True)
+
+
+def _compute_seat_map(flight_id, seat_class):
+    """根据剩余座位和已有预订在内存中计算座位图，不写库；
+    返回 (未保存的 SeatMap, 在计算中补分配了座位号的预订)"""
+    remaining = Flight.objects.filter(pk=flight_id).values_list(SEAT_FIELDS[seat_class], flat=True).first() or 0
+    bookings = list(Booking.objects.filter(
+        flight_id=flight_id, seat_class=seat_class, status='confirmed').order_by('id'))
+    bits = bytearray()
+    capacity = remaining + sum(b.seat_count for b in bookings)
+    _ensure_size(bits, capacity)
+    unassigned = []
+    for booking in bookings:
+        seats = parse_seats(booking.seat_numbers)
+        if seats:
+            allocate_exact(bits, seats)
+        else:
+            unassigned.append(booking)
+    for booking in unassigned:
+        seats, capacity = allocate(bits, capacity, booking.seat_count)
+        booking.seat_numbers = format_seats(seats)
+    seat_map = SeatMap(flight_id=flight_id, seat_class=seat_class, capacity=capacity, occupancy=bytes(bits))
+    return seat_map, unassigned
+
+
+def _build_seat_map(flight_id, seat_class):
+    """缺少座位图时（如不经信号写入的航班）补建并保存，只在写路径和回填命令中调用"""
+    seat_map, unassigned = _compute_seat_map(flight_id, seat_class)
+    Booking.objects.bulk_update(unassigned, ['seat_numbers'])
+    seat_map, _ = SeatMap.objects.get_or_create(
+        flight_id=flight_id, seat_class=seat_class,
+        defaults={'capacity': seat_map.capacity, 'occupancy': seat_map.occupancy},
+    )
+    return seat_map
+
+
+def build_missing_seat_maps(batch_size=1000):
+    """为缺少座位图的航班舱位补建座位图（python manage.py build_seat_maps），返回补建数"""
+    flight_ids = list(Flight.objects.order_by('id').values_list('id', flat=True))
+    built = 0
+    for offset in range(0, len(flight_ids), batch_size):
+        batch = flight_ids[offset:offset + batch_size]
+        existing = set(SeatMap.objects.filter(flight_id__in=batch).values_list('flight_id', 'seat_class'))
+        for flight_id in batch:
+            for seat_class in SEAT_FIELDS:
+                if (flight_id, seat_class) not in existing:
+                    with transaction.atomic():
+                        _build_seat_map(flight_id, seat_class)
+                    built += 1
+    return built
+
+
+def get_seat_map(flight_id, seat_class):
+    seat_map = SeatMap.objects.filter(flight_id=flight_id, seat_class=seat_class).first()
+    return seat_map or _build_seat_map(flight_id, seat_class)
+
+
+def _mutate(flight_id, seat_class, change):
+    """读取位图 -> 修改 -> 按版本号条件写回，版本冲突时重试"""
+    for _ in range(MAX_RETRIES):
+        seat_map = get_seat_map(flight_id, seat_class)
+        bits = bytearray(seat_map.occupancy)
+        result, capacity = change(bits, seat_map.capacity)
+        updated = SeatMap.objects.filter(pk=seat_map.pk, version=seat_map.version).update(
+            occupancy=bytes(bits), capacity=capacity, version=F('version') + 1)
+        if updated:
+            return result
+    raise SeatMapBusy(f'Seat map for flight {flight_id} ({seat_class}) is busy.')
+
+
+def assign_seats(flight_id, seat_class, count):
+    """为已扣减库存的预订分配座位号"""
+    return _mutate(flight_id, seat_class, lambda bits, capacity: allocate(bits, capacity, count))
+
+
+def release_seat_numbers(flight_id, seat_class, seats):
+    def change(bits, capacity):
+        release(bits, seats)
+        return None, capacity
+
+    if seats:
+        _mutate(flight_id, seat_class, change)
+
+
+def sync_capacity(flight):
+    """航班座位数被修改后，保证位图容量不小于 剩余座位 + 已占座位"""
+    for seat_map in SeatMap.objects.filter(flight=flight):
+        needed = getattr(flight, SEAT_FIELDS[seat_map.seat_class]) + count_occupied(seat_map.occupancy)
+        if needed > seat_map.capacity:
+            SeatMap.objects.filter(pk=seat_map.pk, capacity__lt=needed).update(
+                capacity=needed, version=F('version') + 1)
+
+
+def seat_map_summary(flight, seat_maps=None):
+    """各舱位容量、剩余座位和空座区间；seat_maps 为已查询出的座位图列表。
+    只读：缺少座位图时在内存中计算，不写库（读接口可能被路由到只读副本）"""
+    if seat_maps is None:
+        seat_maps = SeatMap.objects.filter(flight=flight)
+    seat_maps = {m.seat_class: m for m in seat_maps}
+    summary = {}
+    for seat_class, field in SEAT_FIELDS.items():
+        seat_map = seat_maps.get(seat_class) or _compute_seat_map(flight.id, seat_class)[0]
+        summary[seat_class] = {
+            'capacity': seat_map.capacity,
+            'seats_left': getattr(flight, field),
+            'empty_ranges': free_ranges(seat_map.occupancy, seat_map.capacity),
+        }
+    return summary
@@ -1,7 +1,8 @@
 from rest_framework import serializers
-from .models import Flight, Booking
+from .models import Flight, Booking, ArchivedFlight, ArchivedBooking
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from .instrumentation import InstrumentedSerializerMixin
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
@@ -47,12 +48,12 @@ class UserProfileSerializer(serializers.ModelSerializer):
         fields = ('id', 'username', 'email', 'first_name', 'last_name', 'date_joined')
         read_only_fields = ('id', 'username', 'date_joined')
 
-class FlightSerializer(serializers.ModelSerializer):
+class FlightSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Flight
-        fields = '__all__'
+        exclude = ('departure_city_key', 'arrival_city_key')
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(InstrumentedSerializerMixin, serializers.ModelSerializer):
     flight_number = serializers.CharField(source='flight.flight_number', read_only=True)
     departure_city = serializers.CharField(source='flight.departure_city', read_only=True)
     arrival_city = serializers.CharField(source='flight.arrival_city', read_only=True)
@@ -63,4 +64,34 @@ class BookingSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Booking
-        fields = '__all__'
+        # total_amount 通过 total_price 输出；单价在预订时由报价写入，不允许客户端修改
+        exclude = ('total_amount',)
+        read_only_fields = ('unit_price',)
+
+class ArchivedFlightSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedFlight
+        exclude = ('departure_city_key', 'arrival_city_key')
+
+class ArchivedBookingSerializer(serializers.ModelSerializer):
+    """历史预订，输出字段与 BookingSerializer 一致"""
+    flight_number = serializers.CharField(source='flight.flight_number', read_only=True)
+    departure_city = serializers.CharField(source='flight.departure_city', read_only=True)
+    arrival_city = serializers.CharField(source='flight.arrival_city', read_only=True)
+    departure_time = serializers.DateTimeField(source='flight.departure_time', read_only=True)
+    arrival_time = serializers.DateTimeField(source='flight.arrival_time', read_only=True)
+    airline = serializers.CharField(source='flight.airline', read_only=True)
+    total_price = serializers.ReadOnlyField()
+
+    class Meta:
+        model = ArchivedBooking
+        exclude = ('total_amount',)
+
+class BulkBookingItemSerializer(serializers.Serializer):
+    """批量预订中的单个乘客条目"""
+    flight = serializers.IntegerField()
+    seat_class = serializers.ChoiceField(choices=Booking.SEAT_CLASS_CHOICES)
+    seat_count = serializers.IntegerField(min_value=1, max_value=10, default=1)
+    passenger_name = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    passenger_id = serializers.CharField(max_length=18, required=False, allow_blank=True, default='')
+    phone = serializers.CharField(max_length=20, required=False, allow_blank=True, default='')
@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from .models import Flight
+from .caching import invalidate_flight
+from .search import invalidate_search_cache
+
+# 座位库存变化：flight_id, seat_class, delta（负数为扣减）
+inventory_changed = Signal()
+
+
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Flight)
+def flight_changed(sender, instance, **kwargs):
+    """航班增删改后使搜索缓存和航班读缓存失效"""
+    invalidate_search_cache()
+    invalidate_flight(instance.pk)
+
+
+@receiver(inventory_changed)
+def flight_inventory_changed(sender, flight_id, **kwargs):
+    """座位数变化后使航班读缓存失效"""
+    invalidate_flight(flight_id)
+
+
+@receiver(post_save, sender=Flight)
+def sync_seat_maps(sender, instance, created, raw=False, **kwargs):
+    """新航班建立座位图；已有航班调整座位数后同步座位图容量"""
+    from .seatmap import create_seat_maps, sync_capacity
+
+    if raw:
+        return
+    if created:
+        create_seat_maps(instance)
+    else:
+        sync_capacity(instance)
+
+
+@receiver(pre_save, sender=Flight)
+def remember_availability_key(sender, instance, raw=False, **kwargs):
+    """记下修改前的航线和日期，航班改期/改航线后旧日期的余票汇总也要重算"""
+    from .availability import flight_key
+
+    if raw or instance.pk is None:
+        return
+    old = Flight.objects.filter(pk=instance.pk).only(
+        'departure_city_key', 'arrival_city_key', 'departure_time').first()
+    instance._availability_old_key = flight_key(old) if old is not None else None
+
+
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Flight)
+def refresh_availability(sender, instance, raw=False, **kwargs):
+    """航班增删改后重算所在航线当天的余票汇总"""
+    from .availability import flight_key, refresh_route_date
+
+    if raw:
+        return
+    keys = {flight_key(instance)}
+    old_key = getattr(instance, '_availability_old_key', None)
+    if old_key is not None:
+        keys.add(old_key)
+    for key in keys:
+        refresh_route_date(*key)
+
+
+@receiver(inventory_changed)
+def inventory_availability_changed(sender, flight_id, seat_class, **kwargs):
+    """座位数变化后更新该舱位的余票汇总"""
+    from .availability import refresh_seat_class
+
+    refresh_seat_class(flight_id, seat_class)
+
+
+@receiver(inventory_changed)
+def push_availability(sender, flight_id, seat_class, delta, **kwargs):
+    """座位变化推送给订阅了该航班的 SSE/WebSocket 客户端（合并后异步发送，不阻塞当前请求）"""
+    from .realtime import publisher
+
+    publisher().notify(flight_id, seat_class, delta)
+
+
+@receiver(post_save, sender=Flight)
+@receiver(post_delete, sender=Flight)
+def route_graph_changed(sender, instance, raw=False, **kwargs):
+    """航班增删改后写入航线图变更日志，提交后才写，回滚的修改不会被其他进程读到"""
+    from .routing import record_change
+
+    if raw:
+        return
+    flight_id = instance.pk  # 删除完成后 instance.pk 会被置为 None，先取出
+    transaction.on_commit(lambda: record_change(flight_id))
+
+
+@receiver(post_save, sender=Flight)
+def flight_sales_changed(sender, instance, raw=False, **kwargs):
+    """航班增改后重算销售汇总（航线、日期、运力可能变化），在座位图同步之后"""
+    from .analytics import refresh_flight_sales
+
+    if raw:
+        return
+    refresh_flight_sales(instance.pk)
+
+
+@receiver(post_delete, sender=Flight)
+def flight_sales_deleted(sender, instance, **kwargs):
+    """删除航班时一并删除其销售汇总（归档不触发此信号，汇总保留）"""
+    from .analytics import delete_flight_sales
+
+    delete_flight_sales(instance.pk)
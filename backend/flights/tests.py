@@ -0,0 +1,569 @@
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from flights import authentication, idempotency, instrumentation, realtime, throttling
+from flights.analytics import rebuild_sales_rollup
+from flights.booking import create_booking
+from flights.models import Flight, Booking, IdempotencyKey, SalesRollup, SeatMap
+from flights.schedule import ScheduleImporter
+from flights.search import FlightSearchEngine
+from flights.seatmap import build_missing_seat_maps, count_occupied
+
+ADMIN = {'username': 'admin', 'password': '123456'}
+
+
+def make_flight(number, departure_in=timedelta(days=3), **fields):
+    departure_time = timezone.now() + departure_in
+    values = dict(
+        flight_number=number, departure_city='Beijing', arrival_city='Shanghai',
+        departure_time=departure_time, arrival_time=departure_time + timedelta(hours=2),
+        airline='Air China', aircraft_type='A320', economy_seats=100, business_seats=10, first_seats=0,
+        economy_price=800, business_price=1600, first_price=3200,
+    )
+    values.update(fields)
+    return Flight.objects.create(**values)
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class ListQueryCountTests(TestCase):
+    """列表接口的 SQL 条数不随每页条数变化（没有 N+1 查询）"""
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [User.objects.create_user(f'user{i}', password='pass12345') for i in range(3)]
+        flights = [make_flight(f'QC{i}', departure_in=timedelta(days=1, hours=i)) for i in range(30)]
+        Booking.objects.bulk_create([
+            Booking(user=users[i % 3], flight=flights[i], seat_class='economy', seat_count=1,
+                    passenger_name=f'Passenger {i}', passenger_id=f'{i:018d}', phone='13800138000')
+            for i in range(30)
+        ])
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_flight_list(self):
+        for page_size in (5, 20):
+            cache.clear()
+            with self.assertNumQueries(1):
+                response = self.client.get('/flights/', {'page_size': page_size})
+            self.assertEqual(len(response.json()['results']), page_size)
+
+    def test_all_bookings(self):
+        for page_size in (5, 20):
+            with self.assertNumQueries(1):
+                response = self.client.post(f'/bookings/all_bookings/?page_size={page_size}', ADMIN, format='json')
+            self.assertEqual(len(response.json()['results']), page_size)
+
+    def test_booking_search(self):
+        for page_size in (5, 20):
+            with self.assertNumQueries(1):
+                response = self.client.post(
+                    f'/bookings/search/?page_size={page_size}', {**ADMIN, 'seat_class': 'economy'}, format='json')
+            self.assertEqual(len(response.json()['results']), page_size)
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class SignedTokenRefreshTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='pass12345')
+        self.client = APIClient()
+        response = self.client.post('/users/login/', {'username': 'alice', 'password': 'pass12345'}, format='json')
+        self.token = response.json()['token']
+        self.signed_token = response.json()['signed_token']
+        self.client.logout()  # 只用请求头认证，不带登录时的会话
+
+    def refresh(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.signed_token}')
+        return client.post('/users/signed_token/')
+
+    def test_refresh_active_user(self):
+        response = self.refresh()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['signed_token'])
+
+    def test_refresh_rejected_for_deactivated_user(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.refresh().status_code, 401)
+
+    def test_refresh_rejected_after_logout(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        client.post('/users/logout/')
+        self.assertEqual(self.refresh().status_code, 401)
+
+
+class AuthCacheIndexTests(TestCase):
+    def test_invalidate_only_touches_the_users_entries(self):
+        """LRUCache 按用户索引键：清除一个用户不影响其他用户，淘汰和覆盖时同步更新索引"""
+        cache_ = authentication.LRUCache(2, 60, owner=lambda user: user.pk)
+        alice, bob = User(pk=1), User(pk=2)
+        cache_.set('a1', alice)
+        cache_.set('b1', bob)
+        cache_.set('a2', alice)  # 淘汰 a1
+        self.assertEqual(cache_.owners, {1: {'a2'}, 2: {'b1'}})
+        cache_.delete_owner(1)
+        self.assertIsNone(cache_.get('a2'))
+        self.assertEqual(cache_.get('b1'), bob)
+        self.assertEqual(cache_.owners, {2: {'b1'}})
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class ServerTimingTests(TestCase):
+    def test_booking_reports_write_lock_time(self):
+        """创建预订时座位扣减的条件 UPDATE 计入 Server-Timing 的 write_lock"""
+        flight = make_flight('ST1')
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('bob', password='pass12345'))
+        response = client.post('/bookings/', {'flight': flight.id, 'seat_class': 'economy', 'seat_count': 1},
+                               format='json')
+        self.assertEqual(response.status_code, 201)
+        timings = dict(item.strip().split(';')[:2] for item in response['Server-Timing'].split(','))
+        self.assertGreater(float(timings['write_lock'].removeprefix('dur=')), 0)
+
+    def test_query_count_histogram_uses_count_buckets(self):
+        histogram = instrumentation.Histogram('test_queries', 'Queries.', instrumentation.COUNT_BUCKETS)
+        histogram.observe(('FlightViewSet', 'list'), 30)
+        lines = histogram.render()
+        self.assertIn('test_queries_bucket{view="FlightViewSet",action="list",le="20"} 0', lines)
+        self.assertIn('test_queries_bucket{view="FlightViewSet",action="list",le="50"} 1', lines)
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class DepartedFlightTests(TestCase):
+    """已起飞（尚未归档）的航班不能再通过航班接口读取、修改或预订"""
+
+    def setUp(self):
+        cache.clear()
+        self.departed = make_flight('DP1', departure_in=-timedelta(minutes=5))
+        self.upcoming = make_flight('DP2', departure_in=timedelta(hours=2))
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('carol', password='pass12345'))
+
+    def test_retrieve(self):
+        self.assertEqual(self.client.get(f'/flights/{self.departed.id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/flights/{self.upcoming.id}/').status_code, 200)
+        self.assertEqual(self.client.get(f'/async/flights/{self.departed.id}/').status_code, 404)
+
+    def test_update(self):
+        response = self.client.patch(f'/flights/{self.departed.id}/', {'airline': 'Other'}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+    def test_quote_and_booking(self):
+        self.assertEqual(self.client.get(f'/flights/{self.departed.id}/quote/').status_code, 404)
+        response = self.client.post('/bookings/', {'flight': self.departed.id, 'seat_class': 'economy'},
+                                    format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Booking.objects.filter(flight=self.departed).exists())
+
+    def test_calendar_today_counts_only_upcoming_flights(self):
+        if timezone.localdate(self.departed.departure_time) != timezone.localdate(self.upcoming.departure_time):
+            self.skipTest('two flights fall on different days')
+        response = self.client.get('/flights/calendar/', {'departure_city': 'Beijing', 'arrival_city': 'Shanghai'})
+        today = response.json()['days'][0]
+        self.assertEqual(today['date'], timezone.localdate().isoformat())
+        self.assertEqual(today['flight_count'], 1)
+        self.assertEqual(today['seats_left'], 100)
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class SeatMapBackfillTests(TestCase):
+    """导入的新航班直接带座位图；缺少座位图时读接口只在内存中计算，不写库"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_import_creates_seat_maps(self):
+        departure_time = timezone.now() + timedelta(days=2)
+        row = dict(
+            flight_number='SM1', departure_city='Beijing', arrival_city='Shanghai',
+            departure_time=departure_time.isoformat(), arrival_time=(departure_time + timedelta(hours=2)).isoformat(),
+            airline='Air China', aircraft_type='A320', economy_seats='50', business_seats='8', first_seats='0',
+            economy_price='800', business_price='1600', first_price='3200',
+        )
+        result = ScheduleImporter().run([(1, row)])
+        self.assertEqual((result.created, result.failed), (1, 0))
+        seat_maps = SeatMap.objects.filter(flight__flight_number='SM1')
+        self.assertEqual({m.seat_class: m.capacity for m in seat_maps}, {'economy': 50, 'business': 8, 'first': 0})
+
+    def test_read_does_not_write_missing_seat_maps(self):
+        flight = make_flight('SM2')
+        SeatMap.objects.filter(flight=flight).delete()
+        params = {'flight_number': 'SM2', 'departure_date': timezone.localdate(flight.departure_time).isoformat()}
+        for path in ('/bookings/get_empty_seats/', '/async/bookings/get_empty_seats/'):
+            response = self.client.get(path, params)
+            self.assertEqual(response.json()['seat_classes']['economy']['capacity'], 100)
+        self.assertFalse(SeatMap.objects.filter(flight=flight).exists())
+
+        self.assertEqual(build_missing_seat_maps(), 3)
+        self.assertEqual(SeatMap.objects.filter(flight=flight).count(), 3)
+        self.assertEqual(build_missing_seat_maps(), 0)
+
+
+@override_settings(REPLICA_CACHE_TIMEOUT=5)
+class ReplicaSearchCacheTests(TestCase):
+    def test_search_cache_timeout_is_capped_on_replica_reads(self):
+        """读副本时同步和异步搜索都只按 REPLICA_CACHE_TIMEOUT 缓存结果"""
+        make_flight('RC1')
+        engine = FlightSearchEngine(cache_timeout=60)
+        with mock.patch('flights.replicas.reading_replica', return_value=True):
+            cache.clear()
+            with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+                engine.search(departure_city='Beijing')
+            self.assertEqual(cache_set.call_args.args[2], 5)
+            cache.clear()
+            with mock.patch.object(cache, 'aset', wraps=cache.aset) as cache_aset:
+                async_to_sync(engine.asearch)(departure_city='Beijing')
+            self.assertEqual(cache_aset.call_args.args[2], 5)
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class BulkBookingTests(TestCase):
+    def test_short_group_admits_items_in_order(self):
+        """剩余 3 个座位、两个各订 2 座的条目：第一个成功，只有放不下的第二个失败"""
+        flight = make_flight('BK1', economy_seats=3)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('dave', password='pass12345'))
+        item = {'flight': flight.id, 'seat_class': 'economy', 'seat_count': 2,
+                'passenger_name': 'Dave', 'passenger_id': '110101199001011234', 'phone': '13800138000'}
+        response = client.post('/bookings/bulk/', {'bookings': [item, item]}, format='json')
+        self.assertEqual(response.status_code, 207)
+        results = response.json()['results']
+        self.assertEqual([result['status'] for result in results], ['created', 'error'])
+        flight.refresh_from_db()
+        self.assertEqual(flight.economy_seats, 1)
+
+
+@override_settings(THROTTLE_BUCKETS={}, BOOKING_STATUS_SYNC_MAX_WAIT=0.3)
+class BookingStatusWaitTests(TestCase):
+    def test_sync_long_poll_is_capped(self):
+        """同步接口的长轮询被截短到 BOOKING_STATUS_SYNC_MAX_WAIT，并指向异步接口"""
+        user = User.objects.create_user('erin', password='pass12345')
+        booking = Booking.objects.create(
+            user=user, flight=make_flight('LP1'), seat_class='economy', status='pending',
+            passenger_name='Erin', passenger_id='110101199001011234', phone='13800138000')
+        client = APIClient()
+        client.force_authenticate(user)
+        started = time.monotonic()
+        response = client.get(f'/bookings/{booking.id}/status/', {'wait': 30})
+        self.assertLess(time.monotonic() - started, 5)
+        self.assertEqual(response.json()['status'], 'pending')
+        self.assertIn(f'/async/bookings/{booking.id}/status/', response['Link'])
+
+    def test_non_finite_wait_is_rejected(self):
+        """wait=nan/inf 会让截止时间永远达不到，返回 400"""
+        user = User.objects.create_user('ezra', password='pass12345')
+        booking = Booking.objects.create(
+            user=user, flight=make_flight('LP2'), seat_class='economy', status='pending',
+            passenger_name='Ezra', passenger_id='110101199001011234', phone='13800138000')
+        client = APIClient()
+        client.force_authenticate(user)
+        for wait in ('nan', 'inf', '-inf'):
+            self.assertEqual(client.get(f'/bookings/{booking.id}/status/', {'wait': wait}).status_code, 400, wait)
+
+    def test_async_non_finite_or_negative_wait(self):
+        """异步接口同样拒绝 nan/inf，负数按 0 处理，立即返回"""
+        user = User.objects.create_user('enzo', password='pass12345')
+        booking = Booking.objects.create(
+            user=user, flight=make_flight('LP3'), seat_class='economy', status='pending',
+            passenger_name='Enzo', passenger_id='110101199001011234', phone='13800138000')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        path = f'/async/bookings/{booking.id}/status/'
+        for wait in ('nan', 'inf', '-inf'):
+            self.assertEqual(client.get(path, {'wait': wait}).status_code, 400, wait)
+        started = time.monotonic()
+        response = client.get(path, {'wait': -5})
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(response.json()['status'], 'pending')
+
+
+@override_settings(THROTTLE_BUCKETS={'auth': (2, 0.001)})
+class AuthThrottleTests(TestCase):
+    def setUp(self):
+        throttling._buckets = None  # 每个测试使用新的进程内令牌桶
+
+    def tearDown(self):
+        throttling._buckets = None
+
+    def test_login_is_throttled_by_ip(self):
+        User.objects.create_user('frank', password='pass12345')
+        client = APIClient()
+        codes = [
+            client.post('/users/login/', {'username': 'frank', 'password': 'wrong'}, format='json').status_code
+            for _ in range(3)
+        ]
+        self.assertEqual(codes, [400, 400, 429])
+        # 换成注册接口、带着其他账号的凭据也共用同一个按 IP 计数的桶
+        client.force_authenticate(User.objects.create_user('grace', password='pass12345'))
+        response = client.post('/users/register/', {'username': 'henry'}, format='json')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+
+@override_settings(THROTTLE_BUCKETS={'search': (1, 0.001)})
+class RealtimeAdmissionTests(TransactionTestCase):
+    # 快照在线程池的独立连接上读取，需要已提交的数据
+    def setUp(self):
+        throttling._buckets = None
+
+    def tearDown(self):
+        throttling._buckets = None
+
+    def connect(self, flight_id):
+        events = [{'type': 'websocket.connect'}]
+        sent = []
+
+        async def receive():
+            return events.pop(0) if events else {'type': 'websocket.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'websocket', 'client': ('10.0.0.1', 5000), 'headers': []}
+        async_to_sync(realtime.websocket_availability)(scope, receive, send, flight_id)
+        return sent
+
+    def test_websocket_is_throttled_at_connect(self):
+        flight = make_flight('RT1')
+        sent = self.connect(flight.id)
+        self.assertEqual(sent[0], {'type': 'websocket.accept'})
+        self.assertEqual(json.loads(sent[1]['text'])['type'], 'snapshot')
+        self.assertEqual(self.connect(flight.id), [{'type': 'websocket.close', 'code': 4429}])
+
+    def test_stream_limits(self):
+        limits = realtime.StreamLimits(per_client=1, per_flight=2)
+        self.assertTrue(limits.acquire('ip:a', 1))
+        self.assertFalse(limits.acquire('ip:a', 2))
+        self.assertTrue(limits.acquire('ip:b', 1))
+        self.assertFalse(limits.acquire('ip:c', 1))
+        limits.release('ip:a', 1)
+        self.assertTrue(limits.acquire('ip:a', 2))
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class FlightCacheTests(TestCase):
+    def test_list_cache_expires_at_first_departure(self):
+        """列表缓存最多保存到页面上最早的航班起飞，之后重新查询，不再返回已起飞的航班"""
+        cache.clear()
+        make_flight('CT1', departure_in=timedelta(seconds=2))
+        make_flight('CT2', departure_in=timedelta(days=1))
+        client = APIClient()
+        numbers = [row['flight_number'] for row in client.get('/flights/').json()['results']]
+        self.assertEqual(numbers, ['CT1', 'CT2'])
+        time.sleep(2.1)  # CT1 起飞，期间没有任何写入，缓存版本号不变
+        numbers = [row['flight_number'] for row in client.get('/flights/').json()['results']]
+        self.assertEqual(numbers, ['CT2'])
+
+    def test_cache_and_etag_depend_on_accepted_renderer(self):
+        """按 Accept 协商出的格式分别缓存，ETag 不同，带 Vary: Accept"""
+        cache.clear()
+        make_flight('CT3')
+        client = APIClient()
+        default = client.get('/flights/')
+        fast = client.get('/flights/', HTTP_ACCEPT='application/vnd.flights.fast+json')
+        self.assertEqual(fast['Content-Type'], 'application/vnd.flights.fast+json')
+        self.assertNotEqual(default['ETag'], fast['ETag'])
+        self.assertIn('Accept', default['Vary'])
+        response = client.get('/flights/', HTTP_ACCEPT='application/vnd.flights.fast+json',
+                              HTTP_IF_NONE_MATCH=default['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/vnd.flights.fast+json')
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class SalesRollupTests(TestCase):
+    def rollup(self, flight):
+        return SalesRollup.objects.filter(flight_id=flight.id, seat_class='economy').values_list(
+            'seats_sold', 'booking_count', 'revenue').get()
+
+    def test_booking_and_cancel_update_rollup_incrementally(self):
+        """预订、批量预订、取消按增量更新汇总，结果与重新聚合一致"""
+        flight = make_flight('SR1')
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('ivan', password='pass12345'))
+        booking = client.post('/bookings/', {'flight': flight.id, 'seat_class': 'economy', 'seat_count': 2},
+                              format='json').json()
+        item = {'flight': flight.id, 'seat_class': 'economy', 'seat_count': 1,
+                'passenger_name': 'Ivan', 'passenger_id': '110101199001011234', 'phone': '13800138000'}
+        self.assertEqual(client.post('/bookings/bulk/', {'bookings': [item, item]}, format='json').status_code, 201)
+        seats_sold, booking_count, revenue = self.rollup(flight)
+        self.assertEqual((seats_sold, booking_count), (4, 3))
+
+        client.post(f'/bookings/{booking["id"]}/cancel/')
+        incremental = self.rollup(flight)
+        self.assertEqual(incremental[:2], (2, 2))
+        self.assertEqual(incremental[2], revenue - Decimal(booking['total_price']))
+        rebuild_sales_rollup()
+        self.assertEqual(self.rollup(flight), incremental)
+
+    def test_missing_row_falls_back_to_refresh(self):
+        flight = make_flight('SR2')
+        SalesRollup.objects.filter(flight_id=flight.id).delete()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('judy', password='pass12345'))
+        client.post('/bookings/', {'flight': flight.id, 'seat_class': 'economy', 'seat_count': 1}, format='json')
+        self.assertEqual(self.rollup(flight)[:2], (1, 1))
+
+    def test_bulk_booking_without_rollup_rows(self):
+        """多个舱位的批量预订：各舱位缺少汇总行时只重算本舱位，不重复计入后面舱位的增量"""
+        flight = make_flight('SR3')
+        SalesRollup.objects.filter(flight_id=flight.id).delete()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('kim', password='pass12345'))
+        item = {'flight': flight.id, 'seat_count': 2,
+                'passenger_name': 'Kim', 'passenger_id': '110101199001011234', 'phone': '13800138000'}
+        bookings = [{**item, 'seat_class': 'economy'}, {**item, 'seat_class': 'business'}]
+        self.assertEqual(client.post('/bookings/bulk/', {'bookings': bookings}, format='json').status_code, 201)
+
+        def rows():
+            return list(SalesRollup.objects.filter(flight_id=flight.id, seat_class__in=['economy', 'business'])
+                        .order_by('seat_class').values_list('seat_class', 'seats_sold', 'booking_count', 'revenue'))
+
+        incremental = rows()
+        self.assertEqual([row[:3] for row in incremental], [('business', 2, 1), ('economy', 2, 1)])
+        rebuild_sales_rollup()
+        self.assertEqual(rows(), incremental)
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('kate', password='pass12345')
+        self.fingerprint = idempotency.request_fingerprint('POST', '/bookings/', {'flight': 1})
+
+    def test_claim_complete_replay(self):
+        self.assertIsNone(idempotency.claim(self.user.pk, 'k1', self.fingerprint))
+        with self.assertRaises(idempotency.IdempotencyError) as raised:
+            idempotency.claim(self.user.pk, 'k1', self.fingerprint)
+        self.assertEqual(raised.exception.status_code, 409)
+        self.assertEqual(raised.exception.retry_after, 1)
+
+        idempotency.complete(self.user.pk, 'k1', 201, {'id': 7})
+        self.assertEqual(idempotency.claim(self.user.pk, 'k1', self.fingerprint), (201, {'id': 7}))
+
+    def test_release_allows_retry(self):
+        self.assertIsNone(idempotency.claim(self.user.pk, 'k2', self.fingerprint))
+        idempotency.release(self.user.pk, 'k2')
+        self.assertIsNone(idempotency.claim(self.user.pk, 'k2', self.fingerprint))
+
+    def test_key_completes_with_booking(self):
+        """预订事务提交时幂等键已保存结果：之后进程退出、没有调用 complete，重试也只重放"""
+        flight = make_flight('IK0')
+        self.assertIsNone(idempotency.claim(self.user.pk, 'k4', self.fingerprint))
+        with idempotency.claimed(self.user.pk, 'k4'):
+            booking = create_booking(self.user, {'flight': flight.id, 'seat_class': 'economy'})
+        status_code, body = idempotency.claim(self.user.pk, 'k4', self.fingerprint)
+        self.assertEqual((status_code, body['id']), (201, booking.id))
+
+    def test_fingerprint_mismatch(self):
+        idempotency.claim(self.user.pk, 'k3', self.fingerprint)
+        idempotency.complete(self.user.pk, 'k3', 201, {'id': 8})
+        other = idempotency.request_fingerprint('POST', '/bookings/', {'flight': 2})
+        with self.assertRaises(idempotency.IdempotencyError) as raised:
+            idempotency.claim(self.user.pk, 'k3', other)
+        self.assertEqual(raised.exception.status_code, 422)
+
+    def test_keys_are_per_user(self):
+        other = User.objects.create_user('liam', password='pass12345')
+        idempotency.claim(self.user.pk, 'k4', self.fingerprint)
+        self.assertIsNone(idempotency.claim(other.pk, 'k4', self.fingerprint))
+
+    def test_expired_and_abandoned_keys_are_reclaimed(self):
+        idempotency.claim(self.user.pk, 'k5', self.fingerprint)
+        idempotency.complete(self.user.pk, 'k5', 201, {'id': 9})
+        IdempotencyKey.objects.filter(key='k5').update(expires_at=timezone.now())
+        self.assertIsNone(idempotency.claim(self.user.pk, 'k5', self.fingerprint))
+
+        with override_settings(IDEMPOTENCY_LOCK_TIMEOUT=0):
+            self.assertIsNone(idempotency.claim(self.user.pk, 'k5', self.fingerprint))
+
+    def test_key_too_long(self):
+        with self.assertRaises(idempotency.IdempotencyError) as raised:
+            idempotency.claim(self.user.pk, 'k' * (idempotency.MAX_KEY_LENGTH + 1), self.fingerprint)
+        self.assertEqual(raised.exception.status_code, 400)
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class IdempotentBookingConcurrencyTests(TransactionTestCase):
+    def test_parallel_requests_with_same_key(self):
+        """多个线程同时用同一个 Idempotency-Key 预订：只产生一条预订、一个 201，其余为 409 或重放"""
+        flight = make_flight('IK1')
+        user = User.objects.create_user('mia', password='pass12345')
+        barrier = threading.Barrier(8)
+        responses = []
+
+        def fire():
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                response = client.post('/bookings/', {'flight': flight.id, 'seat_class': 'economy'},
+                                       format='json', HTTP_IDEMPOTENCY_KEY='same-key')
+                responses.append((response.status_code, response.get(idempotency.REPLAYED_HEADER)))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=fire) for _ in range(8)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(len(responses), 8)
+        self.assertEqual(Booking.objects.filter(flight=flight).count(), 1)
+        self.assertEqual(responses.count((201, None)), 1)
+        others = [response for response in responses if response != (201, None)]
+        self.assertTrue(all(code == 409 or replayed == 'true' for code, replayed in others), responses)
+        flight.refresh_from_db()
+        self.assertEqual(flight.economy_seats, 99)
+
+
+@override_settings(THROTTLE_BUCKETS={})
+class SeatInventoryConcurrencyTests(TransactionTestCase):
+    def test_parallel_bookings_never_oversell(self):
+        """并发预订的人数多于剩余座位：恰好售出全部座位，库存不为负，座位图占用数与售出数一致"""
+        seats, threads = 5, 12
+        flight = make_flight('OV1', economy_seats=seats)
+        user = User.objects.create_user('nina', password='pass12345')
+        barrier = threading.Barrier(threads)
+        codes = []
+
+        def fire():
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                response = client.post('/bookings/', {'flight': flight.id, 'seat_class': 'economy'}, format='json')
+                codes.append(response.status_code)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=fire) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(len(codes), threads)
+        self.assertEqual(codes.count(201), seats, codes)
+        self.assertEqual(Booking.objects.filter(flight=flight, status='confirmed').count(), seats)
+        flight.refresh_from_db()
+        self.assertEqual(flight.economy_seats, 0)
+        seat_map = SeatMap.objects.get(flight=flight, seat_class='economy')
+        self.assertEqual(count_occupied(seat_map.occupancy), seats)
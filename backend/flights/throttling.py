@@ -0,0 +1,204 @@
+"""限流与过载保护
+
+令牌桶限流：视图通过 throttle_scope / throttle_scopes（按 action）声明作用域（search、booking、admin、auth），
+每个作用域在 THROTTLE_BUCKETS 中配置 (桶容量, 每秒补充令牌数)。登录用户按用户计数，匿名请求按 IP 计数，
+THROTTLE_ANONYMOUS_SCOPES 中的作用域（登录/注册）总是按 IP 计数；
+桶里没有令牌时返回 429，Retry-After 为补充一个令牌所需的秒数。
+桶状态默认保存在进程内；THROTTLE_SHARED=True 时放在缓存中，多进程共享（读改写不加锁，并发时可能多放过几个请求）。
+
+过载保护（LoadSheddingMiddleware）：进程内同时处理的请求数超过 SHED_MAX_IN_FLIGHT 时直接返回 503；
+最近 SHED_WINDOW_SECONDS 秒内请求的 p95 延迟超过 SHED_P95_SECONDS 时拒绝只读请求，预订/取消等写请求照常处理。
+503 响应带 Retry-After，被拒绝的请求不计入延迟统计，窗口内的样本过期后自动恢复。
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+from asgiref.sync import markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.throttling import BaseThrottle
+
+CACHE_KEY = 'throttle:{}:{}'
+# 不受过载保护的路径：监控和管理后台
+SHED_EXEMPT_PREFIXES = ('/metrics', '/admin/')
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+LONG_POLL_PARAM = 'wait'
+
+
+def _take(state, capacity, rate, now):
+    """按经过的时间补充令牌后尝试取一个，返回 (新状态, 需要等待的秒数)，等待 0 秒表示放行"""
+    tokens, updated = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / rate
+
+
+class LocalBuckets:
+    """进程内令牌桶，条目数超过上限时淘汰最久未使用的桶"""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or getattr(settings, 'THROTTLE_LOCAL_MAX_ENTRIES', 100000)
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key, capacity, rate):
+        with self._lock:
+            state, wait = _take(self._buckets.get(key), capacity, rate, time.monotonic())
+            self._buckets[key] = state
+            self._buckets.move_to_end(key)
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class CacheBuckets:
+    """缓存中的令牌桶，桶空闲到补满所需的时间后自动过期"""
+
+    def take(self, key, capacity, rate):
+        state, wait = _take(cache.get(key), capacity, rate, time.time())
+        cache.set(key, state, math.ceil(capacity / rate) + 1)
+        return wait
+
+
+_buckets = None
+_buckets_lock = threading.Lock()
+
+
+def buckets():
+    global _buckets
+    if _buckets is None:
+        with _buckets_lock:
+            if _buckets is None:
+                _buckets = CacheBuckets() if getattr(settings, 'THROTTLE_SHARED', False) else LocalBuckets()
+    return _buckets
+
+
+def throttle_wait(scope, ident):
+    """在 scope 作用域下为 ident 取一个令牌，返回需要等待的秒数；作用域未配置时不限流"""
+    bucket = getattr(settings, 'THROTTLE_BUCKETS', {}).get(scope)
+    if bucket is None:
+        return 0
+    capacity, rate = bucket
+    return buckets().take(CACHE_KEY.format(scope, ident), capacity, rate)
+
+
+def request_ident(request, user=None):
+    """登录用户按用户计数，匿名请求按客户端 IP（遵循 DRF 的 NUM_PROXIES 设置）"""
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    return f'ip:{BaseThrottle().get_ident(request)}'
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """DRF 限流类：作用域取视图的 throttle_scopes[action]，没有时取 throttle_scope"""
+
+    def allow_request(self, request, view):
+        scopes = getattr(view, 'throttle_scopes', {})
+        scope = scopes.get(getattr(view, 'action', None), getattr(view, 'throttle_scope', None))
+        if scope is None:
+            return True
+        user = None if scope in getattr(settings, 'THROTTLE_ANONYMOUS_SCOPES', ()) else request.user
+        self._wait = throttle_wait(scope, request_ident(request, user))
+        return self._wait == 0
+
+    def wait(self):
+        return self._wait
+
+
+class LatencyWindow:
+    """最近 window 秒的请求耗时；p95 最多每 refresh 秒重新排序计算一次"""
+
+    def __init__(self, window, refresh=0.5, max_samples=2000):
+        self.window = window
+        self.refresh = refresh
+        self._samples = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+        self._p95 = 0.0
+        self._computed = 0.0
+
+    def observe(self, elapsed):
+        with self._lock:
+            self._samples.append((time.monotonic(), elapsed))
+
+    def p95(self):
+        now = time.monotonic()
+        if now - self._computed < self.refresh:
+            return self._p95
+        with self._lock:
+            while self._samples and self._samples[0][0] < now - self.window:
+                self._samples.popleft()
+            values = sorted(elapsed for _, elapsed in self._samples)
+        self._p95 = values[min(len(values) - 1, int(len(values) * 0.95))] if values else 0.0
+        self._computed = now
+        return self._p95
+
+
+class LoadSheddingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.max_in_flight = getattr(settings, 'SHED_MAX_IN_FLIGHT', 64)
+        self.p95_limit = getattr(settings, 'SHED_P95_SECONDS', 2.0)
+        self.retry_after = getattr(settings, 'SHED_RETRY_AFTER', 2)
+        self.latency = LatencyWindow(getattr(settings, 'SHED_WINDOW_SECONDS', 10))
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if request.path.startswith(SHED_EXEMPT_PREFIXES):
+            return self.get_response(request)
+        rejected = self._admit(request)
+        if rejected is not None:
+            return rejected
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            self._release(request, started)
+
+    async def __acall__(self, request):
+        if request.path.startswith(SHED_EXEMPT_PREFIXES):
+            return await self.get_response(request)
+        rejected = self._admit(request)
+        if rejected is not None:
+            return rejected
+        started = time.perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            self._release(request, started)
+
+    def _admit(self, request):
+        """放行时计入处理中的请求数并返回 None，否则返回 503 响应"""
+        if request.method in READ_METHODS and self.latency.p95() > self.p95_limit:
+            return self._reject('Server is overloaded, please retry later.')
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                return self._reject('Too many concurrent requests, please retry later.')
+            self.in_flight += 1
+        return None
+
+    def _release(self, request, started):
+        # 长轮询（wait 参数）本来就要等待，不计入延迟统计
+        if LONG_POLL_PARAM not in request.GET:
+            self.latency.observe(time.perf_counter() - started)
+        with self._lock:
+            self.in_flight -= 1
+
+    def _reject(self, message):
+        response = JsonResponse({'error': message}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = str(self.retry_after)
+        return response
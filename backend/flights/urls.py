@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import FlightViewSet, BookingViewSet, UserViewSet
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'flights', FlightViewSet)
@@ -8,6 +9,14 @@ router.register(r'bookings', BookingViewSet)
 router.register(r'users', UserViewSet)
 
 urlpatterns = [
+    # 异步接口（ASGI）
+    path('async/flights/search/', async_views.flight_search, name='async_flight_search'),
+    path('async/flights/<int:pk>/', async_views.flight_detail, name='async_flight_detail'),
+    path('async/bookings/', async_views.booking_create, name='async_booking_create'),
+    path('async/bookings/<int:pk>/cancel/', async_views.booking_cancel, name='async_booking_cancel'),
+    path('async/bookings/<int:pk>/status/', async_views.booking_status, name='async_booking_status'),
+    path('async/bookings/get_empty_seats/', async_views.empty_seats, name='async_empty_seats'),
+
     path('', include(router.urls)),
 
     #     # 首页
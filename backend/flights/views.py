@@ -12,49 +12,208 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.utils.urls import replace_query_param
 from django.contrib.auth.models import User
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
-from .models import Flight, Booking
+from django.utils.dateparse import parse_date
+from datetime import datetime, timedelta
+import math
+from .models import Flight, Booking, ArchivedFlight, ArchivedBooking, normalize_city
+from .search import FlightSearchEngine
+from .analytics import (
+    GROUPS as SALES_GROUPS, MAX_LIMIT as SALES_MAX_LIMIT, MAX_RANGE_DAYS, default_range, record_sales, sales_report,
+)
+from .availability import PRICE_FIELDS, fare_calendar
+from .caching import CachedFlightReadMixin
+from .fastpath import FLIGHT_ROWS, BOOKING_ROWS, FastListMixin, wants_fast
+from .inventory import reserve_seats, seat_field
+from .pricing import quote_fare, quote_data
+from .routing import SORTS as ROUTE_SORTS, find_connections, itinerary_data
+from .booking import (
+    CANCELED, BookingError, parse_booking_request, create_booking, enqueue_booking, cancel_booking,
+)
+from .queue import booking_status, wait_for_booking
+from .idempotency import complete_in_transaction, idempotent
+from .replicas import ReplicaReadMixin
+from .export import EXPORT_FORMATS, stream_bookings
+from .seatmap import assign_seats, seat_map_summary, format_seats
+from .authentication import SignedTokenAuthentication, issue_signed_token, invalidate_token, reload_signed_user
 from .serializers import (
-    FlightSerializer, BookingSerializer, 
+    FlightSerializer, BookingSerializer, BulkBookingItemSerializer,
+    ArchivedFlightSerializer, ArchivedBookingSerializer,
     UserRegistrationSerializer, UserLoginSerializer, UserProfileSerializer
 )
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import login
 
-class FlightViewSet(viewsets.ModelViewSet):
+class FlightViewSet(ReplicaReadMixin, CachedFlightReadMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Flight.objects.all()
     serializer_class = FlightSerializer
+    fast_rows = FLIGHT_ROWS
+    keyset_field = 'departure_time'  # 列表按 (departure_time, id) 游标分页
     permission_classes = [AllowAny]  # 航班信息可公开查看
+    # 令牌桶限流作用域（flights/throttling.py）：查询类接口共用 search，增删改航班按管理操作限流
+    throttle_scope = 'search'
+    throttle_scopes = {'create': 'admin', 'update': 'admin', 'partial_update': 'admin', 'destroy': 'admin'}
+    # 只读查询读副本（flights/replicas.py），容忍副本延迟；报价要写入预订，仍读主库
+    replica_actions = ('list', 'retrieve', 'search', 'calendar', 'connections', 'history')
+    replica_lag_tolerant = True
+
+    def get_queryset(self):
+        # 所有动作（列表、详情、修改、删除）都只能访问未起飞的航班，已起飞/已归档的航班通过 history 接口查询；
+        # 每次请求重新计算 now，不能直接写在类属性 queryset 上
+        return Flight.objects.live()
 
     @action(detail=False, methods=['get'])
     def search(self, request):
-        queryset = Flight.objects.all()
-        departure_city = request.query_params.get('departure_city')
-        destination_city = request.query_params.get('destination_city')
-        departure_date = request.query_params.get('departure_date')
+        params = request.query_params
+        # 兼容 arrival_city 与 destination_city 两种参数名
+        arrival_city = params.get('arrival_city') or params.get('destination_city')
 
-        if departure_city:
-            flights = flights.filter(departure_city__icontains=departure_city)
-        if destination_city:
-            flights = flights.filter(arrival_city__icontains=destination_city)
-        if departure_date:
-            queryset = queryset.filter(departure_time__date=departure_date)
+        try:
+            page = FlightSearchEngine().search(
+                departure_city=params.get('departure_city'),
+                arrival_city=arrival_city,
+                departure_date=params.get('departure_date'),
+                cursor=params.get('cursor'),
+                page_size=params.get('page_size'),
+            )
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        queryset = queryset.filter(departure_time__gt=timezone.now())
+        next_url = None
+        if page.next_cursor:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', page.next_cursor)
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        serializer = self.get_serializer(page.flights, many=True)
+        return Response({'next': next_url, 'results': serializer.data})
+
+    @action(detail=False, methods=['get'])
+    def calendar(self, request):
+        """低价日历：某航线某舱位一个月内每天的最低价和余票，读取余票汇总表"""
+        params = request.query_params
+        departure_key = normalize_city(params.get('departure_city'))
+        arrival_key = normalize_city(params.get('arrival_city') or params.get('destination_city'))
+        seat_class = params.get('seat_class', 'economy')
+        if not departure_key or not arrival_key:
+            return Response({'error': 'Missing departure_city or arrival_city.'}, status=status.HTTP_400_BAD_REQUEST)
+        if seat_class not in PRICE_FIELDS:
+            return Response({'error': 'Invalid seat class.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        today = timezone.localdate()
+        month = params.get('month')
+        first_day = parse_date(f'{month}-01') if month else today.replace(day=1)
+        if first_day is None:
+            return Response({'error': 'Invalid month. Expected YYYY-MM.'}, status=status.HTTP_400_BAD_REQUEST)
+        next_month = (first_day + timedelta(days=32)).replace(day=1)
+
+        # 价格与航班接口一致，按字符串输出
+        days = fare_calendar(departure_key, arrival_key, seat_class, max(first_day, today), next_month)
+        return Response({
+            'departure_city': params.get('departure_city'),
+            'arrival_city': params.get('arrival_city') or params.get('destination_city'),
+            'seat_class': seat_class,
+            'month': first_day.strftime('%Y-%m'),
+            'days': [
+                dict(day, min_price=None if day['min_price'] is None else str(day['min_price']))
+                for day in days
+            ],
+        })
+
+    @action(detail=True, methods=['get'])
+    def quote(self, request, pk=None):
+        """动态票价报价：?seat_class=economy&seat_count=2，预订时按同样的报价锁定价格"""
+        try:
+            flight_id, seat_class, seat_count = parse_booking_request({
+                'flight': pk,
+                'seat_class': request.query_params.get('seat_class', 'economy'),
+                'seat_count': request.query_params.get('seat_count', 1),
+            })
+        except BookingError as exc:
+            return Response({'error': exc.message}, status=exc.status_code)
+
+        quote = quote_fare(flight_id, seat_class, seat_count)
+        if quote is None:
+            return Response({'error': 'Flight not found or already departed.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(quote_data(quote))
 
-class BookingViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def connections(self, request):
+        """中转航线搜索：某天从出发城市到目的城市的直飞和中转行程，按总时长或总票价排序"""
+        params = request.query_params
+        departure_key = normalize_city(params.get('departure_city'))
+        arrival_key = normalize_city(params.get('arrival_city') or params.get('destination_city'))
+        if not departure_key or not arrival_key:
+            return Response({'error': 'Missing departure_city or arrival_city.'}, status=status.HTTP_400_BAD_REQUEST)
+        departure_date = parse_date(params.get('departure_date') or '')
+        if departure_date is None:
+            return Response({'error': 'Invalid departure date.'}, status=status.HTTP_400_BAD_REQUEST)
+        sort = params.get('sort', 'duration')
+        if sort not in ROUTE_SORTS:
+            return Response({'error': 'Invalid sort. Expected duration or price.'}, status=status.HTTP_400_BAD_REQUEST)
+        seat_class = params.get('seat_class', 'economy')
+        if seat_class not in PRICE_FIELDS:
+            return Response({'error': 'Invalid seat class.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            max_stops = int(params.get('max_stops', 1))
+            seat_count = int(params.get('seat_count', 1))
+            limit = min(int(params.get('limit', 10)), 50)
+            min_connection = params.get('min_connection')
+            min_connection = timedelta(minutes=int(min_connection)) if min_connection else None
+        except ValueError:
+            return Response({'error': 'Invalid numeric parameter.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 <= max_stops <= 2 or not 1 <= seat_count <= 10 or limit <= 0:
+            return Response({'error': 'Invalid max_stops, seat_count or limit.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        found = find_connections(
+            departure_key, arrival_key, departure_date, max_stops=max_stops, min_connection=min_connection,
+            sort=sort, seat_class=seat_class, seat_count=seat_count, limit=limit)
+        return Response({'results': [
+            itinerary_data(itinerary, seats, seat_class, seat_count) for itinerary, seats in found
+        ]})
+
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """历史航班查询：读取归档表，按航班号或航线+日期筛选，游标分页"""
+        params = request.query_params
+        flights = ArchivedFlight.objects.all()
+        if params.get('flight_number'):
+            flights = flights.filter(flight_number=params['flight_number'])
+        departure_key = normalize_city(params.get('departure_city'))
+        arrival_key = normalize_city(params.get('arrival_city') or params.get('destination_city'))
+        if departure_key:
+            flights = flights.filter(departure_city_key=departure_key)
+        if arrival_key:
+            flights = flights.filter(arrival_city_key=arrival_key)
+        if params.get('departure_date'):
+            date = parse_date(params['departure_date'])
+            if date is None:
+                return Response({'error': 'Invalid departure date.'}, status=status.HTTP_400_BAD_REQUEST)
+            start = timezone.make_aware(datetime.combine(date, datetime.min.time()))
+            flights = flights.filter(departure_time__gte=start, departure_time__lt=start + timedelta(days=1))
+
+        page = self.paginate_queryset(flights)
+        return self.get_paginated_response(ArchivedFlightSerializer(page, many=True).data)
+
+class BookingViewSet(ReplicaReadMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Booking.objects.all()
     serializer_class = BookingSerializer
+    fast_rows = BOOKING_ROWS
+    keyset_field = 'booking_time'  # 列表按 (booking_time, id) 游标分页
     permission_classes = [IsAuthenticated]  # 新增：需要认证
+    throttle_scope = 'search'
+    throttle_scopes = {
+        'create': 'booking', 'cancel': 'booking', 'bulk': 'booking',
+        'all_bookings': 'admin', 'search': 'admin', 'analytics': 'admin',
+    }
+    # 管理端报表和历史预订读副本；用户刚写入过时按会话粘滞读主库
+    replica_actions = ('all_bookings', 'search', 'analytics', 'history')
 
     def get_permissions(self):
         """根据不同action设置权限"""
-        if self.action in ['all_bookings', 'search', 'get_empty_seats']:
+        if self.action in ['all_bookings', 'search', 'analytics', 'get_empty_seats']:
             # 管理功能需要admin验证
             permission_classes = [AllowAny]  # 但通过_check_admin验证
         else:
@@ -65,86 +224,165 @@ class BookingViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """新增：数据隔离 - 用户只能看到自己的预订"""
         if self.request.user.is_authenticated:
-            return Booking.objects.filter(user=self.request.user)
+            return Booking.objects.for_listing().filter(user=self.request.user)
         return Booking.objects.none()
     
-    @transaction.atomic  # 新增：事务保护
+    @idempotent
     def create(self, request, *args, **kwargs):
-        flight_id = request.data.get('flight')
-        seat_class = request.data.get('seat_class')
-        seat_count = int(request.data.get('seat_count', 1))
-
-        # 新增：预订数量验证
-        if seat_count <= 0 or seat_count > 10:
-            return Response(
-                {'error': 'Invalid seat count. Must be between 1 and 10.'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
+        # 排队模式下只写入待确认预订，客户端通过 status 接口轮询结果
+        queued = getattr(settings, 'BOOKING_QUEUE_MODE', False)
         try:
-           # 改进：并发控制
-            flight = Flight.objects.select_for_update().get(id=flight_id)
-        except Flight.DoesNotExist:
-            return Response({'error': 'Flight not found.'}, status=status.HTTP_404_NOT_FOUND)
-
-        # 新增：航班过期检查
-        if flight.departure_time <= timezone.now():
-            return Response(
-                {'error': 'Cannot book expired flights.'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        if seat_class == 'economy':
-            available_seats = flight.economy_seats
-        elif seat_class == 'business':
-            available_seats = flight.business_seats
-        elif seat_class == 'first':
-            available_seats = flight.first_seats
-        else:
-            return Response({'error': 'Invalid seat class.'}, status=status.HTTP_400_BAD_REQUEST)
-
-        flight.save()
-
-        # 改进：使用当前登录用户，不允许指定用户ID
-        booking = Booking.objects.create(
-            user=request.user,  # 使用request.user而不是request.data.get('user')
-            flight=flight,
-            seat_class=seat_class,
-            seat_count=seat_count
-        )
+            if queued:
+                booking = enqueue_booking(request.user, request.data)
+            else:
+                booking = create_booking(request.user, request.data)
+        except BookingError as exc:
+            return Response({'error': exc.message}, status=exc.status_code)
 
         serializer = self.get_serializer(booking)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED if queued else status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['get'])
+    def status(self, request, pk=None):
+        """查询预订状态；wait=N 时长轮询，最多等待 N 秒直到预订不再是 pending。
+        同步视图等待期间占住一个 worker，最多等 BOOKING_STATUS_SYNC_MAX_WAIT 秒，更长的等待请用异步接口"""
+        try:
+            requested = float(request.query_params.get('wait', 0))
+        except ValueError:
+            requested = math.nan
+        # nan 会让截止时间永远达不到，一直占着 worker
+        if not math.isfinite(requested):
+            return Response({'error': 'Invalid wait.'}, status=status.HTTP_400_BAD_REQUEST)
+        wait = max(min(requested, getattr(settings, 'BOOKING_STATUS_SYNC_MAX_WAIT', 3)), 0)
+        try:
+            booking = wait_for_booking(Booking.objects.filter(user=request.user), int(pk), wait)
+        except ValueError:
+            booking = None
+        if booking is None:
+            return Response({'error': 'Booking not found.'}, status=status.HTTP_404_NOT_FOUND)
+        response = Response(booking_status(booking))
+        if requested > wait:
+            # 请求的等待时间被截短：告诉客户端可以在异步接口上长轮询
+            response['Link'] = f'</async/bookings/{booking.id}/status/>; rel="alternate"'
+        return response
 
-    @transaction.atomic  # 新增：事务保护
     @action(detail=True, methods=['post'])
+    @idempotent
     def cancel(self, request, pk=None):
         try:
             booking = self.get_object()
         except Booking.DoesNotExist:
             return Response({'error': 'Booking not found.'}, status=status.HTTP_404_NOT_FOUND)
 
-         # 新增：24小时内不能取消的限制
-        if booking.flight.departure_time <= timezone.now() + timezone.timedelta(hours=24):
-            return Response(
-                {'error': 'Cannot cancel booking within 24 hours of departure.'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # 改进：并发控制
-        flight = Flight.objects.select_for_update().get(id=booking.flight.id)
-        seat_class = booking.seat_class
-        seat_count = booking.seat_count
-
-        if seat_class == 'economy':
-            flight.economy_seats += seat_count
-        elif seat_class == 'first_class':
-            flight.first_class_seats += seat_count
-        
-        flight.save()
-        booking.delete()
-
-        return Response({'message': 'Booking canceled successfully.'}, status=status.HTTP_200_OK)
+        try:
+            cancel_booking(booking)
+        except BookingError as exc:
+            return Response({'error': exc.message}, status=exc.status_code)
+
+        return Response(CANCELED, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    @idempotent
+    def bulk(self, request):
+        """批量预订：一次校验全部条目，每个航班+舱位只执行一条扣减语句，bulk_create 批量写入"""
+        items = request.data.get('bookings') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'Expected a non-empty list of bookings.'}, status=status.HTTP_400_BAD_REQUEST)
+        max_items = getattr(settings, 'BULK_BOOKING_MAX_ITEMS', 500)
+        if len(items) > max_items:
+            return Response({'error': f'At most {max_items} bookings per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(items)
+        valid = {}
+        for index, item in enumerate(items):
+            serializer = BulkBookingItemSerializer(data=item)
+            if serializer.is_valid():
+                valid[index] = serializer.validated_data
+            else:
+                results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+
+        # 一次查询取出所有涉及的航班
+        flights = Flight.objects.in_bulk({data['flight'] for data in valid.values()})
+        now = timezone.now()
+        groups = {}
+        for index, data in list(valid.items()):
+            flight = flights.get(data['flight'])
+            error = None
+            if flight is None:
+                error = 'Flight not found.'
+            elif flight.departure_time <= now:
+                error = 'Cannot book expired flights.'
+            if error:
+                results[index] = {'index': index, 'status': 'error', 'errors': {'flight': [error]}}
+                del valid[index]
+            else:
+                groups.setdefault((data['flight'], data['seat_class']), []).append(index)
+
+        # 每个航班+舱位报价一次，在事务外完成
+        quotes = {key: quote_fare(*key) for key in groups}
+
+        with transaction.atomic():
+            bookings = []
+            sales = []
+            for (flight_id, seat_class), indexes in groups.items():
+                quote = quotes[flight_id, seat_class]
+                if quote is None:
+                    for index in indexes:
+                        results[index] = {'index': index, 'status': 'error',
+                                          'errors': {'flight': ['Cannot book expired flights.']}}
+                    continue
+                # 与 queue.confirm_group 相同：按请求顺序在剩余座位内挑出能满足的条目，
+                # 合并成一条条件UPDATE扣减，只有放不下的条目失败
+                available = getattr(flights[flight_id], seat_field(seat_class))
+                admitted = []
+                for index in indexes:
+                    if valid[index]['seat_count'] <= available:
+                        admitted.append(index)
+                        available -= valid[index]['seat_count']
+                total = sum(valid[index]['seat_count'] for index in admitted)
+                if admitted and not reserve_seats(flight_id, seat_class, total):
+                    # 读取后库存被其他请求扣减了，退回逐条扣减
+                    admitted = [index for index in admitted
+                                if reserve_seats(flight_id, seat_class, valid[index]['seat_count'])]
+                    total = sum(valid[index]['seat_count'] for index in admitted)
+                for index in set(indexes) - set(admitted):
+                    results[index] = {'index': index, 'status': 'error',
+                                      'errors': {'seat_count': ['Not enough seats available.']}}
+                if not admitted:
+                    continue
+                # 整组一次分配座位，再按条目顺序切分
+                seats = iter(assign_seats(flight_id, seat_class, total))
+                for index in admitted:
+                    data = valid[index]
+                    booking = Booking(user=request.user, flight=flights[flight_id], **{
+                        key: value for key, value in data.items() if key != 'flight'})
+                    booking.seat_numbers = format_seats([next(seats) for _ in range(booking.seat_count)])
+                    booking.unit_price = quote.unit_price
+                    booking.total_amount = quote.unit_price * booking.seat_count
+                    booking._bulk_index = index
+                    bookings.append(booking)
+                sales.append((flight_id, seat_class, total, len(admitted), quote.unit_price * total))
+            created = Booking.objects.bulk_create(bookings)
+            for sale in sales:
+                record_sales(*sale)
+
+            for booking in created:
+                results[booking._bulk_index] = {
+                    'index': booking._bulk_index, 'status': 'created',
+                    'booking': self.get_serializer(booking).data,
+                }
+
+            if len(created) == len(items):
+                response_status = status.HTTP_201_CREATED
+            elif created:
+                response_status = status.HTTP_207_MULTI_STATUS
+            else:
+                response_status = status.HTTP_400_BAD_REQUEST
+            data = {'created': len(created), 'failed': len(items) - len(created), 'results': results}
+            # 幂等键与批量预订一起提交
+            complete_in_transaction(response_status, lambda: data)
+        return Response(data, status=response_status)
 
     def _check_admin(self, request):
         """你需要提供这个方法的实现"""
@@ -156,14 +394,39 @@ class BookingViewSet(viewsets.ModelViewSet):
         return (username == getattr(settings, 'ADMIN_USERNAME', 'admin') and 
                 password == getattr(settings, 'ADMIN_PASSWORD', '123456'))
 
+    def _booking_filters(self, data):
+        """管理端查询条件，all_bookings 导出与 search 共用"""
+        filters = {}
+        if data.get('user'):
+            filters['user_id'] = data.get('user')
+        if data.get('flight'):
+            filters['flight_id'] = data.get('flight')
+        if data.get('seat_class'):
+            filters['seat_class'] = data.get('seat_class')
+        if data.get('seat_count'):
+            filters['seat_count'] = data.get('seat_count')
+        return filters
+
     @action(detail=False, methods=['post'])
     def all_bookings(self, request):
         if not self._check_admin(request):
             return Response({'error': 'Admin authentication failed'}, status=status.HTTP_403_FORBIDDEN)
 
-        bookings = Booking.objects.all()
-        serializer = self.get_serializer(bookings, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        bookings = Booking.objects.for_listing().filter(**self._booking_filters(request.data))
+
+        # export=ndjson/csv 时流式导出全部数据，否则分页返回JSON
+        export_format = request.data.get('export')
+        if export_format:
+            if export_format not in EXPORT_FORMATS:
+                return Response({'error': 'Invalid export format.'}, status=status.HTTP_400_BAD_REQUEST)
+            # 流式响应在请求处理完之后才执行查询，先固定好当前请求选择的数据库
+            return stream_bookings(bookings.order_by('id').using(bookings.db), self.get_serializer_class(), export_format)
+        if wants_fast(request):
+            return self.fast_list_response(bookings)
+
+        page = self.paginate_queryset(bookings)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
     @action(detail=False, methods=['post'])
@@ -171,26 +434,58 @@ class BookingViewSet(viewsets.ModelViewSet):
         if not self._check_admin(request):
             return Response({'error': 'Admin authentication failed'}, status=status.HTTP_403_FORBIDDEN)
 
-        user_id = request.data.get('user')
-        flight_id = request.data.get('flight')
-        seat_class = request.data.get('seat_class')
-        seat_count = request.data.get('seat_count')
-
-        filters = {}
-        if user_id:
-            filters['user_id'] = user_id
-        if flight_id:
-            filters['flight_id'] = flight_id
-        if seat_class:
-            filters['seat_class'] = seat_class
-        if seat_count:
-            filters['seat_count'] = seat_count
-
-        bookings = Booking.objects.filter(**filters)
-        serializer = self.get_serializer(bookings, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        bookings = Booking.objects.for_listing().filter(**self._booking_filters(request.data))
+        if wants_fast(request):
+            return self.fast_list_response(bookings)
+        page = self.paginate_queryset(bookings)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
     
 
+    @action(detail=False, methods=['post'])
+    def analytics(self, request):
+        """销售分析：按航班/航线/航空公司/日期统计收入、售出座位和上座率，读 SalesRollup 汇总表"""
+        if not self._check_admin(request):
+            return Response({'error': 'Admin authentication failed'}, status=status.HTTP_403_FORBIDDEN)
+
+        data = request.data
+        group_by = data.get('group_by', 'route')
+        if group_by not in SALES_GROUPS:
+            return Response({'error': 'Invalid group_by. Expected flight, route, airline or day.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        start, end = default_range()
+        if data.get('start'):
+            start = parse_date(data['start'])
+        if data.get('end'):
+            end = parse_date(data['end'])
+        if start is None or end is None or start >= end:
+            return Response({'error': 'Invalid start or end date.'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days > MAX_RANGE_DAYS:
+            return Response({'error': f'Date range cannot exceed {MAX_RANGE_DAYS} days.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        seat_class = data.get('seat_class')
+        if seat_class and seat_class not in PRICE_FIELDS:
+            return Response({'error': 'Invalid seat class.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(int(data.get('limit', 100)), SALES_MAX_LIMIT)
+        except (TypeError, ValueError):
+            return Response({'error': 'Invalid limit.'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit <= 0:
+            return Response({'error': 'Invalid limit.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        report = sales_report(
+            group_by, start, end, seat_class=seat_class, airline=data.get('airline'),
+            departure_key=normalize_city(data.get('departure_city')),
+            arrival_key=normalize_city(data.get('arrival_city')), limit=limit)
+        return Response(report)
+
+    @action(detail=False, methods=['get'])
+    def history(self, request):
+        """当前用户已归档的历史预订（航班起飞后由 archive_flights 移入归档表）"""
+        bookings = ArchivedBooking.objects.filter(user=request.user).select_related('flight')
+        page = self.paginate_queryset(bookings)
+        return self.get_paginated_response(ArchivedBookingSerializer(page, many=True).data)
+
     @action(detail=False, methods=['get'])
     def get_empty_seats(self, request):
         flight_number = request.query_params.get('flight_number')
@@ -199,32 +494,32 @@ class BookingViewSet(viewsets.ModelViewSet):
         if not flight_number or not departure_date:
             return Response({'error': 'Missing flight_number or departure_date.'}, status=status.HTTP_200_OK)
 
-        flights = Flight.objects.filter(flight_number=flight_number, departure_time__date=departure_date)
-        if not flights.exists():
+        date = parse_date(departure_date)
+        if date is None:
+            return Response({'error': 'Invalid departure date.'}, status=status.HTTP_400_BAD_REQUEST)
+        start = timezone.make_aware(datetime.combine(date, datetime.min.time()))
+        flight = Flight.objects.filter(
+            flight_number=flight_number,
+            departure_time__gte=start,
+            departure_time__lt=start + timedelta(days=1),
+        ).first()
+        if flight is None:
             return Response({'error': 'No matching flight found.'}, status=status.HTTP_200_OK)
 
-        flight = flights.first()
-        bookings = Booking.objects.filter(flight=flight)
-
-        # 假定经济舱座位号从1开始，头等舱紧接其后
-        total_seats = flight.economy_seats + flight.first_class_seats
-        # 计算已被预订的座位数量
-        booked_seats = sum([b.seat_count for b in bookings])
-        # 所有座位号 1 ~ (已预订+剩余)
-        all_seat_count = total_seats
-        # 假定已预订座位号为 1 ~ booked_seats，剩余座位号为 booked_seats+1 ~ all_seat_count
-        empty_seat_list = list(range(booked_seats + 1, all_seat_count + 1))
-
+        # 座位图按舱位返回空座区间，而不是逐个列出空座号
+        seat_classes = seat_map_summary(flight)
         data = {
             'flight_number': flight.flight_number,
             'departure_date': departure_date,
-            'seats_left': total_seats,
-            'empty_seat_list': empty_seat_list
+            'seats_left': sum(c['seats_left'] for c in seat_classes.values()),
+            'seat_classes': seat_classes,
         }
         return Response(data, status=status.HTTP_200_OK)
 
 class UserViewSet(viewsets.GenericViewSet):
     queryset = User.objects.all()
+    # 登录/注册是暴力破解的目标，按 IP 限流（THROTTLE_ANONYMOUS_SCOPES）
+    throttle_scopes = {'login': 'auth', 'register': 'auth'}
     
     def get_permissions(self):
         if self.action in ['register', 'login']:
@@ -242,6 +537,7 @@ class UserViewSet(viewsets.GenericViewSet):
             return Response({
                 'user': UserProfileSerializer(user).data,
                 'token': token.key,
+                'signed_token': issue_signed_token(user),
                 'message': 'User registered successfully.'
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -256,6 +552,7 @@ class UserViewSet(viewsets.GenericViewSet):
             return Response({
                 'user': UserProfileSerializer(user).data,
                 'token': token.key,
+                'signed_token': issue_signed_token(user),
                 'message': 'Login successful.'
             })
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -264,11 +561,25 @@ class UserViewSet(viewsets.GenericViewSet):
     def logout(self, request):
         if request.user.is_authenticated:
             try:
-                request.user.auth_token.delete()
+                token = request.user.auth_token
+                invalidate_token(token.key)
+                token.delete()
             except:
                 pass
         return Response({'message': 'Logout successful.'})
 
+    @action(detail=False, methods=['post'])
+    def signed_token(self, request):
+        """换取新的短期签名令牌（Authorization: Bearer <signed_token>），校验时不查数据库"""
+        user = request.user
+        if isinstance(request.successful_authenticator, SignedTokenAuthentication):
+            # 用签名令牌续期时按数据库中的用户状态签发，签名令牌本身不能证明用户仍有效
+            user = reload_signed_user(user)
+        return Response({
+            'signed_token': issue_signed_token(user),
+            'expires_in': getattr(settings, 'SIGNED_TOKEN_MAX_AGE', 300),
+        })
+
     @action(detail=False, methods=['get'])
     def profile(self, request):
         serializer = UserProfileSerializer(request.user)